@@ -1,46 +1,281 @@
 from __future__ import annotations
 
 import json
-from typing import List
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from app.candidate_filter import Candidate, select_cluster_reps, filter_candidates_with_embeddings
-from app.db import ArticleAnalysis, SessionLocal
-from app.judge import judge_article, JUDGE_MODEL
+from sqlalchemy.orm import Session
 
+from app import judge_cache
+from app.candidate_filter import Candidate
+from app.cluster_summary import refresh_clusters
+from app.condense import condensed_texts
+from app.config import settings
+from app.bulk import upsert
+from app.db import RUBRIC_SCORE_FIELDS, Article, ArticleAnalysis, SessionLocal, rubric_values
+from app.embeddings import EMBED_MODEL
+from app.judge import JUDGE_MODEL, judge_cache_key
+from app.judge_executor import JudgeJob, run_judge_jobs
+from app.prejudge import PrejudgeRow, load_model
+from app.run_context import RunContext
 
-def analyze_top_candidates(top_k: int = 60, max_new_judgements: int = 30) -> int:
+
+@dataclass
+class JudgeStats:
+    created: int = 0      # ArticleAnalysis verdicts written (LLM + cache)
+    llm_calls: int = 0    # verdicts obtained from the LLM
+    cache_hits: int = 0   # verdicts copied from the content-hash cache
+    skipped_prejudge: int = 0  # LLM calls avoided by the local pre-judge
+    failed: int = 0
+    deferred: int = 0     # left for the next run: the request budget was spent on fallbacks
+
+    @property
+    def hit_rate(self) -> float:
+        looked_up = self.cache_hits + self.llm_calls + self.failed
+        return self.cache_hits / looked_up if looked_up else 0.0
+
+
+JUDGEMENT_COLUMNS = (
+    "profile_similarity", "embed_model", "judge_model", "judge_json", "judge_score",
+    "is_relevant", *RUBRIC_SCORE_FIELDS, "prejudge_skipped", "updated_at",
+)
+
+
+def judgement_values(article_id: int, cluster_id: int, j: Dict[str, Any], similarity: Optional[float]) -> Dict[str, Any]:
+    """
+    ArticleAnalysis column values for one verdict (a row for write_judgements).
+    """
+    return {
+        "article_id": article_id,
+        "cluster_id": cluster_id,
+        "profile_similarity": similarity,
+        "embed_model": EMBED_MODEL,
+        "judge_model": JUDGE_MODEL,
+        "judge_json": json.dumps(j, ensure_ascii=False),
+        "judge_score": float(j["final_score"]),
+        **rubric_values(j),
+        "prejudge_skipped": None,
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def write_judgements(session: Session, rows: List[Dict[str, Any]], only_unjudged: bool = False) -> int:
     """
-    Runs the LLM judge on up to `max_new_judgements` candidates that haven't been judged yet.
-    Returns how many new judgements were created.
+    Bulk upsert of verdicts keyed by article_id (one statement per chunk instead of
+    a SELECT + INSERT/UPDATE per article). With only_unjudged, rows that already have
+    a judge_score are left alone. Returns the number of rows written.
     """
-    candidates: List[Candidate] = filter_candidates_with_embeddings(top_k=top_k)
-    reps = select_cluster_reps()
+    by_article = {r["article_id"]: r for r in rows}  # last verdict wins, as with per-row writes
+    return upsert(
+        session,
+        ArticleAnalysis,
+        by_article.values(),
+        conflict_cols=["article_id"],
+        update_cols=JUDGEMENT_COLUMNS,
+        only_if=ArticleAnalysis.judge_score.is_(None) if only_unjudged else None,
+    )
 
-    created = 0
+
+def collect_judge_jobs(
+    session: Session,
+    candidates: List[Candidate],
+    reps: Dict[int, Article],
+    limit: Optional[int] = None,
+    exclude_article_ids: Optional[Set[int]] = None,
+) -> List[JudgeJob]:
+    """
+    Picks up to `limit` not-yet-judged representative articles, in candidate order.
+    """
+    exclude = exclude_article_ids or set()
+    rep_ids = [a.id for a in (reps.get(c.cluster_id) for c in candidates) if a is not None]
+    judged: Set[int] = {
+        aid
+        for (aid,) in session.query(ArticleAnalysis.article_id).filter(
+            ArticleAnalysis.article_id.in_(rep_ids), ArticleAnalysis.judge_score.is_not(None)
+        )
+    } if rep_ids else set()
+
+    picked: List[Tuple[Candidate, Article]] = []
+    for c in candidates:
+        if limit is not None and len(picked) >= limit:
+            break
+        a = reps.get(c.cluster_id)
+        if a is None or a.id in exclude or a.id in judged:
+            continue
+        picked.append((c, a))
+
+    # The judge sees title + a token-budgeted condensed body (cached per article)
+    bodies = condensed_texts(
+        (a for _, a in picked),
+        purpose="judge",
+        budget_tokens=settings.CONDENSE_JUDGE_TOKENS,
+        model=JUDGE_MODEL,
+        session=session,
+    )
+
+    jobs: List[JudgeJob] = []
+    for c, a in picked:
+        body = bodies.get(a.id, "")
+        jobs.append(
+            JudgeJob(
+                article_id=a.id,
+                cluster_id=c.cluster_id,
+                similarity=c.similarity,
+                title=a.title or "",
+                text=body,
+                cache_key=judge_cache_key(a.title or "", body),
+            )
+        )
+    return jobs
+
+
+def resolve_from_cache(session: Session, jobs: List[JudgeJob]) -> Tuple[List[JudgeJob], int]:
+    """
+    Copies cached verdicts onto jobs whose content was already judged.
+    Returns (jobs still needing the LLM, number of cache hits).
+    """
+    cached = judge_cache.lookup(session, (job.cache_key for job in jobs))
+    remaining: List[JudgeJob] = []
+    rows: List[Dict[str, Any]] = []
+    for job in jobs:
+        j = cached.get(job.cache_key)
+        if j is None:
+            remaining.append(job)
+            continue
+        rows.append(judgement_values(job.article_id, job.cluster_id, j, job.similarity))
+    write_judgements(session, rows)
+    return remaining, len(rows)
+
+
+def skip_by_prejudge(session: Session, jobs: List[JudgeJob], reps: Dict[int, Article]) -> Tuple[List[JudgeJob], int]:
+    """
+    Drops jobs the local pre-judge expects to fail the relevance gate. They are
+    recorded as prejudge_skipped (failing the gate, so the similarity fallback
+    doesn't pick them) and stay unjudged: a retrained or disabled pre-judge sends
+    them to the LLM on a later run. Returns (jobs to send to the LLM, number skipped).
+    """
+    model = load_model()
+    if model is None or not jobs:
+        return jobs, 0
+    rows = []
+    for job in jobs:
+        a = reps[job.cluster_id]
+        rows.append(
+            PrejudgeRow(
+                similarity=job.similarity,
+                title=job.title,
+                source=a.source or "UNK",
+                country=a.country or "UNK",
+                has_text=bool(job.text),  # condensed body, non-empty iff the article has text
+            )
+        )
+    keep = model.should_judge(rows)
+    kept = [job for job, k in zip(jobs, keep) if k]
+    skipped = [
+        {
+            "article_id": job.article_id,
+            "cluster_id": job.cluster_id,
+            "profile_similarity": job.similarity,
+            "prejudge_skipped": True,
+            "updated_at": datetime.utcnow(),
+        }
+        for job, k in zip(jobs, keep) if not k
+    ]
+    upsert(
+        session,
+        ArticleAnalysis,
+        skipped,
+        conflict_cols=["article_id"],
+        update_cols=("cluster_id", "profile_similarity", "prejudge_skipped", "updated_at"),
+        only_if=ArticleAnalysis.judge_score.is_(None),
+    )
+    return kept, len(skipped)
+
+
+def analyze_top_candidates(
+    top_k: int = 60,
+    max_new_judgements: int = 30,
+    concurrency: Optional[int] = None,
+    commit_every: Optional[int] = None,
+    ctx: Optional[RunContext] = None,
+) -> JudgeStats:
+    """
+    Judges unjudged candidates. Verdicts for content already judged (syndicated copies,
+    re-posts) are copied from the judge cache; candidates the trained pre-judge
+    expects to fail are skipped; at most `max_new_judgements` LLM requests are made
+    for the rest, including the single-call fallbacks of failed group calls
+    (candidates beyond that are left for the next run). Judge calls run
+    concurrently (bounded + rate limited) and DB writes are committed in batches.
+    """
+    concurrency = concurrency or settings.JUDGE_CONCURRENCY
+    commit_every = commit_every or settings.JUDGE_COMMIT_EVERY
+
+    ctx = ctx or RunContext()
+
+    candidates: List[Candidate] = ctx.candidates(top_k=top_k)
+    reps = ctx.reps()
+
+    stats = JudgeStats()
     with SessionLocal() as session:
-        for c in candidates:
-            a = reps.get(c.cluster_id)
-            if a is None:
-                continue
+        judge_cache.prune_stale(session)
+
+        jobs = collect_judge_jobs(session, candidates, reps)
+        touched = [job.article_id for job in jobs]
+        touched_clusters = [job.cluster_id for job in jobs]
+        jobs, stats.cache_hits = resolve_from_cache(session, jobs)
+        stats.created += stats.cache_hits
+        session.commit()
 
-            exists = session.query(ArticleAnalysis).filter(ArticleAnalysis.article_id == a.id).first()
-            if exists and exists.judge_score is not None:
+        jobs, stats.skipped_prejudge = skip_by_prejudge(session, jobs, reps)
+        session.commit()
+
+        # Identical content within this run is judged once; the budget applies to LLM calls
+        by_key: Dict[str, List[JudgeJob]] = {}
+        for job in jobs:
+            by_key.setdefault(job.cache_key, []).append(job)
+        to_judge = [group[0] for group in by_key.values()][:max_new_judgements]
+
+        pending: List[Dict[str, Any]] = []
+        for res in run_judge_jobs(
+            to_judge,
+            concurrency=concurrency,
+            rate_per_min=settings.JUDGE_RATE_PER_MIN,
+            max_retries=settings.JUDGE_MAX_RETRIES,
+            group_size=settings.JUDGE_GROUP_SIZE,
+            max_requests=max_new_judgements,
+        ):
+            if res.deferred:
+                stats.deferred += 1
                 continue
+            j = res.verdict
+            if j is None:
+                print(f"⚠️ Judge failed for article {res.job.article_id}: {res.error}")
+                stats.failed += 1
+                continue
+
+            stats.llm_calls += 1
+            judge_cache.store(session, res.job.cache_key, j)
+            group = by_key[res.job.cache_key]
+            pending.extend(judgement_values(job.article_id, job.cluster_id, j, job.similarity) for job in group)
+            stats.created += len(group)
+            stats.cache_hits += len(group) - 1
 
-            if created >= max_new_judgements:
-                break
+            if len(pending) >= commit_every:
+                write_judgements(session, pending)
+                session.commit()
+                pending = []
 
-            j = judge_article(title=a.title or "", text=a.text or "")
-            row = exists or ArticleAnalysis(article_id=a.id, cluster_id=c.cluster_id)
+        write_judgements(session, pending)
+        session.flush()
+        refresh_clusters(session, touched_clusters)  # best_judge_score
+        session.commit()
 
-            row.profile_similarity = c.similarity
-            row.embed_model = "text-embedding-3-small"
-            row.judge_model = JUDGE_MODEL
-            row.judge_json = json.dumps(j, ensure_ascii=False)
-            row.judge_score = float(j["final_score"])
+    ctx.invalidate_judgements(touched)
 
-            session.add(row)
-            session.commit()
-            created += 1
+    if stats.failed:
+        print(f"⚠️ LLM judge: {stats.failed} judgements failed after retries (will retry next run).")
+    if stats.deferred:
+        print(f"ℹ️ LLM judge: request budget spent, {stats.deferred} candidates left for the next run.")
 
-    return created
\ No newline at end of file
+    return stats
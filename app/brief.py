@@ -3,12 +3,34 @@ from __future__ import annotations
 import json
 from typing import Any, Dict, List
 
-from openai import OpenAI
-
-from app.config import settings
+from app import llm_gateway
 from app.db import Article, ArticleAnalysis, SessionLocal
 
 BRIEF_MODEL = "gpt-4.1-mini"
+BRIEF_TIMEOUT_S = 120.0
+
+# Static developer message; the day's notes go in the user message. At ~150 tokens it is
+# far below the prompt-caching minimum (judge.PROMPT_CACHE_MIN_TOKENS), and the brief
+# runs once per digest, so it is not cached.
+BRIEF_INSTRUCTIONS = """
+You are writing a concise "Big news brief" for a personal AI/tech digest.
+
+Rules:
+- Use ONLY the provided notes. Do NOT invent facts.
+- For each bullet, start with a short theme label like:
+  - **Theme: <3-6 words>** — <1-2 sentences>
+- Each bullet should clearly map to one or more of the notes (but do NOT mention cluster IDs).
+- If details are missing (paywall/empty notes), stay high-level and only use title-level info.
+
+Output format:
+
+BIG NEWS BRIEF
+- **Theme: ...** — ...
+  Sources: SourceName, SourceName (optional, max 2-3)
+
+WHAT TO REMEMBER
+- ...
+""".strip()
 
 
 def _build_top10_notes(top10_cluster_ids: List[int]) -> List[Dict[str, Any]]:
@@ -78,39 +100,16 @@ def generate_big_news_brief(top10_cluster_ids: List[int]) -> str:
 
     Uses only the provided notes (no invention).
     """
-    if not settings.OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY missing. Add it to .env")
-
     notes = _build_top10_notes(top10_cluster_ids)
 
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-    prompt = f"""
-You are writing a concise "Big news brief" for a personal AI/tech digest.
-
-Rules:
-- Use ONLY the provided notes. Do NOT invent facts.
-- For each bullet, start with a short theme label like:
-  - **Theme: <3-6 words>** — <1-2 sentences>
-- Each bullet should clearly map to one or more of the notes (but do NOT mention cluster IDs).
-- If details are missing (paywall/empty notes), stay high-level and only use title-level info.
-
-Output format:
-
-BIG NEWS BRIEF
-- **Theme: ...** — ...
-  Sources: SourceName, SourceName (optional, max 2-3)
-
-WHAT TO REMEMBER
-- ...
-
-Notes (Top 10 items):
-{json.dumps(notes, ensure_ascii=False, indent=2)}
-""".strip()
-
-    resp = client.responses.create(
+    resp = llm_gateway.create_response(
+        stage="brief",
         model=BRIEF_MODEL,
-        input=prompt,
+        input=[
+            {"role": "developer", "content": BRIEF_INSTRUCTIONS},
+            {"role": "user", "content": "Notes (Top 10 items):\n" + json.dumps(notes, ensure_ascii=False, indent=2)},
+        ],
+        timeout=BRIEF_TIMEOUT_S,
     )
 
     return resp.output_text.strip()
\ No newline at end of file
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Type
+
+from sqlalchemy import Table, text as sql_text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Query, Session
+
+from app.db import Base
+
+_CHUNK = 1000  # rows per executemany in copy_rows' fallback
+
+
+def _insert(session: Session, table: Table):
+    """
+    INSERT construct of the session's dialect (both support ON CONFLICT).
+    """
+    name = session.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"bulk upsert is not supported on {name}")
+    return insert(table)
+
+
+def _upsert_stmt(session: Session, table: Table, conflict_cols: Sequence[str], update_cols, only_if):
+    stmt = _insert(session, table)
+    if update_cols is None:
+        return stmt.on_conflict_do_nothing(index_elements=list(conflict_cols))
+    return stmt.on_conflict_do_update(
+        index_elements=list(conflict_cols),
+        set_={c: stmt.excluded[c] for c in update_cols},
+        where=only_if,
+    )
+
+
+def upsert(
+    session: Session,
+    model: Type[Base],
+    rows: Iterable[Dict[str, Any]],
+    conflict_cols: Sequence[str],
+    update_cols: Optional[Sequence[str]] = None,
+    only_if=None,
+) -> int:
+    """
+    Bulk INSERT ... ON CONFLICT (conflict_cols) on SQLite and Postgres.
+
+    update_cols=None  -> DO NOTHING (keep the existing row)
+    update_cols=[...] -> DO UPDATE SET those columns from the new row,
+                         optionally only where `only_if` (SQL predicate on the existing row) holds
+
+    All rows must have the same keys (column defaults fill in the rest) and distinct
+    conflict_cols values: Postgres rejects a statement that hits one row twice.
+    Runs in the session's transaction (committed by the caller). Returns the number
+    of rows inserted or updated. ORM objects already loaded in `session` are not refreshed.
+    """
+    return len(insert_new(session, model, rows, conflict_cols, update_cols, only_if, returning=conflict_cols[:1]))
+
+
+def insert_new(
+    session: Session,
+    model: Type[Base],
+    rows: Iterable[Dict[str, Any]],
+    conflict_cols: Sequence[str],
+    update_cols: Optional[Sequence[str]] = None,
+    only_if=None,
+    returning: Sequence[str] = ("id",),
+) -> List[Any]:
+    """
+    upsert() returning the `returning` columns of every row inserted or updated
+    (e.g. id + url of the articles that were actually new), as result rows.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    table: Table = model.__table__
+    stmt = _upsert_stmt(session, table, conflict_cols, update_cols, only_if)
+    # executemany of one cached statement: SQLAlchemy batches it into multi-row VALUES
+    # ("insertmanyvalues"). RETURNING reports written rows portably (rowcount of an
+    # executemany is driver dependent); skipped conflicts return nothing.
+    stmt = stmt.returning(*(table.c[c] for c in returning))
+    return session.execute(stmt, rows).all()
+
+
+def stream(query: Query, batch: int = 1000) -> Iterator[Any]:
+    """
+    Iterates a large query in batches instead of loading it with .all():
+    a server-side cursor on Postgres, chunked fetches on SQLite.
+    """
+    return iter(query.execution_options(stream_results=True).yield_per(batch))
+
+
+def copy_rows(conn: Connection, table: Table, columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+    """
+    Loads rows with COPY ... FROM STDIN (Postgres + psycopg 3); other dialects fall
+    back to chunked executemany INSERTs. Returns the number of rows written.
+    """
+    cols = list(columns)
+    n = 0
+    if conn.dialect.name == "postgresql":
+        col_sql = ", ".join(f'"{c}"' for c in cols)
+        raw = conn.connection.driver_connection
+        with raw.cursor() as cur:
+            with cur.copy(f'COPY "{table.name}" ({col_sql}) FROM STDIN') as copy:
+                for r in rows:
+                    copy.write_row(_copy_values(r))
+                    n += 1
+        return n
+
+    stmt = table.insert()
+    chunk: List[Dict[str, Any]] = []
+    for r in rows:
+        chunk.append(dict(zip(cols, r)))
+        if len(chunk) >= _CHUNK:
+            conn.execute(stmt, chunk)
+            n += len(chunk)
+            chunk = []
+    if chunk:
+        conn.execute(stmt, chunk)
+        n += len(chunk)
+    return n
+
+
+def _copy_values(r: Sequence[Any]) -> Sequence[Any]:
+    # psycopg adapts bytes for bytea columns; memoryview (SQLite blobs) needs converting
+    return [bytes(v) if isinstance(v, memoryview) else v for v in r]
+
+
+def reset_sequences(conn: Connection, tables: Iterable[Table]) -> None:
+    """
+    After COPY with explicit ids, moves each Postgres id sequence past max(id).
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for t in tables:
+        pk = list(t.primary_key.columns)
+        if len(pk) != 1 or pk[0].autoincrement is False:
+            continue
+        col = pk[0].name
+        conn.execute(
+            sql_text(
+                f"SELECT setval(pg_get_serial_sequence('{t.name}', '{col}'), "
+                f"COALESCE((SELECT MAX({col}) FROM {t.name}), 0) + 1, false)"
+            )
+        )
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+import warnings
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import yaml
 
-from app.db import Article, SessionLocal, SentCluster
-from app.embeddings import cosine_similarity, embed_texts
-
-from datetime import datetime, timedelta
+from app.cluster_summary import load_reps, unsent_recent_clusters
+from app.condense import condensed_texts
+from app.config import settings
+from app.db import Article, SessionLocal
+from app.embeddings import EMBED_MODEL, cosine_similarity, embed_texts_cached
 
 PROFILE_PATH = "data/profile.yaml"
 
@@ -22,6 +24,7 @@ class Candidate:
     source: str
     title: str
     url: str
+    article_id: int = 0  # the cluster representative that was embedded
 
 
 def _load_profile_texts() -> List[str]:
@@ -32,64 +35,73 @@ def _load_profile_texts() -> List[str]:
     return [str(t).strip() for t in texts if str(t).strip()]
 
 
-def select_cluster_reps(limit_articles: int = 600) -> Dict[int, Article]:
+def select_cluster_reps(limit: int = 200, *, limit_articles: Optional[int] = None) -> Dict[int, Article]:
     """
-    Pick 1 representative Article per cluster_id.
-    Prefer an article with extracted text; otherwise newest.
-    Excludes clusters already sent.
+    Pick 1 representative Article per cluster_id for the newest `limit` recent clusters
+    (the rep is maintained in cluster_summary: newest member with text, else newest).
+    Excludes clusters already sent. The default of 200 clusters is about what the
+    600 newest articles used to yield, so as many reps are embedded as before.
+
+    `limit_articles` is a deprecated alias of `limit`. It used to cap the articles
+    scanned (about 3 per cluster); it now caps clusters, so the same value returns
+    about 3x as many reps, each embedded and condensed.
     """
-    with SessionLocal() as session:
-        sent = {cid for (cid,) in session.query(SentCluster.cluster_id).all()}
-        cutoff = datetime.utcnow() - timedelta(days=7)
-
-        arts: List[Article] = (
-            session.query(Article)
-            .filter(
-                ((Article.published_at.is_not(None)) & (Article.published_at >= cutoff))
-                | ((Article.published_at.is_(None)) & (Article.discovered_at >= cutoff))
-            )
-            .order_by(Article.discovered_at.desc())
-            .limit(limit_articles)
-            .all()
+    if limit_articles is not None:
+        warnings.warn(
+            "select_cluster_reps(limit_articles=...) is deprecated: the value now counts clusters, "
+            "not articles, so it selects about 3x as many reps as before; pass limit= (e.g. limit_articles / 3)",
+            DeprecationWarning,
+            stacklevel=2,
         )
+        limit = limit_articles
+    with SessionLocal() as session:
+        return load_reps(session, unsent_recent_clusters(session, limit=limit))
+
+
+def _profile_sims(vecs: List[List[float]], profile_vecs: List[List[float]]) -> List[float]:
+    return [max(cosine_similarity(v, pv) for pv in profile_vecs) for v in vecs]
+
+
+def _full_inputs(arts: List[Article]) -> List[str]:
+    # For cost: only embed title + a token-budgeted condensed body (cached per article)
+    bodies = condensed_texts(
+        arts,
+        purpose="embed",
+        budget_tokens=settings.CONDENSE_EMBED_TOKENS,
+        model=EMBED_MODEL,
+    )
+    return [((a.title or "") + "\n" + bodies.get(a.id, ""))[:6000] for a in arts]
+
 
-    by_cluster: Dict[int, List[Article]] = {}
-    for a in arts:
-        if a.cluster_id is None:
-            continue
-        if a.cluster_id in sent:
-            continue
-        by_cluster.setdefault(a.cluster_id, []).append(a)
-
-    reps: Dict[int, Article] = {}
-    for cid, items in by_cluster.items():
-        # prefer with text
-        with_text = [x for x in items if x.text]
-        if with_text:
-            reps[cid] = with_text[0]
-        else:
-            reps[cid] = sorted(items, key=lambda x: x.discovered_at, reverse=True)[0]
-    return reps
-
-
-def filter_candidates_with_embeddings(top_k: int = 60) -> List[Candidate]:
-    profile_texts = _load_profile_texts()
-    profile_vecs = embed_texts(profile_texts)
-
-    reps = select_cluster_reps()
+def load_profile_vectors() -> List[List[float]]:
+    return embed_texts_cached(_load_profile_texts())
+
+
+def rank_candidates(
+    reps: Dict[int, Article],
+    profile_vecs: List[List[float]],
+    cascade_m: Optional[int] = None,
+) -> List[Candidate]:
+    """
+    Cluster representatives ranked by max cosine similarity to the profile vectors.
+    With cascade_m > 0 (default: settings.EMBED_CASCADE_M), ranking is two-stage:
+    titles only are embedded for every rep, and only the top `cascade_m` get the
+    full title + body embedding that decides the final order.
+    Embeddings are cached by input text, so unchanged reps are never re-embedded.
+    """
+    cascade_m = settings.EMBED_CASCADE_M if cascade_m is None else cascade_m
     rep_list = list(reps.values())
 
-    # For cost: only embed title + first chunk of text
-    rep_inputs = []
-    for a in rep_list:
-        blob = (a.title or "") + "\n" + (a.text or "")
-        rep_inputs.append(blob[:6000])
+    if 0 < cascade_m < len(rep_list):
+        title_vecs = embed_texts_cached([a.title or "(no title)" for a in rep_list], stage="embed_title")
+        title_sims = _profile_sims(title_vecs, profile_vecs)
+        order = sorted(range(len(rep_list)), key=lambda i: title_sims[i], reverse=True)
+        rep_list = [rep_list[i] for i in order[:cascade_m]]
 
-    rep_vecs = embed_texts(rep_inputs)
+    rep_vecs = embed_texts_cached(_full_inputs(rep_list))
 
     candidates: List[Candidate] = []
-    for a, v in zip(rep_list, rep_vecs):
-        sim = max(cosine_similarity(v, pv) for pv in profile_vecs)
+    for a, sim in zip(rep_list, _profile_sims(rep_vecs, profile_vecs)):
         candidates.append(
             Candidate(
                 cluster_id=int(a.cluster_id),
@@ -98,8 +110,16 @@ def filter_candidates_with_embeddings(top_k: int = 60) -> List[Candidate]:
                 source=a.source or "UNK",
                 title=a.title or "(no title)",
                 url=a.url,
+                article_id=a.id,
             )
         )
 
     candidates.sort(key=lambda c: c.similarity, reverse=True)
-    return candidates[:top_k]
\ No newline at end of file
+    return candidates
+
+
+def filter_candidates_with_embeddings(top_k: int = 60, cascade_m: Optional[int] = None) -> List[Candidate]:
+    """
+    Top `top_k` candidates, computed from scratch (within a pipeline run, use RunContext.candidates).
+    """
+    return rank_candidates(select_cluster_reps(), load_profile_vectors(), cascade_m)[:top_k]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.db import PipelineRun, SessionLocal
+
+# Stages of run_pipeline, in order. A run is finished once LAST_STAGE is done.
+STAGES = ("collect", "judge", "select", "brief", "send", "record_sent")
+LAST_STAGE = STAGES[-1]
+# Stages that must not run twice when a previous attempt died midway (the email may be out)
+NOT_REPEATABLE = {"send"}
+
+
+class StageInterrupted(RuntimeError):
+    pass
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False, default=str)
+
+
+class Checkpoints:
+    """
+    Per-stage status of one pipeline run, stored in pipeline_runs.
+    run(stage, fn) calls fn() once per run: a stage already done returns its stored
+    outputs instead, which is what --resume relies on. Outputs must be JSON-serializable.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+
+    def _row(self, session, stage: str) -> Optional[PipelineRun]:
+        return session.query(PipelineRun).filter_by(run_id=self.run_id, stage=stage).one_or_none()
+
+    def status(self, stage: str) -> Optional[str]:
+        with SessionLocal() as session:
+            row = self._row(session, stage)
+            return row.status if row else None
+
+    def outputs(self, stage: str) -> Any:
+        with SessionLocal() as session:
+            row = self._row(session, stage)
+            return json.loads(row.outputs_json) if row and row.outputs_json else None
+
+    def run(self, stage: str, fn: Callable[[], Any], inputs: Any = None, force: bool = False) -> Any:
+        with SessionLocal() as session:
+            row = self._row(session, stage)
+            if row is not None and row.status == "done":
+                print(f"⏭️ {stage}: done in an earlier attempt, reusing its outputs")
+                return json.loads(row.outputs_json) if row.outputs_json else None
+            if row is not None and row.status == "running" and stage in NOT_REPEATABLE and not force:
+                raise StageInterrupted(
+                    f"stage '{stage}' of run {self.run_id} started at {row.started_at:%Y-%m-%d %H:%M:%S} "
+                    "and never finished: it may have completed. Check, then resume with --force-send to repeat it."
+                )
+            if row is None:
+                row = PipelineRun(run_id=self.run_id, stage=stage)
+                session.add(row)
+            row.status = "running"
+            row.inputs_json = _dumps(inputs)
+            row.outputs_json = None
+            row.error = None
+            row.started_at = datetime.utcnow()
+            row.finished_at = row.duration_ms = None
+            session.commit()
+
+            t0 = time.perf_counter()
+            try:
+                out = fn()
+            except BaseException as e:
+                row.status = "failed"
+                row.error = f"{type(e).__name__}: {e}"[:512]
+                row.finished_at = datetime.utcnow()
+                row.duration_ms = (time.perf_counter() - t0) * 1000
+                session.commit()
+                raise
+            row.status = "done"
+            row.outputs_json = _dumps(out)
+            row.finished_at = datetime.utcnow()
+            row.duration_ms = (time.perf_counter() - t0) * 1000
+            stored = row.outputs_json
+            session.commit()
+        # stored outputs, so a fresh and a resumed run continue with the same values
+        return json.loads(stored) if stored else None
+
+
+def latest_unfinished_run() -> Optional[str]:
+    """
+    run_id of the most recent run, if it didn't reach LAST_STAGE.
+    """
+    with SessionLocal() as session:
+        run_id = (
+            session.query(PipelineRun.run_id)
+            .group_by(PipelineRun.run_id)
+            .order_by(func.min(PipelineRun.started_at).desc())
+            .limit(1)
+            .scalar()
+        )
+    if run_id is None or Checkpoints(run_id).status(LAST_STAGE) == "done":
+        return None
+    return run_id
+
+
+def sent_but_unrecorded() -> List[Tuple[str, List[int]]]:
+    """
+    (run_id, cluster ids) of runs whose email went out but whose clusters were never
+    recorded as sent: a new run would select and mail them again.
+    """
+    with SessionLocal() as session:
+        recorded = session.query(PipelineRun.run_id).filter(
+            PipelineRun.stage == "record_sent", PipelineRun.status == "done"
+        )
+        rows = (
+            session.query(PipelineRun)
+            .filter(PipelineRun.stage == "send", PipelineRun.status == "done", PipelineRun.run_id.not_in(recorded))
+            .order_by(PipelineRun.started_at)
+            .all()
+        )
+        out: List[Tuple[str, List[int]]] = []
+        for r in rows:
+            inputs: Dict[str, Any] = json.loads(r.inputs_json) if r.inputs_json else {}
+            out.append((r.run_id, [int(c) for c in inputs.get("cluster_ids", [])]))
+        return out
+
+
+def last_sent_at() -> Optional[datetime]:
+    """
+    When the most recent digest email went out (UTC), whichever process sent it.
+    """
+    with SessionLocal() as session:
+        return (
+            session.query(func.max(PipelineRun.finished_at))
+            .filter(PipelineRun.stage == "send", PipelineRun.status == "done")
+            .scalar()
+        )
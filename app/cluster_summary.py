@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, undefer
+
+from app.db import Article, ArticleAnalysis, ClusterSummary, SentCluster
+
+_CHUNK = 500  # cluster ids per IN (...) query
+
+
+def _chunks(ids: List[int]) -> Iterable[List[int]]:
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i : i + _CHUNK]
+
+
+def refresh_clusters(session: Session, cluster_ids: Iterable[Optional[int]]) -> int:
+    """
+    Recomputes the cluster_summary rows of `cluster_ids` from their member articles
+    (added to `session`, committed by the caller). Clusters with no members left are removed.
+    Returns the number of rows written.
+    """
+    ids = sorted({int(c) for c in cluster_ids if c is not None})
+    written = 0
+    for chunk in _chunks(ids):
+        members = (
+            session.query(
+                Article.id,
+                Article.cluster_id,
+                Article.text.is_not(None),
+                Article.country,
+                Article.source,
+                Article.published_at,
+                Article.discovered_at,
+            )
+            .filter(Article.cluster_id.in_(chunk))
+            .all()
+        )
+        best = dict(
+            session.query(Article.cluster_id, func.max(ArticleAnalysis.judge_score))
+            .join(ArticleAnalysis, ArticleAnalysis.article_id == Article.id)
+            .filter(Article.cluster_id.in_(chunk))
+            .group_by(Article.cluster_id)
+            .all()
+        )
+        sent = {c for (c,) in session.query(SentCluster.cluster_id).filter(SentCluster.cluster_id.in_(chunk)).distinct()}
+        rows: Dict[int, ClusterSummary] = {
+            r.cluster_id: r for r in session.query(ClusterSummary).filter(ClusterSummary.cluster_id.in_(chunk)).all()
+        }
+
+        by_cluster: Dict[int, list] = {}
+        for m in members:
+            by_cluster.setdefault(m[1], []).append(m)
+
+        for cid in chunk:
+            items = by_cluster.get(cid)
+            row = rows.get(cid)
+            if not items:
+                if row is not None:
+                    session.delete(row)
+                continue
+            # same choice as before: newest member with text, else newest member
+            items.sort(key=lambda m: m[6], reverse=True)
+            rep = next((m for m in items if m[2]), items[0])
+            published = [m[5] for m in items if m[5] is not None]
+
+            row = row or ClusterSummary(cluster_id=cid)
+            row.rep_article_id = rep[0]
+            row.has_text = bool(rep[2])
+            row.member_count = len(items)
+            row.country = rep[3]
+            row.source = rep[4]
+            row.first_seen_at = items[-1][6]
+            row.last_seen_at = items[0][6]
+            row.last_published_at = max(published) if published else None
+            row.best_judge_score = best.get(cid)
+            row.sent = cid in sent
+            session.add(row)
+            written += 1
+    return written
+
+
+def mark_sent(session: Session, cluster_ids: Iterable[int]) -> None:
+    ids = list({int(c) for c in cluster_ids})
+    if ids:
+        session.query(ClusterSummary).filter(ClusterSummary.cluster_id.in_(ids)).update(
+            {ClusterSummary.sent: True}, synchronize_session=False
+        )
+
+
+def recent_cluster(days: int = 7, now: Optional[datetime] = None):
+    """
+    Cluster with a member published (or, without a feed date, discovered) in the last `days` days.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    return func.coalesce(ClusterSummary.last_published_at, ClusterSummary.last_seen_at) >= cutoff
+
+
+def unsent_recent_clusters(session: Session, limit: int, days: Optional[int] = 7) -> List[ClusterSummary]:
+    """
+    Newest unsent clusters with activity in the last `days` days (days=None: any age),
+    in one indexed scan of compact rows.
+    """
+    q = session.query(ClusterSummary).filter(ClusterSummary.sent.is_(False))
+    if days is not None:
+        q = q.filter(recent_cluster(days))
+    return (
+        q
+        .order_by(ClusterSummary.last_seen_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def load_reps(session: Session, summaries: List[ClusterSummary], with_text: bool = False) -> Dict[int, Article]:
+    """
+    Representative Article of each summary, by cluster_id (primary-key lookups only).
+    Metadata only unless `with_text` (Article bodies are deferred).
+    """
+    rep_ids = [s.rep_article_id for s in summaries]
+    q = session.query(Article).filter(Article.id.in_(rep_ids))
+    if with_text:
+        q = q.options(undefer(Article.text))
+    arts = {a.id: a for a in q.all()} if rep_ids else {}
+    return {s.cluster_id: arts[s.rep_article_id] for s in summaries if s.rep_article_id in arts}
+
+
+def rebuild_all(session: Session) -> int:
+    ids = [c for (c,) in session.query(Article.cluster_id).filter(Article.cluster_id.is_not(None)).distinct()]
+    return refresh_clusters(session, ids)
+
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.db import Article, CondensedText, SessionLocal
+from app.queries import article_texts
+
+# Lines that are page furniture rather than reporting (EN + FR)
+_BOILERPLATE = re.compile(
+    r"(subscribe|sign up|newsletter|cookie|all rights reserved|advertisement|read more|follow us|"
+    r"click here|share this|related articles?|terms of (use|service)|privacy policy|"
+    r"abonnez-vous|inscrivez-vous|publicité|lire aussi|lire la suite|tous droits réservés)",
+    re.IGNORECASE,
+)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> Any:
+    """
+    tiktoken encoding for `model`, or None if tiktoken (or its BPE file) is unavailable.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # tiktoken downloads BPE files on first use; offline -> approximate
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    enc = _encoding(model)
+    if enc is None:
+        return math.ceil(len(text) / 4)  # ~4 chars per token for EN/FR prose
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _truncate_tokens(text: str, budget: int, model: str) -> str:
+    if budget <= 0:
+        return ""
+    enc = _encoding(model)
+    if enc is None:
+        return text[: budget * 4]
+    ids = enc.encode(text, disallowed_special=())
+    return text if len(ids) <= budget else enc.decode(ids[:budget])
+
+
+def _paragraphs(text: str) -> List[str]:
+    out: List[str] = []
+    seen = set()
+    for p in re.split(r"\n\s*\n|\n", text or ""):
+        p = p.strip()
+        if p and p not in seen:
+            seen.add(p)
+            out.append(p)
+    return out
+
+
+def _informativeness(p: str) -> float:
+    """
+    Cheap "how much news is in this paragraph" score: lexical variety, length,
+    numbers and named entities; page furniture scores negative.
+    """
+    if _BOILERPLATE.search(p) and len(p) < 300:
+        return -1.0
+    words = _WORD.findall(p)
+    n = len(words)
+    if n < 6:
+        return 0.05
+    variety = len({w.lower() for w in words}) / n
+    digits = sum(1 for w in words if any(ch.isdigit() for ch in w))
+    names = sum(1 for w in words[1:] if w[:1].isupper())
+    return variety * math.log1p(n) + 0.5 * min(digits, 5) / 5 + 0.5 * min(5.0 * names / n, 1.0)
+
+
+def condense(title: str, text: str, budget_tokens: int, model: str) -> str:
+    """
+    Article body cut down to `budget_tokens` (counted with `model`'s tokenizer, title included):
+    always keeps the lede, then the most informative paragraphs, in original order.
+    """
+    budget = budget_tokens - count_tokens(title or "", model)
+    if budget <= 0:
+        return ""
+    paras = [p for p in _paragraphs(text) if _informativeness(p) >= 0]
+    if not paras:
+        return _truncate_tokens(text or "", budget, model)
+
+    lede = _truncate_tokens(paras[0], budget, model)
+    kept = {0: lede}
+    used = count_tokens(lede, model)
+
+    ranked = sorted(range(1, len(paras)), key=lambda i: _informativeness(paras[i]), reverse=True)
+    for i in ranked:
+        cost = count_tokens(paras[i], model) + 1  # + paragraph break
+        if used + cost > budget:
+            continue
+        kept[i] = paras[i]
+        used += cost
+
+    return "\n\n".join(kept[i] for i in sorted(kept))
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def condensed_texts(
+    articles: Iterable[Article],
+    purpose: str,
+    budget_tokens: int,
+    model: str,
+    session: Optional[Session] = None,
+) -> Dict[int, str]:
+    """
+    Condensed bodies by article id, cached in `condensed_texts` per (article, purpose).
+    The cache entry is reused while the article text, budget and tokenizer are unchanged.
+    With `session`, new cache rows are added to it and committed by the caller.
+    Article bodies are loaded here by id, so `articles` may be metadata-only rows.
+    """
+    arts = list(articles)
+    if not arts:
+        return {}
+    if session is None:
+        with SessionLocal() as own:
+            out = condensed_texts(arts, purpose, budget_tokens, model, session=own)
+            own.commit()
+            return out
+
+    texts = article_texts(session, (a.id for a in arts))
+    arts = [a for a in arts if texts.get(a.id)]
+
+    tokenizer = model if _encoding(model) is not None else "approx"
+    out: Dict[int, str] = {}
+    cached: Dict[int, CondensedText] = {
+        r.article_id: r
+        for r in session.query(CondensedText)
+        .filter(CondensedText.purpose == purpose, CondensedText.article_id.in_([a.id for a in arts]))
+        .all()
+    }
+    for a in arts:
+        h = _text_hash(texts[a.id])
+        row: Optional[CondensedText] = cached.get(a.id)
+        if row and row.text_hash == h and row.budget_tokens == budget_tokens and row.tokenizer == tokenizer:
+            out[a.id] = row.text
+            continue
+
+        body = condense(a.title or "", texts[a.id], budget_tokens, model)
+        row = row or CondensedText(article_id=a.id, purpose=purpose)
+        row.text_hash = h
+        row.budget_tokens = budget_tokens
+        row.tokenizer = tokenizer
+        row.text = body
+        row.tokens = count_tokens(body, model)
+        session.add(row)
+        out[a.id] = body
+    return out
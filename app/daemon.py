@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import signal
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from app import llm_ledger, metrics
+from app.checkpoints import Checkpoints, StageInterrupted, last_sent_at
+from app.config import settings
+from app.db import init_db
+from app.pipeline import new_run_id, process_new_articles, resolve_run, send_digest, write_run_report
+from app.retention import run_retention
+from app.run_context import RunContext
+
+_DAYS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+
+Slot = Tuple[Optional[int], int, int]  # (weekday or None = every day, hour, minute)
+
+
+def _parse_hhmm(s: str) -> Tuple[int, int]:
+    h, m = s.strip().split(":")
+    h, m = int(h), int(m)
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise ValueError(f"bad time of day: {s!r}")
+    return h, m
+
+
+def parse_send_times(spec: str) -> List[Slot]:
+    """
+    "mon 07:00, thu 18:30, daily 12:00" -> [(0, 7, 0), (3, 18, 30), (None, 12, 0)]
+    """
+    slots: List[Slot] = []
+    for part in spec.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        day, _, hhmm = part.partition(" ")
+        if day != "daily" and day[:3] not in _DAYS:
+            raise ValueError(f"bad DAEMON_SEND_TIMES entry: {part!r} (expected e.g. 'mon 07:00' or 'daily 07:00')")
+        slots.append((None if day == "daily" else _DAYS[day[:3]], *_parse_hhmm(hhmm)))
+    return slots
+
+
+def _slots_on(d: date, slots: List[Slot]) -> List[datetime]:
+    return [datetime(d.year, d.month, d.day, h, m) for wd, h, m in slots if wd is None or wd == d.weekday()]
+
+
+def previous_send_time(now: datetime, slots: List[Slot]) -> Optional[datetime]:
+    past = [t for back in range(8) for t in _slots_on(now.date() - timedelta(days=back), slots) if t <= now]
+    return max(past, default=None)
+
+
+def next_send_time(now: datetime, slots: List[Slot]) -> Optional[datetime]:
+    future = [t for ahead in range(8) for t in _slots_on(now.date() + timedelta(days=ahead), slots) if t > now]
+    return min(future, default=None)
+
+
+def _utc_to_local(t: datetime) -> datetime:
+    return t.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+class Daemon:
+    """
+    Long-running process: processes new articles (ingest, extract, dedupe, judge)
+    every DAEMON_PROCESS_EVERY_MIN minutes and sends the digest at DAEMON_SEND_TIMES
+    from what is already judged, so sending only selects, writes the brief and mails.
+    One thread runs one job at a time; the DB pool, HTTP/LLM clients, tokenizers,
+    pre-judge model and profile vectors stay loaded between cycles.
+    Times are local. SIGINT/SIGTERM stop it after the current job.
+    """
+
+    def __init__(self, streaming: Optional[bool] = None):
+        self.streaming = streaming
+        self.slots = parse_send_times(settings.DAEMON_SEND_TIMES)
+        self.retention_at = _parse_hhmm(settings.DAEMON_RETENTION_TIME) if settings.DAEMON_RETENTION_TIME else None
+        self.ctx = RunContext()
+        self._stop = threading.Event()
+
+        now = datetime.now()
+        self.next_process = now
+        self.retry_at: Optional[datetime] = None
+        self.handled_slot: Optional[datetime] = None  # sent, given up or reported missed
+        self.pending_run: Optional[str] = None        # digest run to resume after a failure
+        # no retention catch-up at startup: it runs at the next DAEMON_RETENTION_TIME
+        self.retention_done: Optional[date] = now.date() if self._retention_passed(now) else None
+
+    def stop(self, *_args) -> None:
+        self._stop.set()
+
+    # --- scheduling ---
+
+    def _retention_passed(self, now: datetime) -> bool:
+        return self.retention_at is not None and (now.hour, now.minute) >= self.retention_at
+
+    def _digest_due(self, now: datetime) -> Optional[datetime]:
+        slot = previous_send_time(now, self.slots)
+        if slot is None or slot == self.handled_slot:
+            return None
+        if self.retry_at is not None and now < self.retry_at:
+            return None
+        sent = last_sent_at()
+        if sent is not None and _utc_to_local(sent) >= slot:
+            self.handled_slot = slot  # e.g. sent by a manual run_pipeline
+            return None
+        if now - slot > timedelta(minutes=settings.DAEMON_SEND_GRACE_MIN):
+            print(f"⚠️ Missed the digest of {slot:%a %Y-%m-%d %H:%M} (more than {settings.DAEMON_SEND_GRACE_MIN} min ago)")
+            self.handled_slot, self.pending_run = slot, None
+            return None
+        return slot
+
+    def _next_wakeup(self, now: datetime) -> datetime:
+        times = [self.next_process]
+        nxt = next_send_time(now, self.slots)
+        if nxt is not None:
+            times.append(nxt)
+        if self.retry_at is not None:
+            times.append(self.retry_at)
+        if self.retention_at is not None:
+            h, m = self.retention_at
+            t = now.replace(hour=h, minute=m, second=0, microsecond=0)
+            times.append(t if t > now else t + timedelta(days=1))
+        return min(times)
+
+    # --- jobs ---
+
+    def process(self) -> None:
+        metrics.reset()
+        run_id = new_run_id()
+        llm_ledger.set_run_id(run_id)
+        self.ctx.new_run(run_id)
+        t0 = time.perf_counter()
+        try:
+            process_new_articles(self.ctx, streaming=self.streaming)
+        except Exception as e:
+            print(f"❌ Processing cycle {run_id} failed: {type(e).__name__}: {e}")
+        finally:
+            write_run_report(run_id, "process")
+        print(f"🔄 Processing cycle {run_id} took {time.perf_counter() - t0:.1f}s")
+
+    def send(self, slot: datetime) -> None:
+        metrics.reset()
+        run_id = self.pending_run or resolve_run(None)
+        llm_ledger.set_run_id(run_id)
+        self.ctx.new_run(run_id)
+        t0 = time.perf_counter()
+        print(f"📬 Digest for {slot:%a %H:%M} (run {run_id})")
+        try:
+            send_digest(self.ctx, Checkpoints(run_id))
+            self.handled_slot, self.pending_run, self.retry_at = slot, None, None
+            print(f"✅ Digest sent in {time.perf_counter() - t0:.1f}s")
+        except StageInterrupted as e:
+            print(f"❌ {e}")  # needs a human: run_pipeline --resume RUN_ID [--force-send]
+            self.handled_slot, self.pending_run, self.retry_at = slot, None, None
+        except Exception as e:
+            self.pending_run = run_id
+            self.retry_at = datetime.now() + timedelta(minutes=settings.DAEMON_RETRY_MIN)
+            print(f"❌ Digest failed: {type(e).__name__}: {e} (retrying at {self.retry_at:%H:%M})")
+        finally:
+            write_run_report(run_id, "digest")
+
+    def retention(self) -> None:
+        try:
+            r = run_retention()
+            print(
+                f"🧹 Retention: {r.html_dropped} html dropped, {r.texts_archived} texts archived, "
+                f"{r.bytes_reclaimed / 1e6:.1f} MB reclaimed"
+            )
+        except Exception as e:
+            print(f"❌ Retention failed: {type(e).__name__}: {e}")
+
+    def run_forever(self) -> None:
+        init_db()
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        nxt = next_send_time(datetime.now(), self.slots)
+        digest = f"next digest {nxt:%a %Y-%m-%d %H:%M}" if nxt else "no digest send times configured"
+        print(f"🚀 Daemon started: processing every {settings.DAEMON_PROCESS_EVERY_MIN} min, {digest}")
+
+        while not self._stop.is_set():
+            now = datetime.now()
+            slot = self._digest_due(now)
+            if slot is not None:
+                self.send(slot)
+                continue
+            if now >= self.next_process:
+                # spaced from the cycle start, so cycles stay on an even cadence
+                self.next_process = now + timedelta(minutes=settings.DAEMON_PROCESS_EVERY_MIN)
+                self.process()
+                continue
+            if self._retention_passed(now) and self.retention_done != now.date():
+                self.retention_done = now.date()
+                self.retention()
+                continue
+            wait_s = (self._next_wakeup(now) - now).total_seconds()
+            self._stop.wait(timeout=min(max(wait_s, 1.0), 60.0))
+
+        print("👋 Daemon stopped.")
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
-from sqlalchemy import create_engine, String, DateTime, Integer, Text
+from sqlalchemy import create_engine, event, text as sql_text, Boolean, String, DateTime, Index, Integer, LargeBinary, Text, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
 from sqlalchemy import Float
 from app.config import settings
@@ -10,19 +10,35 @@ class Base(DeclarativeBase):
     pass
 
 
+RUBRIC_SCORE_FIELDS = ("your_relevance", "impact", "novelty", "credibility", "depth", "hype_risk")
+
+
 class Article(Base):
     __tablename__ = "articles"
+    __table_args__ = (
+        # extract queue: WHERE text IS NULL AND archived_at IS NULL ORDER BY discovered_at DESC
+        Index(
+            "ix_articles_extract_queue",
+            "discovered_at",
+            sqlite_where=sql_text("text IS NULL AND archived_at IS NULL"),
+            postgresql_where=sql_text("text IS NULL AND archived_at IS NULL"),
+        ),
+        # cluster_summary refresh: members of a cluster, newest first
+        Index("ix_articles_cluster_discovered", "cluster_id", "discovered_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     url: Mapped[str] = mapped_column(String(2048), unique=True, index=True)
     title: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     source: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
     country: Mapped[Optional[str]] = mapped_column(String(8), nullable=True)
-    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    discovered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    discovered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
 
-    raw_html: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Bodies are deferred: query(Article) loads metadata only. Paths that need the
+    # text say so (undefer(Article.text), load_reps(with_text=True), queries.article_texts).
+    raw_html: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)
+    text: Mapped[Optional[str]] = mapped_column(Text, nullable=True, deferred=True)
 
     fetch_status: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)   # ok / failed
     fetch_error: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
@@ -34,8 +50,22 @@ class Article(Base):
 
     cluster_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
+    # set when retention moved `text` to the archive (app/retention.py); such rows are not re-fetched
+    archived_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     # later: embedding, cluster_id, score, summary fields
 
+def rubric_values(j: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Typed rubric column values of a judge dict (see ArticleAnalysis.set_rubric).
+    """
+    out: Dict[str, Any] = {"is_relevant": bool(j.get("is_relevant", False))}
+    for k in RUBRIC_SCORE_FIELDS:
+        v = j.get(k)
+        out[k] = float(v) if isinstance(v, (int, float)) else None
+    return out
+
+
 class ArticleAnalysis(Base):
     __tablename__ = "article_analysis"
 
@@ -52,24 +82,231 @@ class ArticleAnalysis(Base):
     # LLM judge metadata
     judge_model: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     judge_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    judge_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    judge_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True, index=True)  # = final_score
+
+    # Typed copy of the judge rubric (NULL = not judged), so gates/ordering run in SQL
+    is_relevant: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
+    your_relevance: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    impact: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    novelty: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    credibility: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    depth: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    hype_risk: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # Set when the local pre-judge skipped the LLM call: fails the relevance gate until judged
+    prejudge_skipped: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_article_analysis_gate", "is_relevant", "your_relevance", "judge_score"),
+    )
+
+    def set_rubric(self, j: Dict[str, Any]) -> None:
+        """
+        Copies rubric fields from a judge dict onto the typed columns.
+        """
+        for k, v in rubric_values(j).items():
+            setattr(self, k, v)
+
 
 class SentCluster(Base):
     __tablename__ = "sent_clusters"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     cluster_id: Mapped[int] = mapped_column(Integer, index=True)
-    sent_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ClusterSummary(Base):
+    """
+    One row per cluster, kept up to date by dedupe / extract / judge / record_sent
+    (see app/cluster_summary.py), so ranking doesn't group Article rows in Python.
+    """
+
+    __tablename__ = "cluster_summary"
+    __table_args__ = (Index("ix_cluster_summary_sent_last_seen", "sent", "last_seen_at"),)
+
+    cluster_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    rep_article_id: Mapped[int] = mapped_column(Integer)  # newest member with text, else newest member
+    has_text: Mapped[bool] = mapped_column(Boolean, default=False)
+    member_count: Mapped[int] = mapped_column(Integer, default=0)
+    country: Mapped[Optional[str]] = mapped_column(String(8), nullable=True)   # of the rep
+    source: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)  # of the rep
+
+    first_seen_at: Mapped[datetime] = mapped_column(DateTime)  # min discovered_at
+    last_seen_at: Mapped[datetime] = mapped_column(DateTime)   # max discovered_at
+    last_published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    best_judge_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    sent: Mapped[bool] = mapped_column(Boolean, default=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CondensedText(Base):
+    __tablename__ = "condensed_texts"
+    __table_args__ = (UniqueConstraint("article_id", "purpose"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    article_id: Mapped[int] = mapped_column(Integer, index=True)
+    purpose: Mapped[str] = mapped_column(String(16))  # judge / embed
+
+    text_hash: Mapped[str] = mapped_column(String(64))  # sha256 of Article.text it was built from
+    budget_tokens: Mapped[int] = mapped_column(Integer)
+    tokenizer: Mapped[str] = mapped_column(String(64))
+    text: Mapped[str] = mapped_column(Text)
+    tokens: Mapped[int] = mapped_column(Integer)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class JudgeCache(Base):
+    __tablename__ = "judge_cache"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    cache_key: Mapped[str] = mapped_column(String(64), unique=True, index=True)  # see judge.judge_cache_key
+
+    judge_model: Mapped[str] = mapped_column(String(64))
+    prompt_version: Mapped[str] = mapped_column(String(64), index=True)
+    judge_json: Mapped[str] = mapped_column(Text)
+    judge_score: Mapped[float] = mapped_column(Float)
+
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_hit_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class LLMCall(Base):
+    __tablename__ = "llm_calls"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    run_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)
+    stage: Mapped[str] = mapped_column(String(32), index=True)  # judge / embed / brief / judge_batch ...
+    model: Mapped[str] = mapped_column(String(64))
+
+    input_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    output_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    cached_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    latency_ms: Mapped[float] = mapped_column(Float, default=0.0)  # wall time incl. retries
+    retries: Mapped[int] = mapped_column(Integer, default=0)
+    cost_usd: Mapped[float] = mapped_column(Float, default=0.0)  # estimate, see llm_ledger.MODEL_PRICES
+
+    ok: Mapped[bool] = mapped_column(Boolean, default=True)
+    error: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+
+class JudgeBatch(Base):
+    __tablename__ = "judge_batches"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    # provider-side ids (None until uploaded / submitted)
+    input_file_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    batch_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True, index=True)
+
+    # prepared / submitting / submitted / completed / ingested / failed / expired / cancelled
+    status: Mapped[str] = mapped_column(String(32), index=True, default="prepared")
+    input_path: Mapped[str] = mapped_column(String(1024))
+    manifest_json: Mapped[str] = mapped_column(Text)  # custom_id -> {article_id, cluster_id, similarity}
+    request_count: Mapped[int] = mapped_column(Integer, default=0)
+    ok_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    submitted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    ingested_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class PipelineRun(Base):
+    """
+    One row per (run, stage) of run_pipeline: status, inputs/outputs as JSON and timing,
+    so a failed run can be resumed from its last finished stage (see app/checkpoints.py).
+    """
+    __tablename__ = "pipeline_runs"
+    __table_args__ = (UniqueConstraint("run_id", "stage"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    run_id: Mapped[str] = mapped_column(String(64), index=True)
+    stage: Mapped[str] = mapped_column(String(32))
+    status: Mapped[str] = mapped_column(String(16), default="running")  # running / done / failed
+    inputs_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    outputs_json: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
+
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    duration_ms: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+
+class EmbeddingCache(Base):
+    __tablename__ = "embedding_cache"
+    __table_args__ = (UniqueConstraint("text_hash", "model"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    text_hash: Mapped[str] = mapped_column(String(64))  # sha256 of the embedded input
+    model: Mapped[str] = mapped_column(String(64))
+    dims: Mapped[int] = mapped_column(Integer)
+    vector: Mapped[bytes] = mapped_column(LargeBinary)  # float32, little-endian
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     
 
-engine = create_engine(settings.DATABASE_URL, future=True)
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(128))
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    if not url.startswith("postgresql"):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_S,
+        "pool_recycle": settings.DB_POOL_RECYCLE_S,
+        "pool_pre_ping": True,  # connections sit idle across long LLM calls
+    }
+
+
+engine = create_engine(settings.DATABASE_URL, future=True, **_engine_options(settings.DATABASE_URL))
+
+# SQLite tuning, applied to every new connection
+SQLITE_PRAGMAS = {
+    "auto_vacuum": "INCREMENTAL",  # only takes effect on a new DB; retention converts old ones
+    "journal_mode": "WAL",       # readers don't block the writer (judge workers, ledger flushes)
+    "synchronous": "NORMAL",     # safe with WAL, far fewer fsyncs than FULL
+    "cache_size": -64000,        # ~64 MB page cache (negative = KiB)
+    "mmap_size": 268435456,      # 256 MB memory-mapped reads
+    "busy_timeout": 5000,        # ms to wait for a lock instead of failing
+    "temp_store": "MEMORY",
+}
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_conn, _record) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    cur = dbapi_conn.cursor()
+    for k, v in SQLITE_PRAGMAS.items():
+        cur.execute(f"PRAGMA {k}={v}")
+    cur.close()
+
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
 def init_db() -> None:
-    Base.metadata.create_all(engine)
\ No newline at end of file
+    """
+    Creates missing tables, then applies pending schema migrations (app/migrations.py).
+    """
+    from app.migrations import upgrade
+
+    Base.metadata.create_all(engine)
+    upgrade()
@@ -3,14 +3,18 @@ from __future__ import annotations
 from typing import Dict, List, Optional, Tuple
 
 from rapidfuzz import fuzz
+from sqlalchemy import func
 
+from app.cluster_summary import refresh_clusters
 from app.db import Article, SessionLocal
+from app.metrics import timed
 
 
 def _norm(s: Optional[str]) -> str:
     return (s or "").strip().lower()
 
 
+@timed("dedupe.assign_clusters")
 def assign_clusters(limit: int = 200, threshold: int = 92) -> Tuple[int, int]:
     """
     Assign cluster_id based on fuzzy title similarity.
@@ -31,9 +35,11 @@ def assign_clusters(limit: int = 200, threshold: int = 92) -> Tuple[int, int]:
         # Only cluster things that have a title
         articles = [a for a in articles if a.title]
 
-        next_cluster_id = 1
+        # continue after the highest id ever used (restarting at 1 merged new stories into old clusters)
+        next_cluster_id = (session.query(func.max(Article.cluster_id)).scalar() or 0) + 1
         clustered = 0
         clusters_created = 0
+        touched: List[int] = []
 
         for i, a in enumerate(articles):
             if a.cluster_id is not None:
@@ -41,6 +47,7 @@ def assign_clusters(limit: int = 200, threshold: int = 92) -> Tuple[int, int]:
 
             # Start a new cluster with article a as the "seed"
             a.cluster_id = next_cluster_id
+            touched.append(next_cluster_id)
             clusters_created += 1
             clustered += 1
 
@@ -59,6 +66,8 @@ def assign_clusters(limit: int = 200, threshold: int = 92) -> Tuple[int, int]:
 
             next_cluster_id += 1
 
+        session.flush()
+        refresh_clusters(session, touched)
         session.commit()
 
         return clustered, clusters_created
\ No newline at end of file
@@ -1,28 +1,72 @@
 from __future__ import annotations
 
-from typing import List
+import hashlib
+from typing import Dict, List
 
 import numpy as np
-from openai import OpenAI
 
-from app.config import settings
+from app import llm_gateway
+from app.bulk import upsert
+from app.db import EmbeddingCache, SessionLocal
+from app.metrics import timed
 
 
-_EMBED_MODEL = "text-embedding-3-small"
+EMBED_MODEL = "text-embedding-3-small"
+_EMBED_TIMEOUT_S = 30.0
 
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
+@timed("embeddings.embed_texts")
+def embed_texts(texts: List[str], stage: str = "embed") -> List[List[float]]:
     """
     Returns a list of embedding vectors (list[float]) for each input string.
     """
-    if not settings.OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY missing. Add it to .env")
-
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-    resp = client.embeddings.create(model=_EMBED_MODEL, input=texts)
+    resp = llm_gateway.create_embeddings(stage=stage, model=EMBED_MODEL, input=texts, timeout=_EMBED_TIMEOUT_S)
     return [d.embedding for d in resp.data]
 
 
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def embed_texts_cached(texts: List[str], stage: str = "embed") -> List[List[float]]:
+    """
+    embed_texts() backed by the embedding_cache table (keyed by input hash + model):
+    only inputs never embedded before are sent to the API, each distinct one once.
+    """
+    if not texts:
+        return []
+    hashes = [_text_hash(t) for t in texts]
+    vecs: Dict[str, List[float]] = {}
+    with SessionLocal() as session:
+        for row in (
+            session.query(EmbeddingCache)
+            .filter(EmbeddingCache.model == EMBED_MODEL, EmbeddingCache.text_hash.in_(set(hashes)))
+            .all()
+        ):
+            vecs[row.text_hash] = np.frombuffer(row.vector, dtype="<f4").tolist()
+
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in vecs:
+                missing.setdefault(h, t)
+        if missing:
+            new = embed_texts(list(missing.values()), stage=stage)
+            rows = []
+            for h, v in zip(missing, new):
+                vecs[h] = v
+                rows.append(
+                    {
+                        "text_hash": h,
+                        "model": EMBED_MODEL,
+                        "dims": len(v),
+                        "vector": np.asarray(v, dtype="<f4").tobytes(),
+                    }
+                )
+            upsert(session, EmbeddingCache, rows, conflict_cols=["text_hash", "model"])
+            session.commit()
+    return [vecs[h] for h in hashes]
+
+
 def cosine_similarity(a: List[float], b: List[float]) -> float:
     """
     Cosine similarity in [-1, 1]. Higher = more similar.
@@ -1,82 +1,165 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 import httpx
 import trafilatura
+from sqlalchemy.orm import Session
 
+from app import metrics
+from app.cluster_summary import refresh_clusters
 from app.db import Article, SessionLocal
+from app.metrics import timed
 
 
-def fetch_and_extract(limit: int = 20, timeout_s: float = 20.0) -> tuple[int, int]:
+def extract_queue(session: Session, limit: int) -> List[Article]:
     """
-    Fetch HTML + extract main text for up to `limit` articles that don't have text yet.
-    Returns (ok_count, fail_count).
+    Newest articles we haven't extracted yet (served by the partial index ix_articles_extract_queue).
+    Articles whose text was archived by retention are not fetched again.
+    """
+    return (
+        session.query(Article)
+        .filter(Article.text.is_(None), Article.archived_at.is_(None))
+        .order_by(Article.discovered_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+}
+
+
+@dataclass
+class FetchResult:
+    """
+    Fetch + extraction outcome of one article, computed without a DB session
+    and written back by apply_results().
     """
+    article_id: int
+    url: str
+    fetch_status: str = "failed"
+    fetch_error: Optional[str] = None
+    fetched_at: Optional[datetime] = None
+    raw_html: Optional[str] = None
+    extract_status: Optional[str] = None
+    extract_error: Optional[str] = None
+    extracted_at: Optional[datetime] = None
+    text: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.extract_status == "ok"
+
+
+def http_client(timeout_s: float = 20.0) -> httpx.Client:
+    # one client (connection pool) per run; httpx.Client is safe to share between threads
+    return httpx.Client(follow_redirects=True, headers=HEADERS, timeout=timeout_s)
+
+
+@timed("http.fetch_article")
+def fetch_article(client: httpx.Client, article_id: int, url: str) -> FetchResult:
+    """
+    Downloads the article page. Network errors and HTTP >= 400 are recorded, not raised.
+    """
+    res = FetchResult(article_id=article_id, url=url)
+    try:
+        r = client.get(url)
+        res.raw_html = r.text
+        res.fetched_at = datetime.utcnow()
+        if r.status_code >= 400:
+            res.fetch_error = f"HTTP {r.status_code}"
+            return res
+        res.fetch_status = "ok"
+    except Exception as e:
+        res.fetch_error = str(e)[:500]
+        res.fetched_at = datetime.utcnow()
+    return res
+
+
+@timed("extract.extract_article")
+def extract_article(res: FetchResult) -> FetchResult:
+    """
+    Extracts the main text of a fetched page (no-op when the fetch failed).
+    """
+    if res.fetch_status != "ok":
+        return res
+    try:
+        text = trafilatura.extract(
+            res.raw_html,
+            url=res.url,
+            include_comments=False,
+            include_tables=False,
+        )
+        res.extracted_at = datetime.utcnow()
+        if text and len(text.strip()) > 200:
+            res.text = text.strip()
+            res.extract_status = "ok"
+        else:
+            res.extract_status = "failed"
+            res.extract_error = "empty_or_too_short"
+    except Exception as e:
+        res.extract_status = "failed"
+        res.extract_error = str(e)[:500]
+        res.extracted_at = datetime.utcnow()
+    return res
+
+
+def apply_results(session: Session, results: List[FetchResult]) -> tuple[int, int]:
+    """
+    Writes fetch/extract results to their articles and refreshes the affected cluster
+    summaries (has_text / rep). Committed by the caller. Returns (ok_count, fail_count).
+    """
+    if not results:
+        return (0, 0)
+    arts = {a.id: a for a in session.query(Article).filter(Article.id.in_([r.article_id for r in results]))}
     ok = 0
-    fail = 0
+    for res in results:
+        a = arts.get(res.article_id)
+        if a is None:  # pruned meanwhile
+            continue
+        a.fetch_status = res.fetch_status
+        a.fetched_at = res.fetched_at
+        if res.raw_html is not None:
+            a.raw_html = res.raw_html
+        if res.fetch_error:
+            a.fetch_error = res.fetch_error
+        if res.extract_status is not None:
+            a.extract_status = res.extract_status
+            a.xtracted_at = res.extracted_at
+        if res.extract_error:
+            a.extract_error = res.extract_error
+        if res.text is not None:
+            a.text = res.text
+        ok += res.ok
+    metrics.incr("articles.extracted", ok)
+    metrics.incr("articles.extract_failed", len(results) - ok)
+    session.flush()
+    refresh_clusters(session, (a.cluster_id for a in arts.values()))
+    return ok, len(results) - ok
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 "
-                      "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
-    }
 
+@timed("extract.fetch_and_extract")
+def fetch_and_extract(limit: int = 20, timeout_s: float = 20.0) -> tuple[int, int]:
+    """
+    Fetch HTML + extract main text for up to `limit` articles that don't have text yet.
+    Returns (ok_count, fail_count).
+    """
     with SessionLocal() as session:
-        # Pick articles we haven't extracted yet
-        rows = (
-            session.query(Article)
-            .filter(Article.text.is_(None))
-            .order_by(Article.discovered_at.desc())
-            .limit(limit)
-            .all()
-        )
+        queue = [(a.id, a.url) for a in extract_queue(session, limit)]
 
-        if not rows:
-            return (0, 0)
-
-        with httpx.Client(follow_redirects=True, headers=headers, timeout=timeout_s) as client:
-            for a in rows:
-                try:
-                    r = client.get(a.url)
-                    a.raw_html = r.text
-                    a.fetched_at = datetime.utcnow()
-                    if r.status_code >= 400:
-                        a.fetch_status = "failed"
-                        a.fetch_error = f"HTTP {r.status_code}"
-                        fail += 1
-                        continue
-                    a.fetch_status = "ok"
-                except Exception as e:
-                    a.fetch_status = "failed"
-                    a.fetch_error = str(e)[:500]
-                    a.fetched_at = datetime.utcnow()
-                    fail += 1
-                    continue
-
-                try:
-                    # Extract text
-                    text = trafilatura.extract(
-                        a.raw_html,
-                        url=a.url,
-                        include_comments=False,
-                        include_tables=False,
-                    )
-                    a.extracted_at = datetime.utcnow()
-                    if text and len(text.strip()) > 200:
-                        a.text = text.strip()
-                        a.extract_status = "ok"
-                        ok += 1
-                    else:
-                        a.extract_status = "failed"
-                        a.extract_error = "empty_or_too_short"
-                        fail += 1
-                except Exception as e:
-                    a.extract_status = "failed"
-                    a.extract_error = str(e)[:500]
-                    a.extracted_at = datetime.utcnow()
-                    fail += 1
+    if not queue:
+        return (0, 0)
 
+    with http_client(timeout_s) as client:
+        results = [extract_article(fetch_article(client, aid, url)) for aid, url in queue]
+
+    with SessionLocal() as session:
+        ok, fail = apply_results(session, results)
         session.commit()
 
-    return ok, fail
\ No newline at end of file
+    return ok, fail
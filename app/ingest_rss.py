@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, List, Tuple
 
 import feedparser
 import yaml
 
+from app import metrics
+from app.bulk import insert_new
 from app.db import Article, SessionLocal
+from app.metrics import timed
 
 # Path to RSS configuration
 SOURCES_PATH = Path("data/sources.yaml")
@@ -24,64 +28,90 @@ def _parse_datetime(entry: dict[str, Any]) -> datetime | None:
     return None
 
 
+@dataclass
+class FeedSource:
+    name: str
+    country: str
+    url: str
+
+
+def load_sources() -> List[FeedSource]:
+    """
+    RSS feeds listed in data/sources.yaml (invalid entries are skipped with a warning).
+    """
+    cfg = yaml.safe_load(SOURCES_PATH.read_text(encoding="utf-8")) or {}
+    sources: List[FeedSource] = []
+    for src in cfg.get("rss_sources", []):
+        name = (src.get("name") or "").strip()
+        country = (src.get("country") or "").strip()
+        url = (src.get("url") or "").strip()
+
+        if not (name and country and url):
+            print(f"⚠️ Skipping invalid source entry: {src}")
+            continue
+        sources.append(FeedSource(name, country, url))
+    return sources
+
+
+@timed("http.feed_rows")
+def feed_rows(src: FeedSource) -> List[Dict[str, Any]]:
+    """
+    Downloads and parses one feed. Returns one Article row per entry with a link.
+    """
+    feed = feedparser.parse(src.url)
+    if getattr(feed, "bozo", False):
+        err = getattr(feed, "bozo_exception", None)
+        print(f"⚠️ Feed parse issue for {src.name}: {err}")
+
+    rows: List[Dict[str, Any]] = []
+    for entry in feed.entries:
+        link = (entry.get("link") or "").strip()
+        if not link:
+            continue
+        rows.append(
+            {
+                "url": link,
+                "title": (entry.get("title") or "").strip() or None,
+                "source": src.name,
+                "country": src.country,
+                "published_at": _parse_datetime(entry),
+            }
+        )
+    return rows
+
+
+def insert_articles(rows: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+    """
+    Inserts unseen rows (distinct urls). Returns (id, url) of the articles that were new.
+    """
+    # Bulk INSERT ... ON CONFLICT (url) DO NOTHING instead of a SELECT per entry: duplicates already
+    # in the DB are skipped by the unique index, also when another worker inserts them concurrently
+    with SessionLocal() as session:
+        new = insert_new(session, Article, rows, conflict_cols=["url"], returning=("id", "url"))
+        session.commit()
+    metrics.incr("articles.added", len(new))
+    return [(r.id, r.url) for r in new]
+
+
 def ingest_rss() -> tuple[int, int]:
     """
     Fetch RSS feeds listed in data/sources.yaml and insert unseen items into DB.
     Returns (added_count, seen_count).
     """
-    cfg = yaml.safe_load(SOURCES_PATH.read_text(encoding="utf-8")) or {}
-    rss_sources = cfg.get("rss_sources", [])
-
-    added = 0
+    rows: list[dict[str, Any]] = []
     seen = 0
     seen_in_run: set[str] = set()
 
-    with SessionLocal() as session:
-        for src in rss_sources:
-            name = (src.get("name") or "").strip()
-            country = (src.get("country") or "").strip()
-            url = (src.get("url") or "").strip()
-
-            if not (name and country and url):
-                print(f"⚠️ Skipping invalid source entry: {src}")
+    for src in load_sources():
+        for row in feed_rows(src):
+            # Skip duplicates within the same run
+            if row["url"] in seen_in_run:
+                seen += 1
                 continue
+            seen_in_run.add(row["url"])
+            rows.append(row)
 
-            feed = feedparser.parse(url)
-            if getattr(feed, "bozo", False):
-                err = getattr(feed, "bozo_exception", None)
-                print(f"⚠️ Feed parse issue for {name}: {err}")
-
-            for entry in feed.entries:
-                link = (entry.get("link") or "").strip()
-                title = (entry.get("title") or "").strip() or None
-                published_at = _parse_datetime(entry)
-
-                if not link:
-                    continue
-
-                # Skip duplicates within the same run
-                if link in seen_in_run:
-                    seen += 1
-                    continue
-
-                # Skip duplicates already in DB
-                exists = session.query(Article.id).filter(Article.url == link).first()
-                if exists:
-                    seen += 1
-                    continue
-
-                session.add(
-                    Article(
-                        url=link,
-                        title=title,
-                        source=name,
-                        country=country,
-                        published_at=published_at,
-                    )
-                )
-                seen_in_run.add(link)
-                added += 1
-
-        session.commit()
+    added = len(insert_articles(rows))
+    seen += len(rows) - added
 
-    return added, seen
\ No newline at end of file
+    return added, seen
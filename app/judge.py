@@ -1,13 +1,14 @@
 from __future__ import annotations
 
+import hashlib
 import json
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from openai import OpenAI
-
-from app.config import settings
+from app import llm_gateway
+from app.metrics import timed
 
 JUDGE_MODEL = "gpt-4.1-mini"
+JUDGE_TIMEOUT_S = 45.0  # per article
 
 # JSON schema for structured outputs (stable keys, easy to store/debug)
 JUDGE_SCHEMA = {
@@ -33,6 +34,25 @@ JUDGE_SCHEMA = {
 }
 
 
+# Several articles per request: one verdict per article, keyed by the id we send
+JUDGE_GROUP_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "verdicts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {"id": {"type": "string"}, **JUDGE_SCHEMA["properties"]},
+                "required": ["id", *JUDGE_SCHEMA["required"]],
+            },
+        }
+    },
+    "required": ["verdicts"],
+}
+
+
 def compute_final_score(j: Dict[str, Any]) -> float:
     """
     Final score in [0, 10] computed deterministically from the rubric.
@@ -49,16 +69,10 @@ def compute_final_score(j: Dict[str, Any]) -> float:
     return max(0.0, min(10.0, score))
 
 
-def judge_article(title: str, text: str) -> Dict[str, Any]:
-    if not settings.OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY missing. Add it to .env")
-
-    client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-    content = (title or "") + "\n\n" + (text or "")
-    content = content[:8000]  # cost guard
-
-    prompt = f"""
+# Static prompt prefix, sent as the developer message of every judge request.
+# Provider-side prompt caching matches on an exact prefix (>= 1024 tokens), so
+# nothing per-article may appear here: the article goes in the user message.
+JUDGE_INSTRUCTIONS = """
 You are scoring news articles for a personal tech/AI digest.
 Return JSON matching the provided schema.
 
@@ -67,25 +81,235 @@ Scoring guidance:
 - Prefer high scores for: concrete new info, real product/technical substance, credible reporting.
 - Penalize hype and shallow takes.
 
+Rubric (every score is a number from 0 to 10):
+- "your_relevance": fit with the reader's interests: AI models and agents, ML engineering,
+  developer tools, AI in health and biotech, tech startups and funding. 0-2 = off-topic,
+  3-5 = tangential (AI mentioned in passing), 6-8 = clearly on-topic, 9-10 = core interest.
+- "impact": how much the news changes things for builders, companies or users.
+  A minor feature update is 2-3; a major model release, regulation or large acquisition is 7-9.
+- "novelty": genuinely new information. Rewrites of older news, recaps and opinion without
+  new facts score low; first reports of launches, results or deals score high.
+- "credibility": sourcing quality. Named sources, data, documents and on-the-record quotes
+  score high; anonymous rumours, press-release rewrites and unverified claims score low.
+- "depth": technical or business substance (numbers, architecture, methodology, terms of a deal).
+  A 3-paragraph news brief is 2-4; an in-depth analysis with specifics is 7-9.
+- "hype_risk": how much the piece oversells. Superlatives without evidence, "revolutionary"
+  claims, vague AGI talk and benchmark cherry-picking score high. Sober reporting scores 0-2.
+- "topics": 1-5 short lowercase topic labels (e.g. "llm", "agents", "funding", "health ai").
+- "one_sentence_takeaway": the single most important fact, in one plain sentence (max 30 words).
+- "why_it_matters": up to 3 short reasons the reader should care; empty if not relevant.
+
+Rules:
+- Judge only from the article content you are given; do not use outside knowledge to add facts.
+- If the text is empty, truncated or paywalled, judge from the title and keep "depth" and
+  "credibility" conservative (<= 4).
+- Articles may be in English or French; always answer in English.
+- Score each field independently; do not inflate scores because the topic is relevant.
+
+Example 1
+Article:
+Mistral releases open-weight 24B model with 128k context
+
+Paris-based Mistral AI released a 24-billion-parameter model under the Apache 2.0 licence on
+Tuesday. The company published benchmark results and a technical report describing the training
+data mix and a sliding-window attention variant. Weights are available for download.
+Verdict:
+{"is_relevant": true, "topics": ["llm", "open source", "mistral"], "your_relevance": 9, "impact": 7,
+"novelty": 8, "credibility": 8, "depth": 6, "hype_risk": 2,
+"one_sentence_takeaway": "Mistral released an Apache-licensed 24B open-weight model with 128k context and a technical report.",
+"why_it_matters": ["Strong open-weight option for self-hosting", "Permissive licence allows commercial use"]}
+
+Example 2
 Article:
-{content}
+10 AI tools that will change your life forever
+
+AI is revolutionizing everything. Here are ten apps you need to try today, from chatbots to
+photo editors. Number 7 will blow your mind.
+Verdict:
+{"is_relevant": true, "topics": ["ai tools"], "your_relevance": 3, "impact": 1, "novelty": 1,
+"credibility": 2, "depth": 1, "hype_risk": 9,
+"one_sentence_takeaway": "A listicle of consumer AI apps with no new information.",
+"why_it_matters": []}
+
+Example 3
+Article:
+Council approves new bike lanes downtown
+
+The city council voted 7-2 to add protected bike lanes on three downtown streets, with
+construction expected next spring.
+Verdict:
+{"is_relevant": false, "topics": ["local news", "transport"], "your_relevance": 0, "impact": 2,
+"novelty": 5, "credibility": 7, "depth": 3, "hype_risk": 0,
+"one_sentence_takeaway": "A city council approved protected bike lanes on three downtown streets.",
+"why_it_matters": []}
+
+Example 4
+Article:
+La start-up française Nabla lève 24 millions d'euros pour son assistant médical
+
+Nabla, qui développe un assistant d'IA générant les comptes rendus de consultation, annonce une
+levée de fonds de série B menée par un fonds américain. L'outil est déjà utilisé par plusieurs
+milliers de médecins en France et aux États-Unis, selon l'entreprise.
+Verdict:
+{"is_relevant": true, "topics": ["health ai", "funding", "startups"], "your_relevance": 8, "impact": 5,
+"novelty": 7, "credibility": 6, "depth": 4, "hype_risk": 2,
+"one_sentence_takeaway": "French health-AI startup Nabla raised a EUR 24M Series B for its clinical note-taking assistant.",
+"why_it_matters": ["Shows investor demand for clinical AI assistants", "European health-AI player scaling into the US"]}
 """.strip()
 
-    resp = client.responses.create(
-        model=JUDGE_MODEL,
-        input=prompt,
-        text={
-        "format": {
-            "type": "json_schema",
-            "name": "article_judge",
-            "schema": JUDGE_SCHEMA,
-            "strict": True,
-        }
-    },
+# Extra static instructions for multi-article requests (appended to the prefix, still static)
+JUDGE_GROUP_INSTRUCTIONS = (
+    "The user message contains several articles, each under an \"### Article id=...\" header. "
+    "Score each article independently. Return exactly one verdict per article, "
+    "with `id` copied from its header."
 )
 
-    # The SDK returns the JSON as text; parse it
-    out = resp.output_text
+# Bump when the scoring guidance changes meaning (cached verdicts are keyed by it).
+# Edits to JUDGE_INSTRUCTIONS / JUDGE_SCHEMA change the fingerprint automatically.
+JUDGE_PROMPT_VERSION = "v2"
+JUDGE_CACHE_VERSION = JUDGE_PROMPT_VERSION + ":" + hashlib.sha256(
+    (JUDGE_INSTRUCTIONS + json.dumps(JUDGE_SCHEMA, sort_keys=True)).encode("utf-8")
+).hexdigest()[:12]
+
+# Prompt caching only applies to prompts of at least this many tokens: the static
+# prefix (JUDGE_INSTRUCTIONS) must stay above it (tests/test_prompts.py checks)
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Routes requests sharing the static prefix to the same prompt-cache shard
+JUDGE_PROMPT_CACHE_KEY = "judge-" + JUDGE_CACHE_VERSION
+
+
+def judge_content(title: str, text: str) -> str:
+    """
+    The article content exactly as it is sent to the judge.
+    """
+    content = (title or "") + "\n\n" + (text or "")
+    return content[:8000]  # cost guard
+
+
+def judge_cache_key(title: str, text: str) -> str:
+    """
+    Cache key for a verdict: judge model + prompt version + normalized content hash.
+    Whitespace/case-only differences (re-posts, AMP variants) map to the same key.
+    """
+    normalized = " ".join(judge_content(title, text).lower().split())
+    h = hashlib.sha256()
+    for part in (JUDGE_MODEL, JUDGE_CACHE_VERSION, normalized):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _judge_input(title: str, text: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "developer", "content": JUDGE_INSTRUCTIONS},
+        {"role": "user", "content": "Article:\n" + judge_content(title, text)},
+    ]
+
+
+def build_judge_request(title: str, text: str) -> Dict[str, Any]:
+    """
+    Request body for the Responses API (used as-is by the sync and batch paths).
+    Static prefix first (schema + developer message), article last, for prompt caching.
+    """
+    return {
+        "model": JUDGE_MODEL,
+        "input": _judge_input(title, text),
+        "prompt_cache_key": JUDGE_PROMPT_CACHE_KEY,
+        "text": {
+            "format": {
+                "type": "json_schema",
+                "name": "article_judge",
+                "schema": JUDGE_SCHEMA,
+                "strict": True,
+            }
+        },
+    }
+
+
+def parse_judge_output(out: str) -> Dict[str, Any]:
     data = json.loads(out)
     data["final_score"] = compute_final_score(data)
-    return data
\ No newline at end of file
+    return data
+
+
+def validate_verdict(j: Dict[str, Any]) -> bool:
+    """
+    True if `j` has every rubric key with a usable type/range (structured outputs
+    guarantee the shape per request, not that each array item is sane).
+    """
+    if not isinstance(j, dict) or any(k not in j for k in JUDGE_SCHEMA["required"]):
+        return False
+    if not isinstance(j["is_relevant"], bool):
+        return False
+    for k, spec in JUDGE_SCHEMA["properties"].items():
+        if spec["type"] != "number":
+            continue
+        v = j[k]
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            return False
+        if not spec["minimum"] <= v <= spec["maximum"]:
+            return False
+    return True
+
+
+def _judge_group_input(items: List[Tuple[str, str, str]]) -> List[Dict[str, str]]:
+    blocks = [f"### Article id={aid}\n{judge_content(title, text)}" for aid, title, text in items]
+    return [
+        {"role": "developer", "content": JUDGE_INSTRUCTIONS + "\n\n" + JUDGE_GROUP_INSTRUCTIONS},
+        {"role": "user", "content": "\n\n".join(blocks)},
+    ]
+
+
+def build_judge_group_request(items: List[Tuple[str, str, str]]) -> Dict[str, Any]:
+    """
+    One Responses API request for several (id, title, text) articles.
+    """
+    return {
+        "model": JUDGE_MODEL,
+        "input": _judge_group_input(items),
+        "prompt_cache_key": JUDGE_PROMPT_CACHE_KEY + "-group",
+        "text": {
+            "format": {
+                "type": "json_schema",
+                "name": "article_judge_group",
+                "schema": JUDGE_GROUP_SCHEMA,
+                "strict": True,
+            }
+        },
+    }
+
+
+def parse_judge_group_output(out: str, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Splits a group response into verdicts by id. Unknown, duplicated or invalid
+    verdicts are dropped, so callers can fall back to single calls for missing ids.
+    """
+    wanted = set(ids)
+    seen: Dict[str, int] = {}
+    verdicts: Dict[str, Dict[str, Any]] = {}
+    for v in json.loads(out).get("verdicts", []):
+        aid = str(v.pop("id", ""))
+        seen[aid] = seen.get(aid, 0) + 1
+        if aid in wanted and validate_verdict(v):
+            v["final_score"] = compute_final_score(v)
+            verdicts[aid] = v
+    return {aid: v for aid, v in verdicts.items() if seen[aid] == 1}
+
+
+@timed("judge.judge_articles")
+def judge_articles(items: List[Tuple[str, str, str]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Judges several (id, title, text) articles in one call.
+    Returns verdicts by id; ids that failed validation are missing from the result.
+    """
+    resp = llm_gateway.create_response(stage="judge", timeout=JUDGE_TIMEOUT_S * len(items), **build_judge_group_request(items))
+    return parse_judge_group_output(resp.output_text, [aid for aid, _, _ in items])
+
+
+@timed("judge.judge_article")
+def judge_article(title: str, text: str) -> Dict[str, Any]:
+    resp = llm_gateway.create_response(stage="judge", timeout=JUDGE_TIMEOUT_S, **build_judge_request(title, text))
+
+    # The SDK returns the JSON as text; parse it
+    return parse_judge_output(resp.output_text)
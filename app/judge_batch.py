@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from openai import OpenAI
+from sqlalchemy.orm import Session
+
+from app import judge_cache, llm_gateway, llm_ledger
+from app.analyze_candidates import (
+    collect_judge_jobs,
+    judgement_values,
+    resolve_from_cache,
+    skip_by_prejudge,
+    write_judgements,
+)
+from app.candidate_filter import Candidate
+from app.cluster_summary import refresh_clusters
+from app.config import settings
+from app.db import JudgeBatch, SessionLocal
+from app.judge import JUDGE_MODEL, build_judge_request, parse_judge_output
+from app.judge_executor import JudgeJob
+from app.run_context import RunContext
+
+BATCH_DIR = Path("batches")
+BATCH_ENDPOINT = "/v1/responses"
+
+# Provider statuses after which a batch will not change anymore
+_TERMINAL = {"completed", "failed", "expired", "cancelled"}
+# Statuses that still need work (submit or poll + ingest). "submitting": the batch may
+# have been created remotely without its id being recorded (crash in between)
+_OPEN = {"prepared", "submitting", "submitted", "validating", "in_progress", "finalizing", "cancelling"}
+
+
+@dataclass
+class BatchState:
+    status: str
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+
+
+class BatchTransport(Protocol):
+    """
+    Minimal OpenAI Batch-style interface. OpenAIBatchTransport(base_url=...) drives
+    the flow against any compatible server, e.g. the local stand-in of
+    scripts.bench_corpus (see scripts.check_batch_resume).
+    """
+
+    def upload(self, path: Path) -> str: ...
+
+    def create(self, input_file_id: str) -> str: ...
+
+    def find(self, input_file_id: str) -> Optional[str]: ...
+
+    def retrieve(self, batch_id: str) -> BatchState: ...
+
+    def download(self, file_id: str) -> str: ...
+
+
+class OpenAIBatchTransport:
+    """
+    Batch transport backed by the OpenAI SDK. `base_url` points it at any
+    OpenAI-compatible server (e.g. a local stand-in).
+    """
+
+    def __init__(self, client: Optional[OpenAI] = None, base_url: Optional[str] = None):
+        if client is None and base_url:
+            if not settings.OPENAI_API_KEY:
+                raise ValueError("OPENAI_API_KEY missing. Add it to .env")
+            client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=base_url)
+        self.client = client or llm_gateway.get_client()
+
+    def upload(self, path: Path) -> str:
+        with open(path, "rb") as f:
+            return self.client.files.create(file=f, purpose="batch").id
+
+    def create(self, input_file_id: str) -> str:
+        b = self.client.batches.create(
+            input_file_id=input_file_id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+        )
+        return b.id
+
+    def find(self, input_file_id: str) -> Optional[str]:
+        """
+        Id of an existing batch created from `input_file_id` (newest batches come first).
+        """
+        for b in self.client.batches.list(limit=100):
+            if b.input_file_id == input_file_id:
+                return b.id
+        return None
+
+    def retrieve(self, batch_id: str) -> BatchState:
+        b = self.client.batches.retrieve(batch_id)
+        return BatchState(status=b.status, output_file_id=b.output_file_id, error_file_id=b.error_file_id)
+
+    def download(self, file_id: str) -> str:
+        return self.client.files.content(file_id).text
+
+
+def _custom_id(article_id: int) -> str:
+    return f"article-{article_id}"
+
+
+def _output_text(body: Dict[str, Any]) -> str:
+    """
+    Responses API body -> concatenated output text (the batch file has no SDK `output_text` helper).
+    """
+    if body.get("output_text"):
+        return body["output_text"]
+    parts: List[str] = []
+    for item in body.get("output") or []:
+        for c in item.get("content") or []:
+            if c.get("type") == "output_text":
+                parts.append(c.get("text", ""))
+    return "".join(parts)
+
+
+def prepare_batch(top_k: int = 500, max_items: int = 1000) -> Optional[int]:
+    """
+    Writes a JSONL batch file for up to `max_items` unjudged candidates and records it
+    as a 'prepared' JudgeBatch. Articles already in an open batch are skipped.
+    Returns the JudgeBatch id, or None if there is nothing to judge.
+    """
+    ctx = RunContext()
+    candidates: List[Candidate] = ctx.candidates(top_k=top_k)
+    reps = ctx.reps()
+
+    with SessionLocal() as session:
+        in_flight: set[int] = set()
+        for b in session.query(JudgeBatch).filter(JudgeBatch.status.in_(_OPEN)).all():
+            in_flight.update(int(m["article_id"]) for m in json.loads(b.manifest_json).values())
+
+        jobs = collect_judge_jobs(session, candidates, reps, exclude_article_ids=in_flight)
+        jobs, hits = resolve_from_cache(session, jobs)
+        session.commit()
+        if hits:
+            print(f"🧠 Batch judge: reused {hits} cached verdicts")
+        jobs, skipped = skip_by_prejudge(session, jobs, reps)
+        session.commit()
+        if skipped:
+            print(f"🧠 Batch judge: pre-judge skipped {skipped} candidates")
+
+        # one request per distinct content; duplicates get the cached verdict on the next run
+        unique: Dict[str, JudgeJob] = {}
+        for job in jobs:
+            unique.setdefault(job.cache_key, job)
+        jobs = list(unique.values())[:max_items]
+        if not jobs:
+            return None
+
+        BATCH_DIR.mkdir(parents=True, exist_ok=True)
+        path = BATCH_DIR / f"judge-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.jsonl"
+
+        manifest: Dict[str, Dict[str, Any]] = {}
+        with open(path, "w", encoding="utf-8") as f:
+            for job in jobs:
+                cid = _custom_id(job.article_id)
+                line = {
+                    "custom_id": cid,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": build_judge_request(job.title, job.text),
+                }
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+                manifest[cid] = {
+                    "article_id": job.article_id,
+                    "cluster_id": job.cluster_id,
+                    "similarity": job.similarity,
+                    "cache_key": job.cache_key,
+                }
+
+        row = JudgeBatch(
+            status="prepared",
+            input_path=str(path),
+            manifest_json=json.dumps(manifest),
+            request_count=len(jobs),
+        )
+        session.add(row)
+        session.commit()
+        return row.id
+
+
+def _submit(session: Session, row: JudgeBatch, transport: BatchTransport) -> None:
+    """
+    Uploads the input file and creates the provider batch, committing before each
+    remote side effect so a crash at any point never creates (and pays for) a batch twice.
+    """
+    if not row.input_file_id:
+        row.input_file_id = transport.upload(Path(row.input_path))
+        session.commit()  # don't re-upload if we crash before the batch is created
+    batch_id = None
+    if row.status == "submitting":
+        # an earlier run may have crashed between create() and recording the id
+        batch_id = transport.find(row.input_file_id)
+    else:
+        row.status = "submitting"
+        session.commit()
+    row.batch_id = batch_id or transport.create(row.input_file_id)
+    row.status = "submitted"
+    row.submitted_at = datetime.utcnow()
+    session.commit()  # a resume after this point polls the batch instead of creating a second one
+
+
+def _ingest(session: Session, row: JudgeBatch, output: str) -> Tuple[int, int]:
+    """
+    Adds the verdicts of a completed batch to ArticleAnalysis (committed by the caller
+    together with the batch status, so a crash never ingests twice).
+    Returns (ok_count, error_count).
+    """
+    manifest: Dict[str, Dict[str, Any]] = json.loads(row.manifest_json)
+    verdicts: Dict[str, Dict[str, Any]] = {}
+
+    for ln in output.splitlines():
+        if not ln.strip():
+            continue
+        rec = json.loads(ln)
+        cid = rec.get("custom_id")
+        resp = rec.get("response") or {}
+        if cid not in manifest or rec.get("error") or resp.get("status_code") != 200:
+            continue
+        body = resp.get("body") or {}
+        input_tokens, output_tokens, cached_tokens = llm_ledger.usage_of(body)
+        llm_ledger.record(
+            stage="judge_batch",
+            model=JUDGE_MODEL,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens,
+            discount=llm_ledger.BATCH_DISCOUNT,
+        )
+        try:
+            verdicts[cid] = parse_judge_output(_output_text(body))
+        except Exception:
+            continue
+
+    # anything in the manifest without a usable verdict (error line or missing line) counts as an error
+    errors = len(manifest) - len(verdicts)
+
+    rows = []
+    for cid, j in verdicts.items():
+        m = manifest[cid]
+        rows.append(judgement_values(int(m["article_id"]), int(m["cluster_id"]), j, m.get("similarity")))
+        if m.get("cache_key"):
+            judge_cache.store(session, m["cache_key"], j)
+    # articles judged meanwhile by the sync path keep that verdict
+    write_judgements(session, rows, only_unjudged=True)
+
+    session.flush()
+    refresh_clusters(session, (int(manifest[cid]["cluster_id"]) for cid in verdicts))
+    return len(verdicts), errors
+
+
+def advance_batch(batch_pk: int, transport: BatchTransport) -> str:
+    """
+    Moves one JudgeBatch forward by one step (submit / poll / ingest) and persists
+    its state, so the flow can stop and resume at any point. Returns the new status.
+    """
+    with SessionLocal() as session:
+        row = session.get(JudgeBatch, batch_pk)
+        if row is None:
+            raise ValueError(f"Unknown judge batch {batch_pk}")
+
+        if row.status in ("prepared", "submitting"):
+            _submit(session, row, transport)
+        elif row.status in _OPEN:
+            state = transport.retrieve(row.batch_id)
+            row.status = state.status
+            if state.status in _TERMINAL:
+                row.completed_at = datetime.utcnow()
+            if state.status == "completed" and not state.output_file_id:
+                row.status = "failed"
+                row.error = "completed without output file"
+            elif state.status == "completed":
+                output = transport.download(state.output_file_id)
+                row.ok_count, row.error_count = _ingest(session, row, output)
+                row.status = "ingested"
+                row.ingested_at = datetime.utcnow()
+        session.commit()
+        return row.status
+
+
+def open_batches() -> List[int]:
+    with SessionLocal() as session:
+        return [
+            pk for (pk,) in session.query(JudgeBatch.id)
+            .filter(JudgeBatch.status.in_(_OPEN))
+            .order_by(JudgeBatch.id)
+            .all()
+        ]
+
+
+def run_batch_judging(
+    transport: Optional[BatchTransport] = None,
+    top_k: int = 500,
+    max_items: int = 1000,
+    poll_interval_s: float = 60.0,
+    wait: bool = True,
+) -> int:
+    """
+    Resumes any open batches, otherwise prepares and submits a new one.
+    With wait=True, polls until every open batch is done and ingested.
+    Returns how many new judgements were ingested.
+    """
+    transport = transport or OpenAIBatchTransport()
+
+    pks = open_batches()
+    if not pks:
+        pk = prepare_batch(top_k=top_k, max_items=max_items)
+        if pk is None:
+            return 0
+        pks = [pk]
+
+    ingested = 0
+    while pks:
+        still_open: List[int] = []
+        for pk in pks:
+            status = advance_batch(pk, transport)
+            if status == "ingested":
+                with SessionLocal() as session:
+                    ingested += session.get(JudgeBatch, pk).ok_count or 0
+            elif status not in _TERMINAL:
+                still_open.append(pk)
+            else:
+                print(f"⚠️ Judge batch {pk} ended with status={status}")
+        pks = still_open
+        if pks and not wait:
+            break
+        if pks:
+            time.sleep(poll_interval_s)
+
+    return ingested
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable
+
+from sqlalchemy.orm import Session
+
+from app.bulk import upsert
+from app.db import JudgeCache
+from app.judge import JUDGE_CACHE_VERSION, JUDGE_MODEL
+
+
+def lookup(session: Session, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Returns cached verdicts (judge dicts incl. final_score) by cache key, and bumps their hit counters.
+    """
+    keys = list(set(keys))
+    if not keys:
+        return {}
+
+    rows = session.query(JudgeCache).filter(JudgeCache.cache_key.in_(keys)).all()
+    now = datetime.utcnow()
+    out: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        out[r.cache_key] = json.loads(r.judge_json)
+        r.hits = (r.hits or 0) + 1
+        r.last_hit_at = now
+    return out
+
+
+def store(session: Session, key: str, j: Dict[str, Any]) -> None:
+    """
+    Adds a verdict to the cache (no-op if the key is already cached, also when
+    another worker stored it concurrently).
+    """
+    upsert(
+        session,
+        JudgeCache,
+        [
+            {
+                "cache_key": key,
+                "judge_model": JUDGE_MODEL,
+                "prompt_version": JUDGE_CACHE_VERSION,
+                "judge_json": json.dumps(j, ensure_ascii=False),
+                "judge_score": float(j["final_score"]),
+            }
+        ],
+        conflict_cols=["cache_key"],
+    )
+
+
+def prune_stale(session: Session) -> int:
+    """
+    Deletes entries written by another judge model or prompt/schema version.
+    They can never be hit again (the key includes both), so this only reclaims space.
+    """
+    return (
+        session.query(JudgeCache)
+        .filter((JudgeCache.prompt_version != JUDGE_CACHE_VERSION) | (JudgeCache.judge_model != JUDGE_MODEL))
+        .delete(synchronize_session=False)
+    )
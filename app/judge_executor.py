@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, TypeVar
+
+from app.judge import judge_article, judge_articles
+
+T = TypeVar("T")
+
+
+@dataclass
+class JudgeJob:
+    article_id: int
+    cluster_id: int
+    similarity: float
+    title: str
+    text: str
+    cache_key: str = ""
+
+
+@dataclass
+class JudgeResult:
+    job: JudgeJob
+    verdict: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+    deferred: bool = False  # not attempted: the request budget was spent (judged on a later run)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills `rate_per_s` tokens per second, holds at most `capacity`.
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate_per_s: float, capacity: float = 1.0):
+        self.rate_per_s = max(rate_per_s, 1e-6)
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate_per_s)
+        self._last = now
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait_s = (tokens - self._tokens) / self.rate_per_s
+            time.sleep(wait_s)
+
+
+# Network/429/5xx errors are retried inside llm_gateway; here we only retry bad model output
+_BAD_OUTPUT_ERRORS = (json.JSONDecodeError, KeyError, TypeError)
+
+
+def retry_with_jitter(
+    fn: Callable[[], T],
+    max_retries: int = 3,
+    base_delay_s: float = 1.0,
+    max_delay_s: float = 20.0,
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+) -> T:
+    """
+    Calls fn(), retrying on `retry_on` errors with exponential backoff + full jitter.
+    Re-raises the last error once `max_retries` retries are spent.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except retry_on:
+            if attempt >= max_retries:
+                raise
+            time.sleep(random.uniform(0.0, min(max_delay_s, base_delay_s * (2 ** attempt))))
+            attempt += 1
+
+
+def run_judge_jobs(
+    jobs: List[JudgeJob],
+    concurrency: int = 6,
+    rate_per_min: float = 300.0,
+    max_retries: int = 3,
+    group_size: int = 1,
+    max_requests: Optional[int] = None,
+) -> Iterator[JudgeResult]:
+    """
+    Judges `jobs` on a bounded thread pool and yields results as they complete.
+    With group_size > 1, jobs are packed `group_size` per request; any job the group
+    call doesn't return a valid verdict for is re-judged with a single call.
+    Every request (including retries) takes a token from a shared rate limiter.
+    At most `max_requests` judge requests are started (retries of malformed output
+    aside): group calls first, then single-call fallbacks while the budget lasts.
+    Jobs left over are yielded with deferred=True, failures with verdict=None
+    (neither raises).
+    """
+    if not jobs:
+        return
+
+    bucket = TokenBucket(rate_per_s=rate_per_min / 60.0, capacity=max(1, concurrency))
+
+    size = max(1, group_size)
+    groups = [jobs[i : i + size] for i in range(0, len(jobs), size)]
+    if max_requests is not None:
+        over = [job for g in groups[max(0, max_requests):] for job in g]
+        groups = groups[: max(0, max_requests)]
+        yield from (JudgeResult(job=job, verdict=None, deferred=True) for job in over)
+    # requests left for single-call fallbacks once every group call has been made
+    fallback_budget = [None if max_requests is None else max_requests - len(groups)]
+    budget_lock = threading.Lock()
+
+    def _take_fallback() -> bool:
+        with budget_lock:
+            if fallback_budget[0] is None:
+                return True
+            if fallback_budget[0] <= 0:
+                return False
+            fallback_budget[0] -= 1
+            return True
+
+    def _call(job: JudgeJob) -> Dict[str, Any]:
+        bucket.acquire()
+        return judge_article(title=job.title, text=job.text)
+
+    def _call_group(group: List[JudgeJob]) -> Dict[str, Dict[str, Any]]:
+        bucket.acquire()
+        return judge_articles([(str(job.article_id), job.title, job.text) for job in group])
+
+    def _work(job: JudgeJob) -> JudgeResult:
+        try:
+            verdict = retry_with_jitter(lambda: _call(job), max_retries=max_retries, retry_on=_BAD_OUTPUT_ERRORS)
+            return JudgeResult(job=job, verdict=verdict)
+        except Exception as e:
+            return JudgeResult(job=job, verdict=None, error=str(e)[:500])
+
+    def _work_group(group: List[JudgeJob]) -> List[JudgeResult]:
+        if len(group) == 1:
+            return [_work(group[0])]
+        try:
+            verdicts = retry_with_jitter(lambda: _call_group(group), max_retries=max_retries, retry_on=_BAD_OUTPUT_ERRORS)
+        except Exception:
+            verdicts = {}
+        results = []
+        for job in group:
+            if str(job.article_id) in verdicts:
+                results.append(JudgeResult(job=job, verdict=verdicts[str(job.article_id)]))
+            elif _take_fallback():
+                results.append(_work(job))
+            else:
+                results.append(JudgeResult(job=job, verdict=None, deferred=True))
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(_work_group, g) for g in groups]
+        for fut in as_completed(futures):
+            yield from fut.result()
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+
+from app import llm_ledger, metrics
+from app.config import settings
+
+T = TypeVar("T")
+
+# Worth retrying: network errors/timeouts (APITimeoutError is an APIConnectionError), 429s and 5xx
+TRANSIENT_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_client_lock = threading.Lock()
+
+# One in-flight limit for every LLM call in the process (sync and async)
+_slots = threading.BoundedSemaphore(max(1, settings.LLM_MAX_CONCURRENCY))
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_CONNECTIONS,
+    )
+
+
+def get_client() -> OpenAI:
+    """
+    Long-lived OpenAI client with a pooled HTTP connection (reused across calls and threads).
+    SDK-level retries are off: the gateway does its own retry/backoff.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not settings.OPENAI_API_KEY:
+                    raise ValueError("OPENAI_API_KEY missing. Add it to .env")
+                _client = OpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL or None,
+                    timeout=settings.LLM_TIMEOUT_S,
+                    max_retries=0,
+                    http_client=httpx.Client(limits=_limits(), timeout=settings.LLM_TIMEOUT_S),
+                )
+    return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    global _async_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                if not settings.OPENAI_API_KEY:
+                    raise ValueError("OPENAI_API_KEY missing. Add it to .env")
+                _async_client = AsyncOpenAI(
+                    api_key=settings.OPENAI_API_KEY,
+                    base_url=settings.OPENAI_BASE_URL or None,
+                    timeout=settings.LLM_TIMEOUT_S,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(limits=_limits(), timeout=settings.LLM_TIMEOUT_S),
+                )
+    return _async_client
+
+
+def _backoff_s(attempt: int) -> float:
+    # exponential backoff with full jitter
+    return random.uniform(0.0, min(settings.LLM_RETRY_MAX_DELAY_S, settings.LLM_RETRY_BASE_DELAY_S * (2 ** attempt)))
+
+
+def _call(fn: Callable[[], T], stage: str, model: str) -> T:
+    attempt = 0
+    t0 = time.perf_counter()
+    while True:
+        try:
+            with _slots:
+                resp = fn()
+        except TRANSIENT_ERRORS as e:
+            if attempt >= settings.LLM_MAX_RETRIES:
+                _record(stage, model, t0, attempt, error=e)
+                raise
+            time.sleep(_backoff_s(attempt))
+            attempt += 1
+        except Exception as e:
+            _record(stage, model, t0, attempt, error=e)
+            raise
+        else:
+            _record(stage, model, t0, attempt, resp=resp)
+            return resp
+
+
+async def _acquire_slot() -> None:
+    """
+    Takes a slot of the process-wide limit without blocking the event loop: free slots
+    are taken directly, otherwise a worker thread waits for one.
+    """
+    if _slots.acquire(blocking=False):
+        return
+    waiter = asyncio.ensure_future(asyncio.to_thread(_slots.acquire))
+    try:
+        await asyncio.shield(waiter)
+    except asyncio.CancelledError:
+        # the thread still gets its slot: hand it back once it does
+        waiter.add_done_callback(lambda f: f.cancelled() or f.exception() or _slots.release())
+        raise
+
+
+async def _acall(fn: Callable[[], Awaitable[T]], stage: str, model: str) -> T:
+    attempt = 0
+    t0 = time.perf_counter()
+    while True:
+        await _acquire_slot()
+        try:
+            resp = await fn()
+        except TRANSIENT_ERRORS as e:
+            if attempt >= settings.LLM_MAX_RETRIES:
+                _record(stage, model, t0, attempt, error=e)
+                raise
+        except Exception as e:
+            _record(stage, model, t0, attempt, error=e)
+            raise
+        else:
+            _record(stage, model, t0, attempt, resp=resp)
+            return resp
+        finally:
+            _slots.release()
+        await asyncio.sleep(_backoff_s(attempt))
+        attempt += 1
+
+
+def _record(
+    stage: str,
+    model: str,
+    t0: float,
+    retries: int,
+    resp: Any = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    input_tokens, output_tokens, cached_tokens = llm_ledger.usage_of(resp) if resp is not None else (0, 0, 0)
+    metrics.observe(f"llm.{stage}", time.perf_counter() - t0, error=error is not None)
+    llm_ledger.record(
+        stage=stage,
+        model=model,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cached_tokens=cached_tokens,
+        latency_ms=(time.perf_counter() - t0) * 1000.0,
+        retries=retries,
+        ok=error is None,
+        error=f"{type(error).__name__}: {error}" if error is not None else None,
+    )
+
+
+def create_response(stage: str, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    """
+    client.responses.create(**kwargs) with the shared client, limit, timeout and retries.
+    Usage, latency and estimated cost are recorded in the llm_calls ledger under `stage`.
+    """
+    client = get_client()
+    return _call(
+        lambda: client.responses.create(timeout=timeout or settings.LLM_TIMEOUT_S, **kwargs),
+        stage=stage,
+        model=kwargs.get("model", ""),
+    )
+
+
+def create_embeddings(stage: str, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    client = get_client()
+    return _call(
+        lambda: client.embeddings.create(timeout=timeout or settings.LLM_TIMEOUT_S, **kwargs),
+        stage=stage,
+        model=kwargs.get("model", ""),
+    )
+
+
+async def acreate_response(stage: str, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    client = get_async_client()
+    return await _acall(
+        lambda: client.responses.create(timeout=timeout or settings.LLM_TIMEOUT_S, **kwargs),
+        stage=stage,
+        model=kwargs.get("model", ""),
+    )
+
+
+async def acreate_embeddings(stage: str, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+    client = get_async_client()
+    return await _acall(
+        lambda: client.embeddings.create(timeout=timeout or settings.LLM_TIMEOUT_S, **kwargs),
+        stage=stage,
+        model=kwargs.get("model", ""),
+    )
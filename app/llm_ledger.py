@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import atexit
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.bulk import stream
+from app.db import LLMCall, SessionLocal
+
+# USD per 1M tokens: (input, cached input, output). Update when pricing changes.
+MODEL_PRICES: Dict[str, tuple[float, float, float]] = {
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "text-embedding-3-small": (0.02, 0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.13, 0.0),
+}
+BATCH_DISCOUNT = 0.5
+
+_FLUSH_EVERY = 50
+
+_lock = threading.Lock()
+_buffer: List[Dict[str, Any]] = []
+_run_id: Optional[str] = None
+
+
+def set_run_id(run_id: Optional[str]) -> None:
+    """
+    Tags every call recorded from now on with `run_id` (one pipeline run).
+    """
+    global _run_id
+    _run_id = run_id
+
+
+def current_run_id() -> Optional[str]:
+    return _run_id
+
+
+def _prices(model: str) -> tuple[float, float, float]:
+    # dated snapshots ("gpt-4.1-mini-2025-04-14") use their base model's price
+    if model in MODEL_PRICES:
+        return MODEL_PRICES[model]
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name + "-"):
+            return MODEL_PRICES[name]
+    return (0.0, 0.0, 0.0)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    price_in, price_cached, price_out = _prices(model)
+    uncached = max(0, input_tokens - cached_tokens)
+    return (uncached * price_in + cached_tokens * price_cached + output_tokens * price_out) / 1_000_000
+
+
+def usage_of(resp: Any) -> tuple[int, int, int]:
+    """
+    (input, output, cached) tokens from a Responses or Embeddings API result
+    (SDK object or plain dict, e.g. a batch output line body).
+    """
+    usage = resp.get("usage") if isinstance(resp, dict) else getattr(resp, "usage", None)
+    if usage is None:
+        return 0, 0, 0
+
+    def _get(obj: Any, key: str) -> Any:
+        return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+    input_tokens = _get(usage, "input_tokens") or _get(usage, "prompt_tokens") or 0
+    output_tokens = _get(usage, "output_tokens") or 0
+    details = _get(usage, "input_tokens_details")
+    cached_tokens = (_get(details, "cached_tokens") or 0) if details is not None else 0
+    return int(input_tokens), int(output_tokens), int(cached_tokens)
+
+
+def record(
+    stage: str,
+    model: str,
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    cached_tokens: int = 0,
+    latency_ms: float = 0.0,
+    retries: int = 0,
+    ok: bool = True,
+    error: Optional[str] = None,
+    discount: float = 1.0,
+) -> None:
+    """
+    Buffers one ledger row; rows are written every _FLUSH_EVERY calls and on flush().
+    Thread-safe (judge workers record concurrently).
+    """
+    row = {
+        "run_id": _run_id,
+        "stage": stage,
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cached_tokens": cached_tokens,
+        "latency_ms": latency_ms,
+        "retries": retries,
+        "cost_usd": estimate_cost(model, input_tokens, output_tokens, cached_tokens) * discount,
+        "ok": ok,
+        "error": (error or "")[:500] or None,
+        "created_at": datetime.utcnow(),
+    }
+    with _lock:
+        _buffer.append(row)
+        full = len(_buffer) >= _FLUSH_EVERY
+    if full:
+        flush()
+
+
+def flush() -> int:
+    """
+    Writes buffered rows. Returns how many were written.
+    Accounting must never break a run: DB errors are reported and the rows dropped.
+    """
+    with _lock:
+        rows = list(_buffer)
+        _buffer.clear()
+    if not rows:
+        return 0
+    try:
+        with SessionLocal() as session:
+            session.add_all([LLMCall(**r) for r in rows])
+            session.commit()
+    except Exception as e:
+        print(f"⚠️ LLM ledger: could not write {len(rows)} rows: {str(e)[:200]}")
+        return 0
+    return len(rows)
+
+
+atexit.register(flush)
+
+
+def _percentile(sorted_vals: Sequence[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def summarize(
+    group_by: Sequence[str] = ("run_id", "stage", "model"),
+    run_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Aggregates the ledger by `group_by` columns: calls, errors, tokens, retries,
+    estimated cost and p50/p95 latency. Percentiles are computed in Python
+    (SQLite has no percentile function).
+    """
+    flush()
+    cols = [getattr(LLMCall, c) for c in group_by]
+    with SessionLocal() as session:
+        q = session.query(
+            *cols,
+            LLMCall.ok,
+            LLMCall.input_tokens,
+            LLMCall.output_tokens,
+            LLMCall.cached_tokens,
+            LLMCall.retries,
+            LLMCall.cost_usd,
+            LLMCall.latency_ms,
+        )
+        if run_id is not None:
+            q = q.filter(LLMCall.run_id == run_id)
+        if since is not None:
+            q = q.filter(LLMCall.created_at >= since)
+
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        n = len(group_by)
+        for r in stream(q):
+            key = tuple(r[:n])
+            ok, inp, out, cached, retries, cost, latency = r[n:]
+            g = groups.setdefault(
+                key,
+                {
+                    **dict(zip(group_by, key)),
+                    "calls": 0, "errors": 0, "input_tokens": 0, "output_tokens": 0,
+                    "cached_tokens": 0, "retries": 0, "cost_usd": 0.0, "_lat": [],
+                },
+            )
+            g["calls"] += 1
+            g["errors"] += 0 if ok else 1
+            g["input_tokens"] += inp or 0
+            g["output_tokens"] += out or 0
+            g["cached_tokens"] += cached or 0
+            g["retries"] += retries or 0
+            g["cost_usd"] += cost or 0.0
+            g["_lat"].append(latency or 0.0)
+
+    out_rows: List[Dict[str, Any]] = []
+    for g in groups.values():
+        lat = sorted(g.pop("_lat"))
+        g["p50_ms"] = _percentile(lat, 0.50)
+        g["p95_ms"] = _percentile(lat, 0.95)
+        out_rows.append(g)
+    out_rows.sort(key=lambda g: tuple(str(g[c] or "") for c in group_by))
+    return out_rows
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.db import engine
+
+try:
+    import resource  # not on Windows
+except ImportError:
+    resource = None
+
+# Process-wide instrumentation: timers on hot functions, counters, a SQLAlchemy hook
+# counting queries, and per-stage wall/CPU/memory figures. Collected in memory and
+# written once per run (JSON report, optional Prometheus textfile). reset() starts a
+# new collection (the daemon does it for every job).
+
+
+@dataclass
+class TimerStats:
+    calls: int = 0
+    errors: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+
+@dataclass
+class StageStats:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0  # process CPU (all threads)
+    db_queries: int = 0
+    db_s: float = 0.0
+    max_rss_mb: Optional[float] = None       # process high-water mark at the end of the stage
+    peak_traced_mb: Optional[float] = None   # Python allocations, only while tracemalloc runs (--profile)
+    error: Optional[str] = None
+
+
+_lock = threading.Lock()
+_timers: Dict[str, TimerStats] = {}
+_counters: Dict[str, float] = {}
+_stages: List[StageStats] = []
+_started_at = datetime.utcnow()
+
+
+def reset() -> None:
+    global _started_at
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _stages.clear()
+        _started_at = datetime.utcnow()
+
+
+def incr(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, seconds: float, error: bool = False) -> None:
+    with _lock:
+        t = _timers.setdefault(name, TimerStats())
+        t.calls += 1
+        t.errors += error
+        t.total_s += seconds
+        t.max_s = max(t.max_s, seconds)
+
+
+class timed:
+    """
+    Times a block (`with timed("x"):`) or every call of a function (`@timed("x")`)
+    into the timer `name`. Calls that raise are counted as errors.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._t0 = threading.local()
+
+    def __enter__(self) -> "timed":
+        self._t0.value = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        observe(self.name, time.perf_counter() - self._t0.value, error=exc_type is not None)
+
+    def __call__(self, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            failed = True
+            try:
+                out = fn(*args, **kwargs)
+                failed = False
+                return out
+            finally:
+                observe(self.name, time.perf_counter() - t0, error=failed)
+
+        return wrapper
+
+
+# --- DB queries (every statement on the shared engine, from any thread) ---
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_metrics_t0")
+    if starts:
+        dt = time.perf_counter() - starts.pop()
+        with _lock:
+            _counters["db.queries"] = _counters.get("db.queries", 0) + 1
+            _counters["db.seconds"] = _counters.get("db.seconds", 0) + dt
+
+
+def _max_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # bytes on macOS, KiB on Linux
+
+
+def _max_rss_mb() -> Optional[float]:
+    rss = _max_rss_bytes()
+    return None if rss is None else rss / 2**20  # MiB
+
+
+@contextmanager
+def stage(name: str) -> Iterator[StageStats]:
+    """
+    Wall and CPU time, DB queries and memory high-water mark of one pipeline stage.
+    Stages run one after the other, so the DB counters' delta belongs to this stage.
+    """
+    s = StageStats(name=name)
+    with _lock:
+        q0, d0 = _counters.get("db.queries", 0), _counters.get("db.seconds", 0.0)
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    w0, c0 = time.perf_counter(), time.process_time()
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        s.wall_s = time.perf_counter() - w0
+        s.cpu_s = time.process_time() - c0
+        with _lock:
+            s.db_queries = int(_counters.get("db.queries", 0) - q0)
+            s.db_s = _counters.get("db.seconds", 0.0) - d0
+        s.max_rss_mb = _max_rss_mb()
+        if tracemalloc.is_tracing():
+            s.peak_traced_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        with _lock:
+            _stages.append(s)
+
+
+class Profiler:
+    """
+    cProfile + tracemalloc over a run (--profile). cProfile only sees the thread that
+    started it: work in the streaming stage threads shows up as time waiting on queues.
+    """
+
+    def __init__(self, top: int = 30):
+        self.top = top
+        self._prof = cProfile.Profile()
+
+    def __enter__(self) -> "Profiler":
+        tracemalloc.start(10)
+        self._prof.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._prof.disable()
+        self._snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    def dump(self, path: Path) -> Dict[str, Any]:
+        """
+        Writes the raw profile (open with snakeviz / pstats) and returns the
+        top functions by cumulative time and the top allocation sites.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._prof.dump_stats(str(path))
+        buf = io.StringIO()
+        pstats.Stats(self._prof, stream=buf).sort_stats("cumulative").print_stats(self.top)
+        allocs = [
+            {"site": str(st.traceback[0]), "size_mb": round(st.size / 1e6, 3), "count": st.count}
+            for st in self._snapshot.statistics("lineno")[: self.top]
+        ]
+        return {"prof_file": str(path), "top_cumulative": buf.getvalue(), "top_allocations": allocs}
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "started_at": _started_at.isoformat(),
+            "finished_at": datetime.utcnow().isoformat(),
+            "max_rss_mb": _max_rss_mb(),
+            "max_rss_bytes": _max_rss_bytes(),
+            "stages": [asdict(s) for s in _stages],
+            "timers": {k: asdict(v) for k, v in sorted(_timers.items())},
+            "counters": dict(sorted(_counters.items())),
+        }
+
+
+def write_report(run_id: str, extra: Optional[Dict[str, Any]] = None) -> Path:
+    """
+    METRICS_DIR/run-<run_id>.json with snapshot() + `extra`; also refreshes the
+    Prometheus textfile when METRICS_PROM_FILE is set.
+    """
+    report = {"run_id": run_id, **snapshot(), **(extra or {})}
+    out = Path(settings.METRICS_DIR) / f"run-{run_id}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+    if settings.METRICS_PROM_FILE:
+        write_prometheus(Path(settings.METRICS_PROM_FILE), report)
+    return out
+
+
+def _label(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def write_prometheus(path: Path, report: Dict[str, Any]) -> None:
+    """
+    Gauges of the last run in the node_exporter textfile format, written atomically
+    (the collector may read the file at any time).
+    """
+    lines = [
+        "# HELP news_agent_last_run_timestamp_seconds End of the last instrumented run.",
+        "# TYPE news_agent_last_run_timestamp_seconds gauge",
+        f"news_agent_last_run_timestamp_seconds {time.time():.0f}",
+    ]
+    metrics = {
+        "stage_wall_seconds": ("Wall time per stage of the last run.", "wall_s"),
+        "stage_cpu_seconds": ("Process CPU time per stage of the last run.", "cpu_s"),
+        "stage_db_queries": ("DB statements per stage of the last run.", "db_queries"),
+        "stage_db_seconds": ("DB time per stage of the last run.", "db_s"),
+    }
+    for metric, (help_, key) in metrics.items():
+        lines += [f"# HELP news_agent_{metric} {help_}", f"# TYPE news_agent_{metric} gauge"]
+        for s in report["stages"]:
+            lines.append(f'news_agent_{metric}{{stage="{_label(s["name"])}"}} {s[key]}')
+    for metric, key in (("timer_calls", "calls"), ("timer_seconds", "total_s"), ("timer_errors", "errors")):
+        lines += [f"# HELP news_agent_{metric} Timed function {key} in the last run.", f"# TYPE news_agent_{metric} gauge"]
+        for name, t in report["timers"].items():
+            lines.append(f'news_agent_{metric}{{name="{_label(name)}"}} {t[key]}')
+    if report.get("max_rss_bytes") is not None:
+        lines += [
+            "# HELP news_agent_max_rss_bytes Process memory high-water mark.",
+            "# TYPE news_agent_max_rss_bytes gauge",
+            f"news_agent_max_rss_bytes {report['max_rss_bytes']}",
+        ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import inspect, text as sql_text
+from sqlalchemy.engine import Connection
+
+from app.db import RUBRIC_SCORE_FIELDS, SchemaVersion, SessionLocal, engine, rubric_values
+
+# Schema revisions, applied in order by upgrade(). create_all() only creates missing
+# tables, so anything that changes an existing table (column, index, backfill) goes
+# here. Revisions must be idempotent: on a fresh DB create_all already did part of it.
+# Append new revisions at the end; never renumber or edit an applied one.
+# Each revision is fixed SQL against the schema as it was at that revision: no ORM
+# queries or DDL generated from the live models, which may have columns a DB being
+# upgraded doesn't have yet (they are added by a later revision).
+
+
+def _rubric_columns(conn: Connection) -> None:
+    """
+    Typed judge-rubric columns on article_analysis, backfilled from judge_json.
+    """
+    cols = {c["name"] for c in inspect(conn).get_columns("article_analysis")}
+    if "is_relevant" not in cols:
+        conn.execute(sql_text("ALTER TABLE article_analysis ADD COLUMN is_relevant BOOLEAN"))
+    for k in RUBRIC_SCORE_FIELDS:
+        if k not in cols:
+            conn.execute(sql_text(f"ALTER TABLE article_analysis ADD COLUMN {k} FLOAT"))
+
+    rows = conn.execute(
+        sql_text("SELECT id, judge_json FROM article_analysis WHERE judge_json IS NOT NULL AND is_relevant IS NULL")
+    ).all()
+    updates = []
+    for rid, judge_json in rows:
+        try:
+            j = json.loads(judge_json)
+        except Exception:
+            continue  # malformed JSON stays "unjudged" for the gate, as before
+        if j:
+            updates.append({"id": rid, **rubric_values(j)})
+    if updates:
+        assignments = ", ".join(f"{k} = :{k}" for k in ("is_relevant", *RUBRIC_SCORE_FIELDS))
+        conn.execute(sql_text(f"UPDATE article_analysis SET {assignments} WHERE id = :id"), updates)
+
+
+# (name, table, columns, partial-index predicate) as of revision 2
+_REV2_INDEXES = [
+    ("ix_articles_extract_queue", "articles", "discovered_at", "text IS NULL"),
+    ("ix_articles_cluster_discovered", "articles", "cluster_id, discovered_at", None),
+    ("ix_articles_discovered_at", "articles", "discovered_at", None),
+    ("ix_articles_published_at", "articles", "published_at", None),
+    ("ix_article_analysis_judge_score", "article_analysis", "judge_score", None),
+    ("ix_article_analysis_gate", "article_analysis", "is_relevant, your_relevance, judge_score", None),
+    ("ix_cluster_summary_sent_last_seen", "cluster_summary", "sent, last_seen_at", None),
+    ("ix_condensed_texts_article_id", "condensed_texts", "article_id", None),
+    ("ix_judge_batches_batch_id", "judge_batches", "batch_id", None),
+    ("ix_judge_batches_status", "judge_batches", "status", None),
+    ("ix_judge_cache_prompt_version", "judge_cache", "prompt_version", None),
+    ("ix_llm_calls_created_at", "llm_calls", "created_at", None),
+    ("ix_llm_calls_run_id", "llm_calls", "run_id", None),
+    ("ix_llm_calls_stage", "llm_calls", "stage", None),
+]
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: str, where: Optional[str] = None) -> None:
+    # IF NOT EXISTS and partial indexes: both SQLite and Postgres
+    ddl = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+    conn.execute(sql_text(ddl + (f" WHERE {where}" if where else "")))
+
+
+def _hot_path_indexes(conn: Connection) -> None:
+    """
+    Indexes for the query shapes in extract (text IS NULL queue), dedupe and
+    candidate_filter (recency / discovered_at order), cluster_summary refresh
+    (cluster_id + discovered_at) and rank_llm (gate + judge_score order).
+    """
+    # superseded by ix_articles_cluster_discovered (same leading column)
+    conn.execute(sql_text("DROP INDEX IF EXISTS ix_articles_cluster_id"))
+    for name, table, columns, where in _REV2_INDEXES:
+        _create_index(conn, name, table, columns, where)
+
+
+def _cluster_summary_backfill(conn: Connection) -> None:
+    """
+    cluster_summary rows for every cluster, computed like cluster_summary.refresh_clusters:
+    the rep is the newest member with text, else the newest member.
+    """
+    conn.execute(sql_text("DELETE FROM cluster_summary"))
+    conn.execute(sql_text("""
+        INSERT INTO cluster_summary (
+            cluster_id, rep_article_id, has_text, member_count, country, source,
+            first_seen_at, last_seen_at, last_published_at, best_judge_score, sent, updated_at
+        )
+        SELECT m.cluster_id, m.id, m.has_text, m.member_count, m.country, m.source,
+               m.first_seen_at, m.last_seen_at, m.last_published_at, b.best, m.cluster_id IN (
+                   SELECT cluster_id FROM sent_clusters
+               ), CURRENT_TIMESTAMP
+        FROM (
+            SELECT id, cluster_id, country, source, text IS NOT NULL AS has_text,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY cluster_id ORDER BY text IS NOT NULL DESC, discovered_at DESC
+                   ) AS rn,
+                   COUNT(*) OVER (PARTITION BY cluster_id) AS member_count,
+                   MIN(discovered_at) OVER (PARTITION BY cluster_id) AS first_seen_at,
+                   MAX(discovered_at) OVER (PARTITION BY cluster_id) AS last_seen_at,
+                   MAX(published_at) OVER (PARTITION BY cluster_id) AS last_published_at
+            FROM articles
+            WHERE cluster_id IS NOT NULL
+        ) m
+        LEFT JOIN (
+            SELECT a.cluster_id, MAX(aa.judge_score) AS best
+            FROM articles a JOIN article_analysis aa ON aa.article_id = a.id
+            WHERE a.cluster_id IS NOT NULL
+            GROUP BY a.cluster_id
+        ) b ON b.cluster_id = m.cluster_id
+        WHERE m.rn = 1
+    """))
+
+
+def _retention_columns(conn: Connection) -> None:
+    """
+    articles.archived_at (text moved to the archive by app/retention.py), which the
+    extract-queue partial index now excludes, and an index for pruning sent_clusters by age.
+    """
+    cols = {c["name"] for c in inspect(conn).get_columns("articles")}
+    if "archived_at" not in cols:
+        col_type = "TIMESTAMP" if conn.dialect.name == "postgresql" else "DATETIME"
+        conn.execute(sql_text(f"ALTER TABLE articles ADD COLUMN archived_at {col_type}"))
+    # the partial index predicate changed: rebuild it
+    conn.execute(sql_text("DROP INDEX IF EXISTS ix_articles_extract_queue"))
+    _create_index(conn, "ix_articles_extract_queue", "articles", "discovered_at", "text IS NULL AND archived_at IS NULL")
+    _create_index(conn, "ix_sent_clusters_sent_at", "sent_clusters", "sent_at")
+
+
+def _articles_fts(conn: Connection) -> None:
+    """
+    FTS5 index over article titles + text with sync triggers (SQLite only, see app/search.py).
+    """
+    from app.search import create_fts
+
+    create_fts(conn)
+
+
+def _prejudge_skipped_column(conn: Connection) -> None:
+    """
+    article_analysis.prejudge_skipped: candidates the pre-judge kept from the LLM.
+    """
+    cols = {c["name"] for c in inspect(conn).get_columns("article_analysis")}
+    if "prejudge_skipped" not in cols:
+        conn.execute(sql_text("ALTER TABLE article_analysis ADD COLUMN prejudge_skipped BOOLEAN"))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "rubric_columns", _rubric_columns),
+    (2, "hot_path_indexes", _hot_path_indexes),
+    (3, "cluster_summary_backfill", _cluster_summary_backfill),
+    (4, "retention_columns", _retention_columns),
+    (5, "articles_fts", _articles_fts),
+    (6, "prejudge_skipped_column", _prejudge_skipped_column),
+]
+
+
+def current_version() -> int:
+    with SessionLocal() as session:
+        v = session.query(SchemaVersion.version).order_by(SchemaVersion.version.desc()).first()
+    return v[0] if v else 0
+
+
+def upgrade() -> int:
+    """
+    Applies every revision newer than the DB's schema_version, each in its own
+    transaction together with its version row. Returns how many were applied.
+    """
+    applied = 0
+    start = current_version()
+    for version, name, fn in MIGRATIONS:
+        if version <= start:
+            continue
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(SchemaVersion.__table__.insert().values(version=version, name=name))
+        print(f"🗄️ DB migration {version:03d} applied: {name}")
+        applied += 1
+    return applied
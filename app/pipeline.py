@@ -1,18 +1,43 @@
-from datetime import date
+import uuid
+from contextlib import nullcontext
+from dataclasses import asdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
+from app import llm_ledger, metrics
 from app.analyze_candidates import analyze_top_candidates
 from app.brief import generate_big_news_brief
+from app.checkpoints import Checkpoints, latest_unfinished_run, sent_but_unrecorded
+from app.config import settings
 from app.db import init_db
 from app.dedupe import assign_clusters
 from app.emailer import render_html, send_email
 from app.extract import fetch_and_extract
 from app.ingest_rss import ingest_rss
 from app.rank import record_sent
-from app.rank_llm import select_digest_items
+from app.rank_llm import RankedLLMItem, select_digest_items
+from app.run_context import RunContext
+from app.stream_pipeline import StreamReport, run_streaming_ingest
 
-def run_pipeline() -> None:
-    init_db()
-    print("✅ DB initialized.")
+def _print_stream_report(r: StreamReport) -> None:
+    print(f"📰 RSS ingest: added {r.added} new articles ({r.seen} already seen) from {r.feeds} feeds.")
+    print(
+        f"🧾 Extract: ok={r.extract_ok} failed={r.extract_failed + r.fetch_failed} "
+        f"({r.added} new + {r.backlog} backlog, {r.fetch_failed} fetch failures)"
+    )
+    print(f"🧩 Dedupe: clustered {r.clustered} articles into {r.clusters} clusters")
+    if "embed" in r.stages:
+        print(f"🔢 Pre-embedded {r.embedded} articles")
+    busy = ", ".join(f"{name} {s.busy_s:.1f}s/{s.workers}w" for name, s in r.stages.items())
+    print(f"⏱️ Streaming stages finished in {r.wall_s:.1f}s (busy: {busy})")
+
+
+def _collect(streaming: bool) -> Dict[str, Any]:
+    if streaming:
+        r = run_streaming_ingest(cluster_limit=200, threshold=92)
+        _print_stream_report(r)
+        return asdict(r)
 
     added, seen = ingest_rss()
     print(f"📰 RSS ingest: added {added} new articles ({seen} already seen).")
@@ -22,31 +47,153 @@ def run_pipeline() -> None:
 
     clustered, clusters = assign_clusters(limit=200, threshold=92)
     print(f"🧩 Dedupe: clustered {clustered} articles into {clusters} clusters")
+    return {"added": added, "seen": seen, "extract_ok": ok, "extract_failed": fail,
+            "clustered": clustered, "clusters": clusters}
+
+
+def _judge(ctx: RunContext) -> Dict[str, Any]:
+    js = analyze_top_candidates(top_k=120, max_new_judgements=30, ctx=ctx)
+    print(
+        f"🧠 LLM judge: created {js.created} new judgements "
+        f"({js.llm_calls} LLM calls, {js.cache_hits} cache hits, hit rate {js.hit_rate:.0%}, "
+        f"{js.skipped_prejudge} skipped by pre-judge)"
+    )
+    return asdict(js)
+
+
+def _record_unrecorded_sends() -> None:
+    """
+    Idempotency guard: a run that crashed between sending the email and recording its
+    clusters would have them selected (and mailed) again by the next run.
+    """
+    for run_id, cluster_ids in sent_but_unrecorded():
+        Checkpoints(run_id).run("record_sent", lambda: record_sent(cluster_ids) or cluster_ids)
+        print(f"📮 Recorded {len(cluster_ids)} clusters mailed by run {run_id} as sent.")
 
-    new_j = analyze_top_candidates(top_k=120, max_new_judgements=30)
-    print(f"🧠 LLM judge: created {new_j} new judgements")
 
-#    top10 = select_top10()
-#    print("\n📬 TOP 10 (mostly English: US=5, UK=4, FR=1)\n")
-#    for i, item in enumerate(top10, 1):
-#       print(f"{i:02d}. [{item.country}] ({item.source}) score={item.score:.2f}")
-#       print(f"    {item.title}")
-#       print(f"    {item.url}\n")
+def new_run_id() -> str:
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6]
 
-    from app.rank_llm import select_digest_items
-    top10 = select_digest_items(min_items=6, max_items=10)
+
+def _stage(cp: Optional[Checkpoints], stage: str, fn: Callable[[], Any], inputs: Any = None, **kw) -> Any:
+    with metrics.stage(stage):
+        return fn() if cp is None else cp.run(stage, fn, inputs=inputs, **kw)
+
+
+def process_new_articles(ctx: RunContext, cp: Optional[Checkpoints] = None, streaming: Optional[bool] = None) -> None:
+    """
+    Ingest, fetch/extract, dedupe and judge: everything the digest is later selected from.
+    """
+    streaming = settings.PIPELINE_STREAMING if streaming is None else streaming
+    _stage(cp, "collect", lambda: _collect(streaming), inputs={"streaming": streaming})
+    ctx.invalidate_articles()  # ingest/extract/dedupe wrote articles
+
+    _stage(cp, "judge", lambda: _judge(ctx), inputs={"top_k": 120, "max_new_judgements": 30})
+
+
+def send_digest(ctx: RunContext, cp: Checkpoints, force_send: bool = False) -> List[int]:
+    """
+    Selects the digest from already judged articles, writes the brief, sends the email
+    and records the clusters as sent. Returns the cluster ids sent.
+    """
+    selected: List[Dict[str, Any]] = _stage(
+        cp,
+        "select",
+        lambda: [asdict(x) for x in select_digest_items(min_items=6, max_items=10, ctx=ctx)],
+        inputs={"min_items": 6, "max_items": 10},
+    )
+    top10 = [RankedLLMItem(**d) for d in selected]
+    cluster_ids = [x.cluster_id for x in top10]
     print("\n📬 TOP 10 (LLM-ranked, mostly English)\n")
     for i, item in enumerate(top10, 1):
         print(f"{i:02d}. [{item.country}] ({item.source}) score={item.score:.2f} sim={item.similarity:.3f}")
         print(f"    {item.title}")
         print(f"    {item.url}\n")
 
-    brief = generate_big_news_brief([x.cluster_id for x in top10])
-    html = render_html(top10, brief=brief)
-    send_email(subject=f"Top 10 must-reads — {date.today().isoformat()}", html=html)
-    print("📧 Email sent.")
+    brief = _stage(cp, "brief", lambda: generate_big_news_brief(cluster_ids), inputs={"cluster_ids": cluster_ids})
+
+    subject = f"Top 10 must-reads — {date.today().isoformat()}"
 
-    record_sent([x.cluster_id for x in top10])
+    def _send() -> Dict[str, Any]:
+        send_email(subject=subject, html=render_html(top10, brief=brief))
+        print("📧 Email sent.")
+        return {"sent_at": datetime.utcnow().isoformat()}
+
+    _stage(cp, "send", _send, inputs={"subject": subject, "cluster_ids": cluster_ids}, force=force_send)
+
+    _stage(cp, "record_sent", lambda: record_sent(cluster_ids) or cluster_ids, inputs={"cluster_ids": cluster_ids})
+    ctx.invalidate_sent()
     print("✅ Recorded Top 10 as sent (won't repeat next run).")
+    return cluster_ids
+
+
+def print_llm_summary(run_id: str) -> List[Dict[str, Any]]:
+    llm_ledger.flush()
+    rows = llm_ledger.summarize(group_by=("stage",), run_id=run_id)
+    for row in rows:
+        print(
+            f"💸 LLM {row['stage']}: {row['calls']} calls, {row['input_tokens']} in ({row['cached_tokens']} cached) / "
+            f"{row['output_tokens']} out tokens, ~${row['cost_usd']:.4f}, p95 {row['p95_ms']:.0f} ms"
+        )
+    return rows
+
+
+def write_run_report(run_id: str, kind: str, profiler: Optional[metrics.Profiler] = None) -> None:
+    """
+    Prints the LLM summary and writes the run's JSON report (see app/metrics.py).
+    """
+    extra: Dict[str, Any] = {"kind": kind, "llm": print_llm_summary(run_id)}
+    if profiler is not None:
+        extra["profile"] = profiler.dump(Path(settings.METRICS_DIR) / f"run-{run_id}.prof")
+    print(f"📊 Run report: {metrics.write_report(run_id, extra)}")
+
+
+def resolve_run(resume: Optional[str]) -> str:
+    """
+    run_id to continue (`resume` = "latest" or a run_id), else a new one. Before a new run,
+    clusters mailed by a crashed run are recorded as sent.
+    """
+    run_id = None
+    if resume:
+        run_id = latest_unfinished_run() if resume == "latest" else resume
+        if run_id is None:
+            print("ℹ️ No unfinished run to resume, starting a new one.")
+        else:
+            print(f"🔁 Resuming run {run_id}.")
+    if run_id is None:
+        _record_unrecorded_sends()
+        run_id = new_run_id()
+    return run_id
+
+
+def run_pipeline(
+    streaming: Optional[bool] = None,
+    resume: Optional[str] = None,
+    force_send: bool = False,
+    profile: bool = False,
+) -> None:
+    """
+    One digest run. Every stage is checkpointed in pipeline_runs; with `resume`
+    ("latest" or a run_id) the stages that already finished are skipped and their
+    stored outputs (selected items, brief) reused, so recovering from a failed
+    brief or email costs no new ingest, fetches or judge calls.
+    With `profile`, the run is also profiled with cProfile + tracemalloc.
+    """
+    metrics.reset()
+    init_db()
+    print("✅ DB initialized.")
+
+    run_id = resolve_run(resume)
+    llm_ledger.set_run_id(run_id)
+    ctx = RunContext(run_id)
+    cp = Checkpoints(run_id)
+
+    profiler = metrics.Profiler() if profile else None
+    try:
+        with profiler or nullcontext():
+            process_new_articles(ctx, cp, streaming)
+            send_digest(ctx, cp, force_send=force_send)
+    finally:
+        write_run_report(run_id, "pipeline", profiler)
 
-    print("✅ Pipeline finished.")
\ No newline at end of file
+    print(f"✅ Pipeline finished (run {run_id}).")
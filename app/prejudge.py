@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import or_
+
+from app.bulk import stream
+from app.config import settings
+from app.db import Article, ArticleAnalysis, SessionLocal
+from app.queries import relevance_gate
+from app.rank import KEYWORD_SCORER
+
+# Sources / countries seen fewer times than this share one "other" bucket
+_MIN_CATEGORY_COUNT = 5
+
+
+@dataclass
+class PrejudgeRow:
+    similarity: float
+    title: str
+    source: str
+    country: str
+    has_text: bool
+    passed: Optional[bool] = None  # training label: the judge verdict passed the relevance gate
+
+
+@dataclass
+class PrejudgeModel:
+    """
+    Logistic regression predicting P(judge verdict passes the relevance gate)
+    from features available before the LLM call. Candidates below `threshold`
+    are not sent to the judge.
+    """
+
+    sources: List[str]
+    countries: List[str]
+    mean: List[float]
+    std: List[float]
+    weights: List[float]
+    bias: float
+    threshold: float
+    trained_at: str = ""
+    n_train: int = 0
+    report: Dict[str, Any] = field(default_factory=dict)
+
+    def features(self, rows: Sequence[PrejudgeRow]) -> np.ndarray:
+        src_idx = {s: i for i, s in enumerate(self.sources)}
+        cty_idx = {c: i for i, c in enumerate(self.countries)}
+        n_num = 4
+        X = np.zeros((len(rows), n_num + len(self.sources) + 1 + len(self.countries) + 1), dtype=np.float64)
+        for i, r in enumerate(rows):
+            title = (r.title or "").lower()
+            X[i, 0] = r.similarity or 0.0
+            X[i, 1] = len(title.split())
+            X[i, 2] = KEYWORD_SCORER.score(title)  # whole-word matches, as in ranking
+            X[i, 3] = 1.0 if r.has_text else 0.0
+            X[i, n_num + src_idx.get(r.source, len(self.sources))] = 1.0
+            X[i, n_num + len(self.sources) + 1 + cty_idx.get(r.country, len(self.countries))] = 1.0
+        return (X - np.asarray(self.mean)) / np.asarray(self.std)
+
+    def predict_proba(self, rows: Sequence[PrejudgeRow]) -> np.ndarray:
+        if not rows:
+            return np.zeros(0)
+        z = self.features(rows) @ np.asarray(self.weights) + self.bias
+        return 1.0 / (1.0 + np.exp(-z))
+
+    def should_judge(self, rows: Sequence[PrejudgeRow]) -> List[bool]:
+        return [bool(p >= self.threshold) for p in self.predict_proba(rows)]
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(asdict(self), indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str) -> "PrejudgeModel":
+        return cls(**json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def load_training_rows() -> List[PrejudgeRow]:
+    """
+    Every judged article with its pre-judge features, oldest first.
+    """
+    with SessionLocal() as session:
+        q = (
+            session.query(
+                ArticleAnalysis.profile_similarity,
+                Article.title,
+                Article.source,
+                Article.country,
+                or_(Article.text.isnot(None), Article.archived_at.isnot(None)),  # archived = had text
+                relevance_gate(),
+            )
+            .join(Article, Article.id == ArticleAnalysis.article_id)
+            .filter(ArticleAnalysis.is_relevant.isnot(None), ArticleAnalysis.profile_similarity.isnot(None))
+            .order_by(ArticleAnalysis.created_at)
+        )
+        return [
+            PrejudgeRow(
+                similarity=float(sim),
+                title=title or "",
+                source=source or "UNK",
+                country=country or "UNK",
+                has_text=bool(has_text),
+                passed=bool(passed),
+            )
+            for sim, title, source, country, has_text, passed in stream(q)
+        ]
+
+
+def _frequent(values: Sequence[str]) -> List[str]:
+    counts: Dict[str, int] = {}
+    for v in values:
+        counts[v] = counts.get(v, 0) + 1
+    return sorted(v for v, n in counts.items() if n >= _MIN_CATEGORY_COUNT)
+
+
+def _fit_logreg(X: np.ndarray, y: np.ndarray, l2: float = 1e-2, lr: float = 0.5, epochs: int = 2000) -> Tuple[np.ndarray, float]:
+    # full-batch gradient descent; positives are re-weighted so the minority class isn't ignored
+    n, d = X.shape
+    w = np.zeros(d)
+    b = 0.0
+    pos = max(1.0, y.sum())
+    sw = np.where(y > 0, n / (2.0 * pos), n / (2.0 * max(1.0, n - pos)))
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-(X @ w + b)))
+        g = sw * (p - y)
+        w -= lr * (X.T @ g / n + l2 * w)
+        b -= lr * g.mean()
+    return w, float(b)
+
+
+def _calibrate_threshold(proba: np.ndarray, y: np.ndarray, target_recall: float) -> float:
+    """
+    Highest threshold that still sends at least `target_recall` of the passing articles to the judge.
+    """
+    pos = np.sort(proba[y > 0])
+    if len(pos) == 0:
+        return 0.0
+    n_may_skip = int(np.floor(len(pos) * (1.0 - target_recall)))
+    return float(pos[n_may_skip])
+
+
+def evaluate(model: PrejudgeModel, rows: Sequence[PrejudgeRow]) -> Dict[str, Any]:
+    """
+    Quality of the skip decision on labelled rows.
+    skip_precision: skipped articles that the judge would indeed have failed.
+    skip_recall: failing articles that were skipped (= LLM calls saved on them).
+    pass_recall: passing articles still sent to the judge.
+    """
+    y = np.array([1.0 if r.passed else 0.0 for r in rows])
+    judge = np.array(model.should_judge(rows), dtype=bool)
+    skip = ~judge
+    n_fail = int((y == 0).sum())
+    n_pass = int((y > 0).sum())
+    skipped_fail = int((skip & (y == 0)).sum())
+    return {
+        "rows": len(rows),
+        "passing": n_pass,
+        "skipped": int(skip.sum()),
+        "skip_precision": skipped_fail / int(skip.sum()) if skip.any() else 1.0,
+        "skip_recall": skipped_fail / n_fail if n_fail else 0.0,
+        "pass_recall": int((judge & (y > 0)).sum()) / n_pass if n_pass else 1.0,
+        "calls_avoided": float(skip.mean()) if len(rows) else 0.0,
+    }
+
+
+def train(
+    rows: Sequence[PrejudgeRow],
+    target_recall: float = 0.95,
+    holdout: float = 0.25,
+    min_rows: int = 100,
+) -> PrejudgeModel:
+    """
+    Fits on the oldest (1 - holdout) rows. The newest `holdout` rows are split in
+    time: the threshold is calibrated on the older half (validation) so that
+    `target_recall` of passing articles are still judged, and the skip decision's
+    precision/recall is reported on the newer half (test), which neither the fit
+    nor the threshold has seen.
+    """
+    if len(rows) < min_rows:
+        raise ValueError(f"Need at least {min_rows} judged articles to train the pre-judge (have {len(rows)})")
+    labels = {bool(r.passed) for r in rows}
+    if len(labels) < 2:
+        raise ValueError("Training data has a single class; judge more articles first")
+
+    cut = int(len(rows) * (1.0 - holdout))
+    test_cut = cut + (len(rows) - cut) // 2
+    fit_rows, cal_rows, test_rows = list(rows[:cut]), list(rows[cut:test_cut]), list(rows[test_cut:])
+    if not cal_rows or not test_rows:
+        raise ValueError(f"holdout={holdout} leaves no validation or test rows")
+
+    model = PrejudgeModel(
+        sources=_frequent([r.source for r in fit_rows]),
+        countries=_frequent([r.country for r in fit_rows]),
+        mean=[],
+        std=[],
+        weights=[],
+        bias=0.0,
+        threshold=0.0,
+    )
+    d = 4 + len(model.sources) + 1 + len(model.countries) + 1
+    model.mean, model.std = [0.0] * d, [1.0] * d
+    raw = model.features(fit_rows)
+    std = raw.std(axis=0)
+    model.mean = raw.mean(axis=0).tolist()
+    model.std = np.where(std > 0, std, 1.0).tolist()
+
+    y_fit = np.array([1.0 if r.passed else 0.0 for r in fit_rows])
+    w, b = _fit_logreg(model.features(fit_rows), y_fit)
+    model.weights, model.bias = w.tolist(), b
+
+    y_cal = np.array([1.0 if r.passed else 0.0 for r in cal_rows])
+    model.threshold = _calibrate_threshold(model.predict_proba(cal_rows), y_cal, target_recall)
+    model.trained_at = datetime.utcnow().isoformat(timespec="seconds")
+    model.n_train = len(fit_rows)
+    model.report = {**evaluate(model, test_rows), "validation_rows": len(cal_rows)}
+    return model
+
+
+@lru_cache(maxsize=1)
+def _load_cached(path: str, mtime: float) -> PrejudgeModel:
+    return PrejudgeModel.load(path)
+
+
+def load_model() -> Optional[PrejudgeModel]:
+    """
+    The trained pre-judge, or None when disabled or not trained yet (then everything is judged).
+    """
+    path = settings.PREJUDGE_MODEL_PATH
+    if not settings.PREJUDGE_ENABLED or not Path(path).exists():
+        return None
+    try:
+        return _load_cached(path, Path(path).stat().st_mtime)
+    except Exception as e:
+        print(f"⚠️ Pre-judge model unreadable ({path}): {str(e)[:200]}")
+        return None
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.orm import Session
+
+from app.db import Article, ArticleAnalysis, SentCluster
+
+MIN_YOUR_RELEVANCE = 6.0  # hard quality gate
+
+
+# --- shared SQL predicates (selection is filtered in the DB, not in Python) ---
+
+def relevance_gate():
+    """
+    SQL predicate for the quality gate on ArticleAnalysis.
+    Unjudged rows (is_relevant IS NULL) pass: they may be used as similarity fallback,
+    unless the pre-judge skipped them as expected to fail.
+    """
+    return or_(
+        and_(ArticleAnalysis.is_relevant.is_(None), ArticleAnalysis.prejudge_skipped.is_not(True)),
+        and_(ArticleAnalysis.is_relevant.is_(True), ArticleAnalysis.your_relevance >= MIN_YOUR_RELEVANCE),
+    )
+
+
+def recent_article(days: int = 7, now: Optional[datetime] = None):
+    """
+    Article published in the last `days` days (discovery time when the feed has no date).
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    return or_(
+        and_(Article.published_at.is_not(None), Article.published_at >= cutoff),
+        and_(Article.published_at.is_(None), Article.discovered_at >= cutoff),
+    )
+
+
+def cluster_not_sent():
+    """
+    Anti-join: the article's cluster was never part of a sent digest.
+    """
+    return ~exists().where(SentCluster.cluster_id == Article.cluster_id)
+
+
+# --- queries ---
+
+@dataclass
+class BacklogItem:
+    cluster_id: int
+    judge_score: float
+    similarity: float
+    country: str
+    source: str
+    title: str
+    url: str
+
+
+def judged_backlog(session: Session, limit: int, days: int = 7) -> List[BacklogItem]:
+    """
+    Best judged, recent, never-sent articles that pass the relevance gate,
+    ordered by judge_score. Only the columns the digest needs are loaded.
+    """
+    rows = (
+        session.query(
+            Article.cluster_id,
+            ArticleAnalysis.judge_score,
+            ArticleAnalysis.profile_similarity,
+            Article.country,
+            Article.source,
+            Article.title,
+            Article.url,
+        )
+        .join(ArticleAnalysis, ArticleAnalysis.article_id == Article.id)
+        .filter(
+            ArticleAnalysis.judge_score.is_not(None),
+            relevance_gate(),
+            Article.cluster_id.is_not(None),
+            recent_article(days),
+            cluster_not_sent(),
+        )
+        .order_by(ArticleAnalysis.judge_score.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        BacklogItem(
+            cluster_id=int(cid),
+            judge_score=float(score),
+            similarity=float(sim or 0.0),
+            country=country or "UNK",
+            source=source or "UNK",
+            title=title or "(no title)",
+            url=url,
+        )
+        for cid, score, sim, country, source, title, url in rows
+    ]
+
+
+def sent_cluster_ids(session: Session, cluster_ids: Iterable[int]) -> Set[int]:
+    """
+    The subset of `cluster_ids` that was already sent (looks up only those ids).
+    """
+    ids = list(set(cluster_ids))
+    if not ids:
+        return set()
+    return {cid for (cid,) in session.query(SentCluster.cluster_id).filter(SentCluster.cluster_id.in_(ids)).distinct()}
+
+
+def article_texts(session: Session, article_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    Article.text by id for the given articles that have one (bodies are deferred on Article).
+    """
+    ids = list(set(article_ids))
+    if not ids:
+        return {}
+    rows = session.query(Article.id, Article.text).filter(Article.id.in_(ids), Article.text.is_not(None))
+    return {aid: text for aid, text in rows}
+
+
+def judge_scores(session: Session, article_ids: Iterable[int]) -> Tuple[Dict[int, float], Set[int]]:
+    """
+    For the given articles: (judge_score by article_id, ids failing the relevance gate).
+    """
+    ids = list(set(article_ids))
+    if not ids:
+        return {}, set()
+    rows = (
+        session.query(ArticleAnalysis.article_id, ArticleAnalysis.judge_score, relevance_gate())
+        .filter(ArticleAnalysis.article_id.in_(ids))
+        .all()
+    )
+    scores = {aid: score for aid, score, _ in rows if score is not None}
+    failing = {aid for aid, _, passes in rows if not passes}
+    return scores, failing
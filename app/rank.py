@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import re
+import warnings
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.cluster_summary import load_reps, mark_sent, unsent_recent_clusters
 from app.db import Article, SentCluster, SessionLocal
+from app.search import fts_enabled, keyword_bm25
 
 
 # --- MVP scoring config (simple + adjustable) ---
@@ -51,6 +58,7 @@ KEYWORDS: Dict[str, float] = {
 }
 
 RECENCY_HALF_LIFE_HOURS = 48.0  # newer gets higher score
+BM25_HALF_WEIGHT = 2.0  # FTS keyword match with this BM25 score adds half the keyword's weight
 
 
 @dataclass
@@ -64,92 +72,156 @@ class RankedItem:
     discovered_at: datetime
 
 
-def _text_blob(a: Article) -> str:
-    t = (a.title or "") + "\n" + (a.text or "")
-    return t.lower()
+_WORD_TOKEN = re.compile(r"\w+(?:[-'’]\w+)*")
 
 
-def _recency_score(hours_old: float) -> float:
-    # simple decay: score ~ 1.0 when new, ~0.5 at half-life, ~0.25 at 2 half-lives
-    if hours_old <= 0:
-        return 1.0
-    return 0.5 ** (hours_old / RECENCY_HALF_LIFE_HOURS)
+def _tokens(text: str) -> List[str]:
+    return [t.lower() for t in _WORD_TOKEN.findall(text)]
 
 
-def _keyword_score(blob: str) -> float:
-    s = 0.0
-    for k, w in KEYWORDS.items():
-        if k in blob:
-            s += w
-    return s
+class KeywordScorer:
+    """
+    Keyword matcher built once for the whole keyword list: the text is tokenized in a
+    single regex pass and its word n-grams are looked up in a hash table, so cost grows
+    with text length, not with the number of keywords.
+    Keywords match whole words ("agent" does not fire inside "agents" or "reagent");
+    each distinct keyword counts once per article, however often it occurs.
+    """
 
+    def __init__(self, weights: Dict[str, float]):
+        self.weights: Dict[str, float] = {}
+        self._by_len: Dict[int, Dict[Tuple[str, ...], str]] = {}
+        for k, w in weights.items():
+            toks = tuple(_tokens(k))
+            if not toks:
+                continue
+            key = " ".join(toks) if len(toks) > 1 else toks[0]
+            self.weights[key] = float(w)
+            self._by_len.setdefault(len(toks), {})[toks] = key
+
+    def matches(self, *texts: Optional[str]) -> Set[str]:
+        found: Set[str] = set()
+        for t in texts:
+            if not t:
+                continue
+            toks = _tokens(t)
+            for n, table in self._by_len.items():
+                if n == 1:
+                    found.update(table[(w,)] for w in set(toks) if (w,) in table)
+                else:
+                    for gram in zip(*(toks[i:] for i in range(n))):
+                        key = table.get(gram)
+                        if key is not None:
+                            found.add(key)
+        return found
+
+    def score(self, *texts: Optional[str]) -> float:
+        return sum(self.weights[k] for k in self.matches(*texts))
+
+    def scores(self, docs: Sequence[Tuple[Optional[str], ...]]) -> np.ndarray:
+        return np.fromiter((self.score(*d) for d in docs), dtype=np.float64, count=len(docs))
+
+    def fts_scores(self, session: Session, article_ids: Sequence[int]) -> Dict[int, float]:
+        """
+        Keyword boosts for many articles from FTS5 (one query per 500 keywords), without
+        loading their text.
+        Each matched keyword adds weight * bm25 / (bm25 + BM25_HALF_WEIGHT): a passing
+        mention counts less than a keyword the article is about.
+        """
+        hits = keyword_bm25(session, self.weights, article_ids)
+        return {
+            aid: sum(self.weights[k] * s / (s + BM25_HALF_WEIGHT) for k, s in matched.items())
+            for aid, matched in hits.items()
+        }
+
+
+# shared with the pre-judge's keyword feature, so both see the same matches
+KEYWORD_SCORER = KeywordScorer(KEYWORDS)
+
+
+def recency_scores(discovered_at: Sequence[datetime], now: datetime) -> np.ndarray:
+    """
+    Decay per item: 1.0 when new, 0.5 at the half-life, 0.25 at 2 half-lives.
+    """
+    ages = np.fromiter(((now - d).total_seconds() for d in discovered_at), dtype=np.float64, count=len(discovered_at))
+    hours = np.maximum(ages / 3600.0, 0.0)
+    return np.power(0.5, hours / RECENCY_HALF_LIFE_HOURS)
 
-def _source_weight(source: str) -> float:
-    return SOURCE_WEIGHTS.get(source, 1.0)
+
+def source_weights(sources: Sequence[Optional[str]]) -> np.ndarray:
+    return np.fromiter((SOURCE_WEIGHTS.get(s or "", 1.0) for s in sources), dtype=np.float64, count=len(sources))
+
+
+def heuristic_scores(
+    reps: Sequence[Article],
+    now: Optional[datetime] = None,
+    keyword_scores: Optional[Dict[int, float]] = None,
+) -> np.ndarray:
+    """
+    (2 * recency + keyword boosts) * source weight, for all reps at once.
+    Keyword boosts come from `keyword_scores` (by article id, see KeywordScorer.fts_scores)
+    when given, else from matching the reps' title + text in Python.
+    """
+    if not reps:
+        return np.zeros(0)
+    now = now or datetime.utcnow()
+    rec = recency_scores([a.discovered_at for a in reps], now) * 2.0  # recency contributes up to ~2 points
+    if keyword_scores is not None:                                    # keywords add small boosts
+        kw = np.fromiter((keyword_scores.get(a.id, 0.0) for a in reps), dtype=np.float64, count=len(reps))
+    else:
+        kw = KEYWORD_SCORER.scores([(a.title, a.text) for a in reps])
+    return (rec + kw) * source_weights([a.source for a in reps])       # source multiplier
 
 
 def select_top10(
     country_targets: Optional[Dict[str, int]] = None,
-    lookback_limit_articles: int = 500,
+    lookback_limit_clusters: int = 500,
+    *,
+    lookback_limit_articles: Optional[int] = None,
 ) -> List[RankedItem]:
     """
     Rank clusters, enforce country quotas (US/UK/FR), avoid repeats (sent_clusters),
-    and return 10 ranked items.
+    and return 10 ranked items. The newest `lookback_limit_clusters` unsent clusters
+    are considered, whatever their age (as before, no recency cutoff).
+
+    `lookback_limit_articles` is a deprecated alias of `lookback_limit_clusters`. It
+    used to cap the recent articles scanned (about 3 per cluster); it now caps
+    clusters, so the same value considers about 3x as many clusters.
     """
+    if lookback_limit_articles is not None:
+        warnings.warn(
+            "select_top10(lookback_limit_articles=...) is deprecated: the value now counts clusters, "
+            "not articles, so it considers about 3x as many as before; pass lookback_limit_clusters=",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        lookback_limit_clusters = lookback_limit_articles
     targets = dict(country_targets or DEFAULT_COUNTRY_TARGETS)
 
     with SessionLocal() as session:
-        sent = {cid for (cid,) in session.query(SentCluster.cluster_id).all()}
-
-        # Pull a recent slice of articles, then group by cluster_id in Python
-        arts: List[Article] = (
-            session.query(Article)
-            .order_by(Article.discovered_at.desc())
-            .limit(lookback_limit_articles)
-            .all()
-        )
-
-    # Group articles by cluster_id
-    clusters: Dict[int, List[Article]] = {}
-    for a in arts:
-        if a.cluster_id is None:
-            continue
-        if a.cluster_id in sent:
-            continue
-        clusters.setdefault(a.cluster_id, []).append(a)
-
-    now = datetime.utcnow()
-    ranked: List[RankedItem] = []
-
-    for cid, items in clusters.items():
-        # Representative article: prefer one with extracted text, else newest
-        rep = None
-        for it in items:
-            if it.text:
-                rep = it
-                break
-        if rep is None:
-            rep = sorted(items, key=lambda x: x.discovered_at, reverse=True)[0]
-
-        hours_old = (now - rep.discovered_at).total_seconds() / 3600.0
-        rec = _recency_score(hours_old) * 2.0  # recency contributes up to ~2 points
-        kw = _keyword_score(_text_blob(rep))   # keywords add small boosts
-        sw = _source_weight(rep.source or "")  # source multiplier
-
-        base = (rec + kw)
-        score = base * sw
-
-        ranked.append(
-            RankedItem(
-                cluster_id=cid,
-                score=score,
-                country=(rep.country or "UNK"),
-                source=(rep.source or "UNK"),
-                title=(rep.title or "(no title)"),
-                url=rep.url,
-                discovered_at=rep.discovered_at,
-            )
+        # Newest unsent clusters + their representative article (see cluster_summary)
+        summaries = unsent_recent_clusters(session, limit=lookback_limit_clusters, days=None)
+        # keyword boosts: one FTS query when the index exists, else the bodies are matched in Python
+        fts = fts_enabled(session)
+        rep_by_cluster = load_reps(session, summaries, with_text=not fts)
+        kw = KEYWORD_SCORER.fts_scores(session, [a.id for a in rep_by_cluster.values()]) if fts else None
+
+    cids: List[int] = list(rep_by_cluster)
+    reps: List[Article] = [rep_by_cluster[c] for c in cids]
+
+    scores = heuristic_scores(reps, keyword_scores=kw)
+    ranked: List[RankedItem] = [
+        RankedItem(
+            cluster_id=cid,
+            score=float(score),
+            country=(rep.country or "UNK"),
+            source=(rep.source or "UNK"),
+            title=(rep.title or "(no title)"),
+            url=rep.url,
+            discovered_at=rep.discovered_at,
         )
+        for cid, rep, score in zip(cids, reps, scores)
+    ]
 
     ranked.sort(key=lambda r: r.score, reverse=True)
 
@@ -195,4 +267,5 @@ def record_sent(cluster_ids: List[int]) -> None:
     with SessionLocal() as session:
         for cid in cluster_ids:
             session.add(SentCluster(cluster_id=cid))
+        mark_sent(session, cluster_ids)
         session.commit()
\ No newline at end of file
@@ -1,21 +1,16 @@
 from __future__ import annotations
 
-import json
 from dataclasses import dataclass
 from typing import Dict, List, Optional
 
-from app.candidate_filter import Candidate, filter_candidates_with_embeddings, select_cluster_reps
-from app.db import ArticleAnalysis, SentCluster, SessionLocal
-
-from app.db import Article, ArticleAnalysis, SentCluster, SessionLocal
-
-from datetime import datetime, timedelta
+from app.candidate_filter import Candidate
+from app.db import SessionLocal
+from app.queries import MIN_YOUR_RELEVANCE, judged_backlog
+from app.run_context import RunContext
 
 DEFAULT_COUNTRY_TARGETS: Dict[str, int] = {"US": 5, "UK": 4, "FR": 1}
 MAX_PER_SOURCE = 2
 
-MIN_YOUR_RELEVANCE = 6.0  # hard quality gate
-
 
 @dataclass
 class RankedLLMItem:
@@ -47,24 +42,6 @@ def looks_like_article(url: str) -> bool:
     ]
     return not any(b in u for b in bad)
 
-def _is_recent(published_at, discovered_at, days: int = 7) -> bool:
-    cutoff = datetime.utcnow() - timedelta(days=days)
-    if published_at is not None:
-        return published_at >= cutoff
-    return discovered_at >= cutoff
-
-def _passes_relevance_gate(judge_json: str | None) -> bool:
-    if not judge_json:
-        return True  # unjudged: allow (may be used as fallback)
-    try:
-        j = json.loads(judge_json)
-    except Exception:
-        return True
-    if not j:
-        return True
-    return bool(j.get("is_relevant", False)) and float(j.get("your_relevance", 0.0)) >= MIN_YOUR_RELEVANCE
-
-
 def _apply_constraints(
     ranked: List[RankedLLMItem],
     targets: Dict[str, int],
@@ -112,20 +89,17 @@ def _apply_constraints(
 def select_top10_llm(
     top_k: int = 60,
     country_targets: Optional[Dict[str, int]] = None,
+    ctx: Optional[RunContext] = None,
 ) -> List[RankedLLMItem]:
     targets = dict(country_targets or DEFAULT_COUNTRY_TARGETS)
+    ctx = ctx or RunContext()
 
     # Embedding shortlist (cheap)
-    candidates: List[Candidate] = filter_candidates_with_embeddings(top_k=top_k)
+    candidates: List[Candidate] = ctx.candidates(top_k=top_k)
 
-    # Representative articles per cluster
-    reps = select_cluster_reps()
-
-    # Load judge scores from DB + "sent" clusters
-    with SessionLocal() as session:
-        sent = {cid for (cid,) in session.query(SentCluster.cluster_id).all()}
-        analysis_rows = session.query(ArticleAnalysis).all()
-        analysis_by_article_id = {r.article_id: (r.judge_score, r.judge_json) for r in analysis_rows}
+    # Judge scores for the shortlisted reps + which of their clusters were sent
+    sent = ctx.sent_clusters(c.cluster_id for c in candidates)
+    scores, failing = ctx.judge_scores(c.article_id for c in candidates)
 
     ranked: List[RankedLLMItem] = []
 
@@ -138,23 +112,10 @@ def select_top10_llm(
         if c.cluster_id in sent:
             continue
 
-        a = reps.get(c.cluster_id)
-        if a is None:
+        # If judged, enforce relevance gate
+        if c.article_id in failing:
             continue
-
-        judge_score, judge_json = analysis_by_article_id.get(a.id, (None, None))
-
-        # If we have judged JSON, enforce relevance gate
-        if judge_json:
-            try:
-                j = json.loads(judge_json)
-            except Exception:
-                # malformed JSON shouldn't break ranking; treat as unjudged
-                j = None
-
-            if j:
-                if (not j.get("is_relevant", False)) or float(j.get("your_relevance", 0.0)) < MIN_YOUR_RELEVANCE:
-                    continue
+        judge_score = scores.get(c.article_id)
 
         # Score: prefer judge_score; fallback to similarity
         if judge_score is None:
@@ -225,6 +186,7 @@ def select_digest_items(
     backlog_limit: int = 1500,
     fallback_top_k: int = 120,
     country_targets: Optional[Dict[str, int]] = None,
+    ctx: Optional[RunContext] = None,
 ) -> List[RankedLLMItem]:
     """
     DB-first selection:
@@ -233,44 +195,26 @@ def select_digest_items(
     Returns between 0 and max_items, aiming for at least min_items when possible.
     """
     targets = dict(country_targets or DEFAULT_COUNTRY_TARGETS)
+    ctx = ctx or RunContext()
 
-    # --- Load sent clusters + judged backlog ---
+    # --- Judged backlog: gate, recency and "never sent" are filtered in SQL ---
     with SessionLocal() as session:
-        sent = {cid for (cid,) in session.query(SentCluster.cluster_id).all()}
-
-        # Join ArticleAnalysis -> Article for metadata and cluster_id
-        rows = (
-            session.query(Article, ArticleAnalysis)
-            .join(ArticleAnalysis, ArticleAnalysis.article_id == Article.id)
-            .filter(ArticleAnalysis.judge_score.isnot(None))
-            .order_by(ArticleAnalysis.judge_score.desc())
-            .limit(backlog_limit)
-            .all()
-        )
+        backlog = judged_backlog(session, limit=backlog_limit, days=7)
 
     ranked: List[RankedLLMItem] = []
-    for a, an in rows:
-        if a.cluster_id is None:
-            continue
-        if not _is_recent(a.published_at, a.discovered_at, days=7):
-            continue
-        cid = int(a.cluster_id)
-        if cid in sent:
-            continue
-        if not looks_like_article(a.url):
-            continue
-        if not _passes_relevance_gate(an.judge_json):
+    for b in backlog:
+        if not looks_like_article(b.url):
             continue
 
         ranked.append(
             RankedLLMItem(
-                cluster_id=cid,
-                score=float(an.judge_score),
-                similarity=float(an.profile_similarity or 0.0),
-                country=a.country or "UNK",
-                source=a.source or "UNK",
-                title=a.title or "(no title)",
-                url=a.url,
+                cluster_id=b.cluster_id,
+                score=b.judge_score,
+                similarity=b.similarity,
+                country=b.country,
+                source=b.source,
+                title=b.title,
+                url=b.url,
             )
         )
 
@@ -282,31 +226,23 @@ def select_digest_items(
     if len(picked) < min_items:
         already = {p.cluster_id for p in picked}
 
-        candidates: List[Candidate] = filter_candidates_with_embeddings(top_k=fallback_top_k)
-        reps = select_cluster_reps()
+        # Candidates are recent, unsent cluster reps (see select_cluster_reps)
+        candidates: List[Candidate] = ctx.candidates(top_k=fallback_top_k)
 
-        # Load analysis map once (so we can reuse judge_score if exists)
-        with SessionLocal() as session:
-            analysis_rows = session.query(ArticleAnalysis).all()
-            analysis_by_article_id = {r.article_id: (r.judge_score, r.judge_json) for r in analysis_rows}
+        # Judge scores / gate for the shortlisted reps (reuse judge_score if it exists)
+        scores, failing = ctx.judge_scores(c.article_id for c in candidates)
 
         fallback_ranked: List[RankedLLMItem] = []
         for c in candidates:
-            if c.cluster_id in sent or c.cluster_id in already:
+            if c.cluster_id in already:
                 continue
             if not looks_like_article(c.url):
                 continue
 
-            a = reps.get(c.cluster_id)
-            if not _is_recent(a.published_at, a.discovered_at, days=7):
-                continue
-            if not a:
-                continue
-
-            judge_score, judge_json = analysis_by_article_id.get(a.id, (None, None))
             # If judged and fails gate, skip
-            if judge_json and not _passes_relevance_gate(judge_json):
+            if c.article_id in failing:
                 continue
+            judge_score = scores.get(c.article_id)
 
             score = float(judge_score) if judge_score is not None else max(0.0, min(10.0, c.similarity * 20.0))
 
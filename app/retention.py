@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import (
+    Article,
+    ArticleAnalysis,
+    ClusterSummary,
+    CondensedText,
+    EmbeddingCache,
+    JudgeBatch,
+    JudgeCache,
+    LLMCall,
+    PipelineRun,
+    SentCluster,
+    SessionLocal,
+    engine,
+)
+from app.search import FTS_TABLE
+
+_BATCH = 1000  # articles archived per transaction
+# judge batches that will not change anymore (see judge_batch._OPEN for the others)
+_BATCH_DONE = ("ingested", "failed", "expired", "cancelled")
+
+
+@dataclass
+class RetentionReport:
+    html_dropped: int = 0
+    texts_archived: int = 0
+    archive_path: Optional[str] = None
+    condensed_pruned: int = 0
+    analysis_pruned: int = 0
+    sent_pruned: int = 0
+    summaries_pruned: int = 0
+    articles_pruned: int = 0
+    judge_cache_pruned: int = 0
+    embedding_cache_pruned: int = 0
+    llm_calls_pruned: int = 0
+    runs_pruned: int = 0
+    batches_pruned: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return max(self.bytes_before - self.bytes_after, 0)
+
+
+def _cutoff(days: int, now: datetime) -> Optional[datetime]:
+    return now - timedelta(days=days) if days > 0 else None  # 0 = policy off
+
+
+def drop_html(session: Session, cutoff: datetime) -> int:
+    """
+    Clears raw_html of articles discovered before `cutoff` (extraction is done with it by then).
+    """
+    return session.execute(
+        update(Article)
+        .where(Article.discovered_at < cutoff, Article.raw_html.is_not(None))
+        .values(raw_html=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def archive_texts(session: Session, cutoff: datetime, archive_dir: Path, now: datetime) -> tuple[int, Optional[Path]]:
+    """
+    Appends the text of articles discovered before `cutoff` to a gzip JSONL file
+    (one object per article), then clears Article.text and sets archived_at.
+    Each batch is written and flushed to the file before its DB commit, so a crash
+    can at worst archive a batch twice, never lose it. Returns (count, file).
+    """
+    path = archive_dir / f"articles-{now:%Y%m%d-%H%M%S}.jsonl.gz"
+    total = 0
+    out = None
+    try:
+        while True:
+            rows = session.execute(
+                select(
+                    Article.id, Article.url, Article.title, Article.source, Article.country,
+                    Article.published_at, Article.discovered_at, Article.cluster_id, Article.text,
+                )
+                .where(Article.discovered_at < cutoff, Article.text.is_not(None))
+                .order_by(Article.id)
+                .limit(_BATCH)
+            ).all()
+            if not rows:
+                break
+            if out is None:
+                archive_dir.mkdir(parents=True, exist_ok=True)
+                out = gzip.open(path, "at", encoding="utf-8")
+            for r in rows:
+                rec = r._asdict()
+                for k in ("published_at", "discovered_at"):
+                    rec[k] = rec[k].isoformat() if rec[k] else None
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+
+            ids = [r.id for r in rows]
+            session.execute(
+                update(Article)
+                .where(Article.id.in_(ids))
+                .values(text=None, archived_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            total += len(ids)
+    finally:
+        if out is not None:
+            out.close()
+    return total, (path if total else None)
+
+
+def prune_rows(session: Session, analysis_cutoff: Optional[datetime], article_cutoff: Optional[datetime]) -> dict:
+    """
+    Deletes derived rows nobody reads anymore:
+    - condensed texts of archived articles (their source text is gone),
+    - analysis, sent markers and cluster summaries older than the analysis horizon
+      (well past the 7-day digest window and the dedupe window of recent articles),
+    - article rows older than the article horizon (feeds no longer list those URLs).
+    """
+    counts = {}
+    archived = select(Article.id).where(Article.archived_at.is_not(None))
+    counts["condensed"] = session.execute(
+        delete(CondensedText).where(CondensedText.article_id.in_(archived)).execution_options(synchronize_session=False)
+    ).rowcount
+
+    counts["analysis"] = counts["sent"] = counts["summaries"] = counts["articles"] = 0
+    if analysis_cutoff is not None:
+        old = select(Article.id).where(Article.discovered_at < analysis_cutoff)
+        counts["analysis"] = session.execute(
+            delete(ArticleAnalysis).where(ArticleAnalysis.article_id.in_(old)).execution_options(synchronize_session=False)
+        ).rowcount
+        counts["sent"] = session.execute(
+            delete(SentCluster).where(SentCluster.sent_at < analysis_cutoff).execution_options(synchronize_session=False)
+        ).rowcount
+        counts["summaries"] = session.execute(
+            delete(ClusterSummary)
+            .where(ClusterSummary.last_seen_at < analysis_cutoff)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    if article_cutoff is not None:
+        counts["articles"] = session.execute(
+            delete(Article)
+            .where(Article.discovered_at < article_cutoff, Article.text.is_(None))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    session.commit()
+    return counts
+
+
+def prune_bookkeeping(
+    session: Session,
+    cache_cutoff: Optional[datetime],
+    ledger_cutoff: Optional[datetime],
+    runs_cutoff: Optional[datetime],
+) -> dict:
+    """
+    Deletes rows every LLM call or run adds, which nothing reads once old:
+    - judge cache entries neither written nor hit since the cache horizon, and
+      embedding cache entries written before it (re-embedding is cheap),
+    - llm_calls rows older than the ledger horizon,
+    - pipeline_runs checkpoints of runs whose last stage started before the runs
+      horizon (whole runs, so a pruned run never looks unfinished), and judge
+      batches that finished before it, with their input files.
+    """
+    counts = dict.fromkeys(("judge_cache", "embedding_cache", "llm_calls", "runs", "batches"), 0)
+    if cache_cutoff is not None:
+        counts["judge_cache"] = session.execute(
+            delete(JudgeCache)
+            .where(func.coalesce(JudgeCache.last_hit_at, JudgeCache.created_at) < cache_cutoff)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        counts["embedding_cache"] = session.execute(
+            delete(EmbeddingCache).where(EmbeddingCache.created_at < cache_cutoff).execution_options(synchronize_session=False)
+        ).rowcount
+
+    if ledger_cutoff is not None:
+        counts["llm_calls"] = session.execute(
+            delete(LLMCall).where(LLMCall.created_at < ledger_cutoff).execution_options(synchronize_session=False)
+        ).rowcount
+
+    if runs_cutoff is not None:
+        old_runs = [
+            r for (r,) in session.execute(
+                select(PipelineRun.run_id)
+                .group_by(PipelineRun.run_id)
+                .having(func.max(PipelineRun.started_at) < runs_cutoff)
+            )
+        ]
+        if old_runs:
+            session.execute(
+                delete(PipelineRun).where(PipelineRun.run_id.in_(old_runs)).execution_options(synchronize_session=False)
+            )
+        counts["runs"] = len(old_runs)
+
+        batches = session.execute(
+            select(JudgeBatch.id, JudgeBatch.input_path).where(
+                JudgeBatch.status.in_(_BATCH_DONE), JudgeBatch.created_at < runs_cutoff
+            )
+        ).all()
+        for b in batches:
+            Path(b.input_path).unlink(missing_ok=True)
+        if batches:
+            session.execute(
+                delete(JudgeBatch)
+                .where(JudgeBatch.id.in_([b.id for b in batches]))
+                .execution_options(synchronize_session=False)
+            )
+        counts["batches"] = len(batches)
+    session.commit()
+    return counts
+
+
+def db_size_bytes() -> int:
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            page_count = conn.exec_driver_sql("PRAGMA page_count").scalar()
+            page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            return int(page_count * page_size)
+        if engine.dialect.name == "postgresql":
+            return int(conn.exec_driver_sql("SELECT pg_database_size(current_database())").scalar())
+    return 0
+
+
+def compact(max_pages: Optional[int] = None) -> None:
+    """
+    Returns freed pages to the OS and refreshes planner statistics.
+    SQLite: incremental_vacuum (at most `max_pages` pages; the first run on a DB
+    created without auto_vacuum=INCREMENTAL does a one-time full VACUUM to switch
+    it over), PRAGMA optimize, WAL checkpoint.
+    Postgres: VACUUM (ANALYZE) of the tables retention deletes from.
+    """
+    pages = settings.RETENTION_VACUUM_PAGES if max_pages is None else max_pages
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")  # VACUUM can't run in a transaction
+        if engine.dialect.name == "sqlite":
+            if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:  # 2 = incremental
+                print("🧹 Switching the DB to incremental auto_vacuum (one-time full VACUUM)…")
+                conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.exec_driver_sql("VACUUM")
+            else:
+                # executescript steps the pragma to completion; a plain execute frees a single page
+                pragma = f"PRAGMA incremental_vacuum({int(pages)});" if pages else "PRAGMA incremental_vacuum;"
+                conn.connection.driver_connection.executescript(pragma)
+            if conn.exec_driver_sql(f"SELECT 1 FROM sqlite_master WHERE name = '{FTS_TABLE}'").first():
+                conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")  # merge FTS segments
+            conn.exec_driver_sql("PRAGMA optimize")
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").all()
+        elif engine.dialect.name == "postgresql":
+            for t in (
+                Article, ArticleAnalysis, CondensedText, SentCluster, ClusterSummary,
+                JudgeCache, EmbeddingCache, LLMCall, PipelineRun, JudgeBatch,
+            ):
+                conn.exec_driver_sql(f"VACUUM (ANALYZE) {t.__tablename__}")
+
+
+def run_retention(now: Optional[datetime] = None, vacuum: bool = True) -> RetentionReport:
+    """
+    Applies the RETENTION_* policies (see config), then compacts the DB.
+    """
+    now = now or datetime.utcnow()
+    report = RetentionReport(bytes_before=db_size_bytes())
+
+    with SessionLocal() as session:
+        html_cutoff = _cutoff(settings.RETENTION_HTML_DAYS, now)
+        if html_cutoff is not None:
+            report.html_dropped = drop_html(session, html_cutoff)
+            session.commit()
+
+        text_cutoff = _cutoff(settings.RETENTION_TEXT_DAYS, now)
+        if text_cutoff is not None:
+            n, path = archive_texts(session, text_cutoff, Path(settings.ARCHIVE_DIR), now)
+            report.texts_archived, report.archive_path = n, (str(path) if path else None)
+
+        counts = prune_rows(
+            session,
+            _cutoff(settings.RETENTION_ANALYSIS_DAYS, now),
+            _cutoff(settings.RETENTION_ARTICLE_DAYS, now),
+        )
+        report.condensed_pruned = counts["condensed"]
+        report.analysis_pruned = counts["analysis"]
+        report.sent_pruned = counts["sent"]
+        report.summaries_pruned = counts["summaries"]
+        report.articles_pruned = counts["articles"]
+
+        counts = prune_bookkeeping(
+            session,
+            _cutoff(settings.RETENTION_CACHE_DAYS, now),
+            _cutoff(settings.RETENTION_LEDGER_DAYS, now),
+            _cutoff(settings.RETENTION_RUNS_DAYS, now),
+        )
+        report.judge_cache_pruned = counts["judge_cache"]
+        report.embedding_cache_pruned = counts["embedding_cache"]
+        report.llm_calls_pruned = counts["llm_calls"]
+        report.runs_pruned = counts["runs"]
+        report.batches_pruned = counts["batches"]
+
+    if vacuum:
+        compact()
+    report.bytes_after = db_size_bytes()
+    return report
+
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.candidate_filter import Candidate, load_profile_vectors, rank_candidates, select_cluster_reps
+from app.config import settings
+from app.db import Article, SessionLocal
+from app.queries import judge_scores, sent_cluster_ids
+
+
+class RunContext:
+    """
+    Per-run memo of what several stages read: cluster reps, profile vectors,
+    the embedding-ranked candidates, judge scores and "already sent" lookups.
+    Stages that write call the matching invalidate_* method so later stages
+    in the same run see their writes.
+    """
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id
+        self._reps: Optional[Dict[int, Article]] = None
+        self._profile_vecs: Optional[List[List[float]]] = None
+        self._candidates: Dict[int, List[Candidate]] = {}  # by cascade_m
+        self._scores: Dict[int, Optional[float]] = {}      # article_id -> judge_score (None = unjudged)
+        self._failing: Set[int] = set()
+        self._sent: Dict[int, bool] = {}                   # cluster_id -> already sent
+
+    # --- reads (memoized) ---
+
+    def reps(self) -> Dict[int, Article]:
+        if self._reps is None:
+            self._reps = select_cluster_reps()
+        return self._reps
+
+    def profile_vecs(self) -> List[List[float]]:
+        if self._profile_vecs is None:
+            self._profile_vecs = load_profile_vectors()
+        return self._profile_vecs
+
+    def candidates(self, top_k: int, cascade_m: Optional[int] = None) -> List[Candidate]:
+        m = settings.EMBED_CASCADE_M if cascade_m is None else cascade_m
+        if m not in self._candidates:
+            self._candidates[m] = rank_candidates(self.reps(), self.profile_vecs(), m)
+        return self._candidates[m][:top_k]
+
+    def judge_scores(self, article_ids: Iterable[int]) -> Tuple[Dict[int, float], Set[int]]:
+        """
+        (judge_score by article_id, ids failing the relevance gate), querying only ids not seen yet.
+        """
+        ids = list(article_ids)
+        missing = [i for i in set(ids) if i not in self._scores]
+        if missing:
+            with SessionLocal() as session:
+                scores, failing = judge_scores(session, missing)
+            for i in missing:
+                self._scores[i] = scores.get(i)
+            self._failing.update(failing)
+        scores = {i: self._scores[i] for i in ids if self._scores.get(i) is not None}
+        return scores, {i for i in ids if i in self._failing}
+
+    def sent_clusters(self, cluster_ids: Iterable[int]) -> Set[int]:
+        """
+        The subset of `cluster_ids` already sent, querying only ids not seen yet.
+        """
+        ids = list(cluster_ids)
+        missing = [c for c in set(ids) if c not in self._sent]
+        if missing:
+            with SessionLocal() as session:
+                sent = sent_cluster_ids(session, missing)
+            for c in missing:
+                self._sent[c] = c in sent
+        return {c for c in ids if self._sent[c]}
+
+    # --- invalidation (call after a stage writes) ---
+
+    def invalidate_articles(self) -> None:
+        # new/extracted/re-clustered articles change reps and everything ranked from them
+        self._reps = None
+        self._candidates.clear()
+
+    def invalidate_judgements(self, article_ids: Optional[Iterable[int]] = None) -> None:
+        ids = list(self._scores) if article_ids is None else list(article_ids)
+        for i in ids:
+            self._scores.pop(i, None)
+            self._failing.discard(i)
+
+    def new_run(self, run_id: Optional[str]) -> None:
+        """
+        Starts the next run of a long-lived process (the daemon): drops everything read
+        from the DB but keeps the profile vectors, which only change with data/profile.yaml.
+        """
+        self.run_id = run_id
+        self._scores.clear()
+        self._failing.clear()
+        self.invalidate_sent()
+
+    def invalidate_sent(self) -> None:
+        # sent clusters drop out of the reps as well
+        self._sent.clear()
+        self.invalidate_articles()
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text as sql_text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+# SQLite FTS5 index over Article.title + Article.text (external content: the text is
+# stored once, in `articles`). unicode61 with remove_diacritics folds "é" to "e", so
+# FR and EN queries match with or without accents. Kept in sync by triggers; text
+# cleared by retention leaves the article findable by title.
+FTS_TABLE = "articles_fts"
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+TITLE_WEIGHT = 3.0  # bm25 column weights: a title hit counts more than a body hit
+# SQLite rejects a compound SELECT with more terms (SQLITE_MAX_COMPOUND_SELECT)
+_MAX_COMPOUND = 500
+
+_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, text, content='articles', content_rowid='id', tokenize='{FTS_TOKENIZER}', prefix='3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, text ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, title, text) VALUES (new.id, new.title, new.text);
+    END
+    """,
+]
+
+
+def create_fts(conn: Connection) -> bool:
+    """
+    Creates the FTS5 table + sync triggers and indexes existing rows.
+    Returns False (and does nothing) when the DB is not SQLite.
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    for ddl in _FTS_DDL:
+        conn.execute(sql_text(ddl))
+    conn.execute(sql_text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+def fts_enabled(session: Session) -> bool:
+    if session.get_bind().dialect.name != "sqlite":
+        return False
+    return session.execute(
+        sql_text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first() is not None
+
+
+_WORD = re.compile(r"\w+\*?")
+
+
+def fts_query(text: str) -> str:
+    """
+    Plain words -> FTS5 query: every word must match (AND), a trailing * is a prefix match.
+    Quoting each word keeps user input from being parsed as FTS5 syntax.
+    """
+    terms = []
+    for w in _WORD.findall(text):
+        star = w.endswith("*")
+        w = w.rstrip("*")
+        if w:
+            terms.append(f'"{w}"' + ("*" if star else ""))
+    return " ".join(terms)
+
+
+def _phrase(keyword: str) -> str:
+    # a multi-word keyword ("series a") is one phrase; the tokenizer splits "fine-tune" the same way
+    return '"' + keyword.replace('"', " ") + '"'
+
+
+@dataclass
+class SearchHit:
+    article_id: int
+    cluster_id: Optional[int]
+    score: float  # -bm25: higher = better
+    title: str
+    source: str
+    url: str
+    discovered_at: datetime
+    snippet: str
+
+
+def search(session: Session, query: str, limit: int = 20, days: Optional[int] = None, raw: bool = False) -> List[SearchHit]:
+    """
+    Best matching articles over the whole history (or the last `days` days), BM25 ranked.
+    With raw=True, `query` is passed to FTS5 as-is (operators, column filters, NEAR ...).
+    """
+    q = query if raw else fts_query(query)
+    if not q:
+        return []
+    params: Dict[str, object] = {"q": q, "limit": limit}
+    since = ""
+    if days is not None:
+        since = "AND a.discovered_at >= :since"
+        params["since"] = datetime.utcnow() - timedelta(days=days)
+    rows = session.execute(
+        sql_text(
+            f"""
+            SELECT a.id, a.cluster_id, -bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0) AS score,
+                   a.title, a.source, a.url, a.discovered_at,
+                   snippet({FTS_TABLE}, -1, '[', ']', '…', 12) AS snip
+            FROM {FTS_TABLE}
+            JOIN articles a ON a.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :q {since}
+            ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0)
+            LIMIT :limit
+            """
+        ),
+        params,
+    ).all()
+    return [
+        SearchHit(
+            article_id=r[0],
+            cluster_id=r[1],
+            score=float(r[2]),
+            title=r[3] or "(no title)",
+            source=r[4] or "UNK",
+            url=r[5],
+            discovered_at=r[6] if isinstance(r[6], datetime) else datetime.fromisoformat(r[6]),
+            snippet=r[7] or "",
+        )
+        for r in rows
+    ]
+
+
+def keyword_bm25(session: Session, weights: Dict[str, float], article_ids: Iterable[int]) -> Dict[int, Dict[str, float]]:
+    """
+    For the given articles, the BM25 score (> 0) of every keyword they match: one MATCH
+    per keyword combined with UNION ALL (at most _MAX_COMPOUND keywords per statement),
+    restricted to the id range of `article_ids` (pushed down into FTS5; the candidates
+    are recent, so the range is narrow) and then to the ids themselves.
+    Returns {article_id: {keyword: bm25}}; articles without a match are absent.
+    """
+    ids = set(article_ids)
+    if not ids or not weights:
+        return {}
+    keywords = list(weights)
+    out: Dict[int, Dict[str, float]] = {}
+    for start in range(0, len(keywords), _MAX_COMPOUND):
+        params: Dict[str, object] = {"lo": min(ids), "hi": max(ids)}
+        parts = []
+        for i in range(start, min(start + _MAX_COMPOUND, len(keywords))):
+            params[f"k{i}"] = _phrase(keywords[i])
+            parts.append(
+                f"SELECT rowid, {i}, -bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH :k{i} AND rowid BETWEEN :lo AND :hi"
+            )
+        for aid, kw, score in session.execute(sql_text(" UNION ALL ".join(parts)), params):
+            if aid in ids:
+                out.setdefault(int(aid), {})[keywords[kw]] = float(score)
+    return out
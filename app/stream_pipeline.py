@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.config import settings
+from app.db import Article, ClusterSummary, SessionLocal
+from app.dedupe import assign_clusters
+from app.extract import FetchResult, apply_results, extract_article, extract_queue, fetch_article, http_client
+from app.ingest_rss import feed_rows, insert_articles, load_sources
+
+# Streaming variant of the ingest -> extract -> dedupe steps of run_pipeline: every stage
+# runs in its own worker threads, connected by bounded queues, so an article is fetched
+# as soon as its feed is inserted, extracted as soon as it is fetched, and so on. A full
+# queue blocks its producer (backpressure); run time approaches the slowest stage.
+#
+#   feeds -> ingest (N) -> fetch (N) -> extract (N) -> store/cluster (1) -> embed (1)
+#
+# All article writes go through the single store thread; the other stages only read.
+#
+# Clustering is not per article: assign_clusters only groups not-yet-clustered titles
+# with each other (an article never joins an existing cluster), so clustering each feed
+# as it is stored would split a story whose copies arrive from different feeds. The
+# store thread clusters once, when every feed is in, while pages are still being
+# fetched and extracted; the result is the same as the sequential pipeline's.
+
+_DONE = object()     # end of input, one per worker
+_CLUSTER = object()  # store stage: all feeds are in, cluster the new titles now
+
+
+@dataclass
+class StageStats:
+    workers: int
+    items: int = 0
+    errors: int = 0
+    busy_s: float = 0.0  # summed over workers
+
+
+@dataclass
+class StreamReport:
+    feeds: int = 0
+    added: int = 0
+    seen: int = 0
+    backlog: int = 0
+    fetch_failed: int = 0
+    extract_ok: int = 0
+    extract_failed: int = 0
+    clustered: int = 0
+    clusters: int = 0
+    embedded: int = 0
+    wall_s: float = 0.0
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+
+
+class _Stage:
+    """
+    `workers` threads applying `fn` to the items of `inbox` until they get _DONE.
+    An item that raises is counted and skipped, it doesn't stop the stage.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], None], workers: int, inbox: queue.Queue, stats: StageStats):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.stats = stats
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True) for i in range(max(workers, 1))
+        ]
+
+    def start(self) -> "_Stage":
+        for t in self._threads:
+            t.start()
+        return self
+
+    def _run(self) -> None:
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                return
+            t0 = time.perf_counter()
+            failed = False
+            try:
+                self.fn(item)
+            except Exception as e:
+                failed = True
+                print(f"⚠️ {self.name} stage: {type(e).__name__}: {e}")
+            with self._lock:
+                self.stats.items += 1
+                self.stats.errors += failed
+                self.stats.busy_s += time.perf_counter() - t0
+
+    def close(self) -> None:
+        """
+        Lets the workers finish the queued items, then waits for them.
+        """
+        for _ in self._threads:
+            self.inbox.put(_DONE)
+        for t in self._threads:
+            t.join()
+
+
+def _batches(inbox: queue.Queue, size: int, idle_s: float = 0.5):
+    """
+    Yields lists of up to `size` items (sooner when the queue stays empty for `idle_s`)
+    and markers on their own, until _DONE.
+    """
+    batch: List[Any] = []
+    while True:
+        try:
+            item = inbox.get(timeout=idle_s if batch else None)
+        except queue.Empty:
+            yield batch
+            batch = []
+            continue
+        if item is _DONE or item is _CLUSTER:
+            if batch:
+                yield batch
+                batch = []
+            if item is _DONE:
+                return
+            yield item
+            continue
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+
+
+def _embed_inputs(article_ids: List[int]) -> int:
+    """
+    Puts the embeddings rank_candidates will ask for into the embedding cache: the title
+    with the cascade on, else title + condensed body. Only current cluster representatives
+    are embedded, as rank_candidates never embeds the other members.
+    Returns the number of inputs.
+    """
+    # imported here: candidate_filter loads the embedding client stack, not needed otherwise
+    from app.candidate_filter import _full_inputs
+    from app.embeddings import embed_texts_cached
+
+    with SessionLocal() as session:
+        arts = (
+            session.query(Article)
+            .join(ClusterSummary, ClusterSummary.rep_article_id == Article.id)
+            .filter(Article.id.in_(article_ids))
+            .all()
+        )
+    if not arts:
+        return 0
+    if settings.EMBED_CASCADE_M > 0:
+        embed_texts_cached([a.title or "(no title)" for a in arts], stage="embed_title")
+    else:
+        embed_texts_cached(_full_inputs(arts))
+    return len(arts)
+
+
+def run_streaming_ingest(
+    cluster_limit: int = 200,
+    threshold: int = 92,
+    max_fetch: Optional[int] = None,
+    backlog: Optional[int] = None,
+    timeout_s: float = 20.0,
+) -> StreamReport:
+    """
+    Ingests all feeds and fetches, extracts, clusters and (optionally) pre-embeds the new
+    articles that are cluster representatives, plus up to `backlog` older ones without text, all stages overlapping.
+    Equivalent to ingest_rss + fetch_and_extract + assign_clusters run one after the other.
+    """
+    max_fetch = settings.STREAM_MAX_FETCH if max_fetch is None else max_fetch
+    backlog = settings.STREAM_BACKLOG if backlog is None else backlog
+    qsize = max(settings.STREAM_QUEUE_SIZE, 1)
+    embed = settings.STREAM_EMBED_PREWARM
+
+    report = StreamReport()
+    stats = report.stages = {
+        "ingest": StageStats(settings.STREAM_INGEST_WORKERS),
+        "fetch": StageStats(settings.STREAM_FETCH_WORKERS),
+        "extract": StageStats(settings.STREAM_EXTRACT_WORKERS),
+        "store": StageStats(1),
+    }
+    if embed:
+        stats["embed"] = StageStats(1)
+
+    feed_q: queue.Queue = queue.Queue()
+    fetch_q: queue.Queue = queue.Queue(qsize)
+    extract_q: queue.Queue = queue.Queue(qsize)
+    store_q: queue.Queue = queue.Queue(qsize)
+    embed_q: queue.Queue = queue.Queue(qsize)
+
+    lock = threading.Lock()
+    seen_in_run: Set[str] = set()
+    queued: Set[int] = set()
+
+    def enqueue_fetch(article_id: int, url: str) -> bool:
+        with lock:
+            if article_id in queued or len(queued) >= max_fetch:
+                return False
+            queued.add(article_id)
+        fetch_q.put((article_id, url))  # blocks while the fetchers are behind
+        return True
+
+    def ingest(src) -> None:
+        rows = []
+        for row in feed_rows(src):
+            with lock:
+                if row["url"] in seen_in_run:
+                    report.seen += 1
+                    continue
+                seen_in_run.add(row["url"])
+            rows.append(row)
+        new = insert_articles(rows)
+        with lock:
+            report.added += len(new)
+            report.seen += len(rows) - len(new)
+        for article_id, url in new:
+            enqueue_fetch(article_id, url)
+
+    def fetch(item) -> None:
+        article_id, url = item
+        res = fetch_article(client, article_id, url)
+        if res.fetch_status != "ok":
+            with lock:
+                report.fetch_failed += 1
+        extract_q.put(res)
+
+    def extract(res: FetchResult) -> None:
+        store_q.put(extract_article(res))
+
+    def store() -> None:
+        st = stats["store"]
+        clustered = False
+        unclustered: List[int] = []  # extracted before clustering: not a cluster rep yet
+        for batch in _batches(store_q, settings.STREAM_WRITE_BATCH):
+            t0 = time.perf_counter()
+            try:
+                if batch is _CLUSTER:
+                    report.clustered, report.clusters = assign_clusters(limit=cluster_limit, threshold=threshold)
+                    clustered = True
+                    for article_id in unclustered:
+                        embed_q.put(article_id)
+                    unclustered.clear()
+                    continue
+                with SessionLocal() as session:
+                    ok, fail = apply_results(session, batch)
+                    session.commit()
+                report.extract_ok += ok
+                report.extract_failed += fail - sum(r.fetch_status != "ok" for r in batch)
+                st.items += len(batch)
+                if embed:
+                    ok_ids = [r.article_id for r in batch if r.ok]
+                    if clustered:
+                        for article_id in ok_ids:
+                            embed_q.put(article_id)
+                    else:
+                        unclustered.extend(ok_ids)
+            except Exception as e:
+                st.errors += 1
+                print(f"⚠️ store stage: {type(e).__name__}: {e}")
+            finally:
+                st.busy_s += time.perf_counter() - t0
+
+    def embed_worker() -> None:
+        st = stats["embed"]
+        for batch in _batches(embed_q, settings.STREAM_EMBED_BATCH):
+            t0 = time.perf_counter()
+            try:
+                n = _embed_inputs(batch)
+                report.embedded += n
+                st.items += n
+            except Exception as e:
+                st.errors += 1
+                print(f"⚠️ embed stage: {type(e).__name__}: {e}")
+            finally:
+                st.busy_s += time.perf_counter() - t0
+
+    t_start = time.perf_counter()
+    sources = load_sources()
+    report.feeds = len(sources)
+    for src in sources:
+        feed_q.put(src)
+
+    threads = [threading.Thread(target=store, name="store", daemon=True)]
+    if embed:
+        threads.append(threading.Thread(target=embed_worker, name="embed", daemon=True))
+    for t in threads:
+        t.start()
+
+    with http_client(timeout_s) as client:
+        ingest_stage = _Stage("ingest", ingest, settings.STREAM_INGEST_WORKERS, feed_q, stats["ingest"]).start()
+        fetch_stage = _Stage("fetch", fetch, settings.STREAM_FETCH_WORKERS, fetch_q, stats["fetch"]).start()
+        extract_stage = _Stage("extract", extract, settings.STREAM_EXTRACT_WORKERS, extract_q, stats["extract"]).start()
+
+        ingest_stage.close()
+        store_q.put(_CLUSTER)  # titles are all in: cluster while pages are still being fetched
+
+        # older articles still without text (failed or over the budget of earlier runs)
+        with SessionLocal() as session:
+            rows = [(a.id, a.url) for a in extract_queue(session, limit=len(queued) + backlog)]
+        for article_id, url in rows:
+            if report.backlog >= backlog:
+                break
+            if enqueue_fetch(article_id, url):
+                report.backlog += 1
+
+        fetch_stage.close()
+        extract_stage.close()
+
+    store_q.put(_DONE)
+    threads[0].join()
+    if embed:
+        embed_q.put(_DONE)
+        threads[1].join()
+
+    report.wall_s = time.perf_counter() - t_start
+    return report
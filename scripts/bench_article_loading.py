@@ -0,0 +1,130 @@
+"""
+Latency and peak Python memory of the metadata-only Article queries, with the
+deferred bodies (current mapping) vs. the same queries loading raw_html + text
+as before, on a synthetic DB of extracted articles:
+
+    python -m scripts.bench_article_loading --db /tmp/bench_articles.db --articles 50000
+
+The DB file is created (and filled) if it doesn't exist yet. No network or LLM calls.
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--db", default="/tmp/bench_articles.db")
+parser.add_argument("--articles", type=int, default=50_000)
+parser.add_argument("--html-kb", type=int, default=20, help="raw_html size per article")
+parser.add_argument("--text-kb", type=int, default=4, help="extracted text size per article")
+parser.add_argument("--repeat", type=int, default=5)
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.orm import undefer  # noqa: E402
+
+from app.bulk import upsert  # noqa: E402
+from app.cluster_summary import rebuild_all, unsent_recent_clusters  # noqa: E402
+from app.db import Article, SessionLocal, init_db  # noqa: E402
+
+MEMBERS_PER_CLUSTER = 3
+
+
+def _fill(n: int) -> None:
+    now = datetime.utcnow()
+    html = "<p>" + "x" * (args.html_kb * 1024) + "</p>"
+    text = "y" * (args.text_kb * 1024)
+    batch = 2000
+    for start in range(0, n, batch):
+        rows = []
+        for i in range(start, min(start + batch, n)):
+            seen = now - timedelta(minutes=i)
+            rows.append(
+                {
+                    "url": f"https://bench.example/{i}",
+                    "title": f"story {i // MEMBERS_PER_CLUSTER} about a model release",
+                    "source": "Example",
+                    "country": "US",
+                    "published_at": seen,
+                    "discovered_at": seen,
+                    "raw_html": html,
+                    "text": text,
+                    "cluster_id": i // MEMBERS_PER_CLUSTER + 1,
+                }
+            )
+        with SessionLocal() as session:
+            upsert(session, Article, rows, ["url"])
+            session.commit()
+    with SessionLocal() as session:
+        rebuild_all(session)
+        session.commit()
+
+
+def _measure(fn):
+    runs = []
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    tracemalloc.start()  # separate run: tracing slows allocation-heavy code down
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(runs) * 1000, peak / 1e6
+
+
+def _bodies(eager: bool):
+    return [undefer(Article.raw_html), undefer(Article.text)] if eager else []
+
+
+def _reps(eager: bool) -> None:
+    # select_cluster_reps / rank_llm candidates: 200 newest unsent cluster reps
+    with SessionLocal() as session:
+        ids = [s.rep_article_id for s in unsent_recent_clusters(session, limit=200)]
+        session.query(Article).options(*_bodies(eager)).filter(Article.id.in_(ids)).all()
+
+
+def _dedupe(eager: bool) -> None:
+    # dedupe.assign_clusters: newest 200 articles, titles only
+    with SessionLocal() as session:
+        session.query(Article).options(*_bodies(eager)).order_by(Article.discovered_at.desc()).limit(200).all()
+
+
+def _brief(eager: bool) -> None:
+    # brief._build_top10_notes: newest article of 10 clusters
+    with SessionLocal() as session:
+        for cid in range(1, 11):
+            (
+                session.query(Article)
+                .options(*_bodies(eager))
+                .filter(Article.cluster_id == cid)
+                .order_by(Article.discovered_at.desc())
+                .first()
+            )
+
+
+def _top10(eager: bool) -> None:
+    # rank.select_top10: 500 reps, text needed (keyword boosts), raw_html not
+    with SessionLocal() as session:
+        ids = [s.rep_article_id for s in unsent_recent_clusters(session, limit=500)]
+        opts = _bodies(True) if eager else [undefer(Article.text)]
+        session.query(Article).options(*opts).filter(Article.id.in_(ids)).all()
+
+
+if __name__ == "__main__":
+    init_db()
+    with SessionLocal() as session:
+        have = session.query(func.count(Article.id)).scalar() or 0
+    if have < args.articles:
+        print(f"⏳ Filling {args.db} with {args.articles - have} extracted articles…")
+        _fill(args.articles)
+    print(f"🏁 {args.articles} articles, raw_html {args.html_kb} KB + text {args.text_kb} KB each")
+    print(f"{'query':<14} {'bodies ms':>10} {'deferred ms':>12} {'bodies MB':>10} {'deferred MB':>12}")
+    for label, fn in [("cluster reps", _reps), ("dedupe window", _dedupe), ("brief notes", _brief), ("top10 (text)", _top10)]:
+        eager_ms, eager_mb = _measure(lambda: fn(True))
+        lazy_ms, lazy_mb = _measure(lambda: fn(False))
+        print(f"{label:<14} {eager_ms:>10.1f} {lazy_ms:>12.1f} {eager_mb:>10.1f} {lazy_mb:>12.1f}")
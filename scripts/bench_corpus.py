@@ -0,0 +1,481 @@
+"""
+Synthetic news corpus + a local stand-in for everything the pipeline talks to over
+HTTP: RSS feeds, article pages and an OpenAI-compatible /v1/embeddings + /v1/responses
+endpoint, each with configurable latency, plus /v1/files + /v1/batches for the Batch
+API judge mode. Used by scripts.bench_suite and scripts.check_batch_resume; can also
+be run on its own to point a manual pipeline run at it:
+
+    python -m scripts.bench_corpus --articles 10000 --port 8765
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=bench ...
+
+Everything is derived from (seed, index), so pages and feeds are never stored and two
+runs with the same arguments serve exactly the same corpus. No app imports here: the
+server runs in its own process, outside the code being measured.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import email
+import email.policy
+import functools
+import hashlib
+import json
+import math
+import random
+import re
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+import zlib
+from dataclasses import dataclass
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+SOURCES = [
+    ("TechCrunch", "US", "en"), ("The Verge", "US", "en"), ("Wired", "US", "en"), ("Ars Technica", "US", "en"),
+    ("BBC News - Technology", "UK", "en"), ("The Guardian - Technology", "UK", "en"),
+    ("Le Monde - Pixels", "FR", "fr"), ("Les Echos - Tech", "FR", "fr"),
+]
+
+# Topic words overlap data/profile.yaml, so embedding similarity and judge scores vary meaningfully
+EN = {
+    "subject": "OpenAI Anthropic Mistral Nvidia Google Meta Microsoft Apple Amazon Hugging-Face Cohere DeepMind".split(),
+    "verb": "launches unveils releases acquires invests-in partners-with open-sources delays tests ships".split(),
+    "object": ["coding agent", "reasoning model", "inference chip", "clinical AI assistant", "multi-agent framework",
+               "fine-tuning service", "eval suite", "safety policy", "Series B round", "AI copilot", "robotics model",
+               "data center", "open-weight LLM", "FDA-cleared tool", "developer IDE"],
+    "tail": ["for enterprises", "in Europe", "amid regulation push", "for hospitals", "for developers",
+             "after record quarter", "with new benchmarks", "to rival competitors"],
+    "filler": ("The company said the release improves latency and accuracy on internal benchmarks, while analysts "
+               "noted that competition for enterprise customers keeps intensifying across the sector.").split(),
+}
+FR = {
+    "subject": "Mistral OpenAI Nabla Doctolib Hugging-Face Dust Owkin Photoroom Pigment Alan".split(),
+    "verb": "lance dévoile présente rachète lève annonce teste publie".split(),
+    "object": ["un agent de codage", "un modèle de raisonnement", "un assistant clinique", "une puce d'inférence",
+               "une levée de fonds", "un copilote IA", "un modèle ouvert", "un outil certifié"],
+    "tail": ["pour les hôpitaux", "en Europe", "face à la régulation", "pour les développeurs", "aux États-Unis"],
+    "filler": ("L'entreprise affirme que cette version améliore nettement la précision, tandis que les analystes "
+               "soulignent une concurrence de plus en plus vive sur le marché européen.").split(),
+}
+_VARIANTS_EN = ["{t}", "Exclusive: {t}", "{t} - report", "{t}, sources say", "{t} (update)"]
+_VARIANTS_FR = ["{t}", "Exclusif : {t}", "{t}, selon nos informations", "{t} (mise à jour)"]
+
+
+@dataclass
+class Item:
+    index: int
+    story: int
+    source: str
+    country: str
+    lang: str
+    title: str
+    age_minutes: int  # 0 = newest
+
+
+class Corpus:
+    """
+    `articles` articles grouped into stories: each story is told by 1..max_dupes sources
+    with near-duplicate titles (what dedupe must merge). Index 0 is the newest article;
+    ages spread evenly over `days`. fr_share of the stories are French.
+    """
+
+    def __init__(self, articles: int, seed: int = 7, fr_share: float = 0.15, max_dupes: int = 4, days: int = 30,
+                 feed_size: int = 500):
+        self.n = articles
+        self.seed = seed
+        self.fr_share = fr_share
+        self.max_dupes = max_dupes
+        self.days = days
+        self.feed_size = feed_size
+        # story of each article: consecutive runs of 1..max_dupes articles
+        rnd = random.Random(seed)
+        self._story: List[int] = []
+        story = 0
+        while len(self._story) < articles:
+            self._story.extend([story] * rnd.randint(1, max_dupes))
+            story += 1
+        del self._story[articles:]
+
+    def _rnd(self, *key) -> random.Random:
+        # seeded from a string, not hash(): identical in the server and the bench process
+        return random.Random(":".join(map(str, (self.seed,) + key)))
+
+    def _story_title(self, story: int) -> Tuple[str, str]:
+        r = self._rnd("story", story)
+        lang = "fr" if r.random() < self.fr_share else "en"
+        v = FR if lang == "fr" else EN
+        title = f"{r.choice(v['subject'])} {r.choice(v['verb']).replace('-', ' ')} {r.choice(v['object'])} {r.choice(v['tail'])}"
+        return lang, title
+
+    @functools.lru_cache(maxsize=None)
+    def item(self, i: int) -> Item:
+        story = self._story[i]
+        lang, base = self._story_title(story)
+        r = self._rnd("item", i)
+        sources = [s for s in SOURCES if s[2] == lang]
+        name, country, _ = r.choice(sources)
+        title = r.choice(_VARIANTS_FR if lang == "fr" else _VARIANTS_EN).format(t=base)
+        age = int(i * self.days * 24 * 60 / max(self.n, 1))
+        return Item(i, story, name, country, lang, title, age)
+
+    def text(self, i: int) -> str:
+        it = self.item(i)
+        return it.title + ".\n\n" + self._body(it.story, it.lang)
+
+    @functools.lru_cache(maxsize=4096)
+    def _body(self, story: int, lang: str, paragraphs: int = 6) -> str:
+        # same story -> same body (syndicated copies and re-posts share their content)
+        v = FR if lang == "fr" else EN
+        r = self._rnd("text", story)
+        paras = []
+        for _ in range(paragraphs):
+            words = [r.choice(v["filler"]) for _ in range(45)] + [r.choice(v["object"]), r.choice(v["subject"])]
+            paras.append(" ".join(words).capitalize() + ".")
+        return "\n\n".join(paras)
+
+    @functools.cached_property
+    def feeds(self) -> List[Tuple[int, List[int]]]:
+        """
+        (index in SOURCES, article indexes) per feed: each source's articles, newest
+        first, split into feeds of at most feed_size items.
+        """
+        by_source: Dict[str, List[int]] = {}
+        for i in range(self.n):
+            by_source.setdefault(self.item(i).source, []).append(i)
+        feeds = []
+        for k, (name, _, _) in enumerate(SOURCES):
+            items = by_source.get(name, [])
+            feeds += [(k, items[j : j + self.feed_size]) for j in range(0, len(items), self.feed_size)]
+        return feeds
+
+    def sources_yaml(self, base_url: str) -> str:
+        """
+        data/sources.yaml equivalent listing every feed of the corpus.
+        """
+        lines = ["rss_sources:"]
+        for f, (k, _) in enumerate(self.feeds):
+            name, country, _ = SOURCES[k]
+            lines += [f'  - name: "{name}"', f"    country: {country}", f"    url: {base_url}/feeds/{f}.xml"]
+        return "\n".join(lines) + "\n"
+
+
+# --- stand-in server ---
+
+_EMBED_DIMS = 256
+_PROFILE_WORDS = set(
+    "agent agents agentic multi-agent llm llms inference fine-tuning eval evals safety governance coding ide "
+    "copilot copilots startups venture series health clinical fda trials reasoning model agent codage clinique".split()
+)
+_WORD = re.compile(r"[\w'-]+")
+
+
+def fake_embedding(text: str, dims: int = _EMBED_DIMS) -> List[float]:
+    """
+    Hashed bag of words, L2-normalized: texts sharing words get similar vectors.
+    """
+    v = [0.0] * dims
+    for w in _WORD.findall(text.lower()):
+        h = zlib.crc32(w.encode("utf-8"))
+        v[h % dims] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in v)) or 1.0
+    return [x / norm for x in v]
+
+
+def fake_verdict(content: str) -> Dict:
+    words = set(_WORD.findall(content.lower()))
+    hits = len(words & _PROFILE_WORDS)
+    h = int(hashlib.sha256(content.encode("utf-8")).hexdigest()[:8], 16)
+    rel = min(10, hits * 2 + h % 3)
+    return {
+        "is_relevant": rel >= 4,
+        "topics": sorted(words & _PROFILE_WORDS)[:3] or ["other"],
+        "your_relevance": rel,
+        "impact": 3 + h % 6,
+        "novelty": 2 + (h >> 4) % 7,
+        "credibility": 5 + (h >> 8) % 5,
+        "depth": 2 + (h >> 12) % 6,
+        "hype_risk": (h >> 16) % 6,
+        "one_sentence_takeaway": content.removeprefix("Article:").strip().split("\n", 1)[0][:160],
+        "why_it_matters": ["Synthetic verdict for benchmarking"],
+    }
+
+
+def _response_text(body: Dict) -> str:
+    fmt = ((body.get("text") or {}).get("format") or {}).get("name")
+    messages = body.get("input") or []
+    user = "\n".join(m.get("content", "") for m in messages if isinstance(m, dict) and m.get("role") == "user")
+    if fmt == "article_judge":
+        return json.dumps(fake_verdict(user))
+    if fmt == "article_judge_group":
+        parts = re.split(r"^### Article id=(\S+)\n", user, flags=re.M)
+        verdicts = [{"id": aid, **fake_verdict(content)} for aid, content in zip(parts[1::2], parts[2::2])]
+        return json.dumps({"verdicts": verdicts})
+    titles = [ln.strip() for ln in user.splitlines() if ln.strip()][:6]
+    brief = "\n".join(f"- {t[:120]}" for t in titles) or "- Quiet news day"
+    return f"Big news brief:\n{brief}\n\nWhat to remember:\n- Synthetic brief for benchmarking"
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StandIn(BaseHTTPRequestHandler):
+    corpus: Corpus
+    base_url: str
+    latency_s: Dict[str, float]
+    batch_s: float  # how long a batch stays in_progress
+    # uploaded files and batches, kept for the server's lifetime (clients may restart meanwhile)
+    files: Dict[str, Dict[str, Any]] = {}
+    batches: Dict[str, Dict[str, Any]] = {}
+    lock = threading.Lock()
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+    disable_nagle_algorithm = True  # else headers + body in two writes wait on delayed ACKs
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, code: int, body: bytes, ctype: str) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, obj: Dict) -> None:
+        self._send(200, json.dumps(obj).encode("utf-8"), "application/json")
+
+    def do_GET(self) -> None:
+        m = re.fullmatch(r"/feeds/(\d+)\.xml", self.path)
+        if m and int(m.group(1)) < len(self.corpus.feeds):
+            time.sleep(self.latency_s["feed"])
+            return self._send(200, self._rss(int(m.group(1))), "application/rss+xml; charset=utf-8")
+        m = re.fullmatch(r"/articles/(\d+)\.html", self.path)
+        if m and int(m.group(1)) < self.corpus.n:
+            time.sleep(self.latency_s["page"])
+            return self._send(200, self._page(int(m.group(1))), "text/html; charset=utf-8")
+        if self.path.startswith("/v1/"):
+            return self._batch_api_get(self.path[3:].split("?", 1)[0])
+        self._send(404, b"not found", "text/plain")
+
+    def do_POST(self) -> None:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.latency_s["llm"])
+        if self.path.endswith("/files"):
+            return self._json(self._upload(raw))
+        body = json.loads(raw or b"{}")
+        if self.path.endswith("/embeddings"):
+            return self._json(self._embeddings(body))
+        if self.path.endswith("/responses"):
+            return self._json(self._response(body))
+        if self.path.endswith("/batches"):
+            return self._json(self._create_batch(body))
+        self._send(404, b"{}", "application/json")
+
+    def _rss(self, feed: int) -> bytes:
+        now = datetime.now(timezone.utc)
+        items = []
+        for i in self.corpus.feeds[feed][1]:
+            it = self.corpus.item(i)
+            pub = format_datetime(now - timedelta(minutes=it.age_minutes))
+            items.append(
+                f"<item><title>{escape(it.title)}</title><link>{self.base_url}/articles/{i}.html</link>"
+                f"<pubDate>{pub}</pubDate></item>"
+            )
+        return (
+            f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Bench feed {feed}</title>'
+            f"{''.join(items)}</channel></rss>"
+        ).encode("utf-8")
+
+    def _page(self, i: int) -> bytes:
+        it = self.corpus.item(i)
+        paras = "".join(f"<p>{escape(p)}</p>" for p in self.corpus.text(i).split("\n\n")[1:])
+        nav = "".join(f'<li><a href="/articles/{j}.html">Related {j}</a></li>' for j in range(i + 1, i + 6))
+        return (
+            f'<!doctype html><html lang="{it.lang}"><head><meta charset="utf-8"><title>{escape(it.title)}</title></head>'
+            f"<body><header><nav><ul>{nav}</ul></nav></header><main><article><h1>{escape(it.title)}</h1>"
+            f"<p class=byline>{escape(it.source)}</p>{paras}</article></main><footer>© Bench</footer></body></html>"
+        ).encode("utf-8")
+
+    def _embeddings(self, body: Dict) -> Dict:
+        texts = body.get("input") or []
+        texts = [texts] if isinstance(texts, str) else texts
+        b64 = body.get("encoding_format") == "base64"
+        data = []
+        for k, t in enumerate(texts):
+            vec = fake_embedding(t)
+            emb = base64.b64encode(struct.pack(f"<{len(vec)}f", *vec)).decode("ascii") if b64 else vec
+            data.append({"object": "embedding", "index": k, "embedding": emb})
+        n = sum(_tokens(t) for t in texts)
+        return {"object": "list", "data": data, "model": body.get("model", ""),
+                "usage": {"prompt_tokens": n, "total_tokens": n}}
+
+    def _response(self, body: Dict) -> Dict:
+        out = _response_text(body)
+        n_in = _tokens(json.dumps(body.get("input", "")))
+        n_out = _tokens(out)
+        return {
+            "id": "resp_bench", "object": "response", "created_at": int(time.time()), "status": "completed",
+            "model": body.get("model", ""), "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+            "output": [{
+                "type": "message", "id": "msg_bench", "status": "completed", "role": "assistant",
+                "content": [{"type": "output_text", "text": out, "annotations": []}],
+            }],
+            "usage": {
+                "input_tokens": n_in, "output_tokens": n_out, "total_tokens": n_in + n_out,
+                "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        }
+
+
+    # --- Files + Batch API: a batch completes batch_s after creation, its output computed then ---
+
+    def _upload(self, raw: bytes) -> Dict:
+        msg = email.message_from_bytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw, policy=email.policy.HTTP
+        )
+        parts = {p.get_param("name", header="content-disposition"): p for p in msg.iter_parts()}
+        data = parts["file"].get_payload(decode=True)
+        f = {
+            "id": f"file-{uuid.uuid4().hex[:12]}", "object": "file", "bytes": len(data), "created_at": int(time.time()),
+            "filename": parts["file"].get_filename() or "upload.jsonl", "purpose": "batch", "status": "processed",
+        }
+        with self.lock:
+            self.files[f["id"]] = {**f, "content": data}
+        return f
+
+    def _create_batch(self, body: Dict) -> Dict:
+        b = {
+            "id": f"batch_{uuid.uuid4().hex[:12]}", "object": "batch", "endpoint": body.get("endpoint"),
+            "input_file_id": body.get("input_file_id"), "completion_window": body.get("completion_window", "24h"),
+            "status": "validating", "created_at": int(time.time()), "output_file_id": None, "error_file_id": None,
+            "metadata": body.get("metadata"),
+        }
+        with self.lock:
+            self.batches[b["id"]] = b
+        return b
+
+    def _advance(self, b: Dict) -> Dict:
+        with self.lock:
+            if b["status"] in ("validating", "in_progress"):
+                b["status"] = "in_progress"
+                if time.time() - b["created_at"] >= self.batch_s:
+                    b["output_file_id"] = self._run_batch(b)
+                    b["status"] = "completed"
+                    b["completed_at"] = int(time.time())
+        return b
+
+    def _run_batch(self, b: Dict) -> str:
+        lines = []
+        for ln in self.files[b["input_file_id"]]["content"].decode("utf-8").splitlines():
+            if ln.strip():
+                req = json.loads(ln)
+                lines.append(json.dumps({
+                    "id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": req["custom_id"], "error": None,
+                    "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": self._response(req["body"])},
+                }))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        fid = f"file-{uuid.uuid4().hex[:12]}"
+        self.files[fid] = {"id": fid, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                           "filename": "batch_output.jsonl", "purpose": "batch_output", "status": "processed",
+                           "content": data}
+        return fid
+
+    def _batch_api_get(self, path: str) -> None:
+        if path == "/batches":
+            data = [self._advance(b) for b in list(self.batches.values())]
+            return self._json({"object": "list", "data": data, "has_more": False})
+        m = re.fullmatch(r"/batches/([\w-]+)", path)
+        if m and m.group(1) in self.batches:
+            return self._json(self._advance(self.batches[m.group(1)]))
+        m = re.fullmatch(r"/files/([\w-]+)/content", path)
+        if m and m.group(1) in self.files:
+            return self._send(200, self.files[m.group(1)]["content"], "application/octet-stream")
+        self._send(404, b"{}", "application/json")
+
+
+def serve(corpus: Corpus, port: int = 0, feed_ms: float = 50, page_ms: float = 50, llm_ms: float = 200,
+          batch_s: float = 2.0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    The stand-in HTTP server for `corpus` (not started: call .serve_forever()).
+    """
+    corpus.feeds  # build the feed lists before the first request
+    srv = ThreadingHTTPServer((host, port), StandIn)
+    srv.daemon_threads = True
+    StandIn.corpus = corpus
+    StandIn.base_url = f"http://{host}:{srv.server_address[1]}"
+    StandIn.latency_s = {"feed": feed_ms / 1000, "page": page_ms / 1000, "llm": llm_ms / 1000}
+    StandIn.batch_s = batch_s
+    return srv
+
+
+def start_stand_in(articles: int, args: argparse.Namespace, log_path: Path) -> Tuple[subprocess.Popen, str]:
+    """
+    Runs the stand-in (with the add_corpus_args settings of `args`) in its own process,
+    so serving pages / verdicts does not compete for the GIL with the code being
+    measured. Returns the process and its base URL once it answers.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    cmd = [sys.executable, "-m", "scripts.bench_corpus", "--articles", str(articles), "--port", str(port)]
+    for opt in _CORPUS_OPTS:
+        cmd += [opt, str(getattr(args, opt[2:].replace("-", "_")))]
+    log = open(log_path, "w")
+    proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while True:
+        try:
+            urllib.request.urlopen(f"{base_url}/feeds/0.xml", timeout=60).read()
+            return proc, base_url
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                raise RuntimeError(f"stand-in server did not start (see {log_path})")
+            time.sleep(0.2)
+
+
+_CORPUS_OPTS = ("--seed", "--fr-share", "--max-dupes", "--feed-size", "--feed-ms", "--page-ms", "--llm-ms", "--batch-s")
+
+
+def add_corpus_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--fr-share", type=float, default=0.15, help="share of French stories")
+    parser.add_argument("--max-dupes", type=int, default=4, help="max sources telling the same story")
+    parser.add_argument("--feed-size", type=int, default=500, help="items per RSS feed")
+    parser.add_argument("--feed-ms", type=float, default=50, help="latency of a feed request")
+    parser.add_argument("--page-ms", type=float, default=50, help="latency of an article page request")
+    parser.add_argument("--llm-ms", type=float, default=200, help="latency of an embeddings / responses request")
+    parser.add_argument("--batch-s", type=float, default=2.0, help="time a Batch API batch takes to complete")
+
+
+def corpus_from_args(args: argparse.Namespace, articles: Optional[int] = None) -> Corpus:
+    return Corpus(articles or args.articles, seed=args.seed, fr_share=args.fr_share, max_dupes=args.max_dupes,
+                  feed_size=args.feed_size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a synthetic corpus + OpenAI-compatible stand-in.")
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--port", type=int, default=8765)
+    add_corpus_args(parser)
+    args = parser.parse_args()
+
+    corpus = corpus_from_args(args)
+    srv = serve(corpus, args.port, args.feed_ms, args.page_ms, args.llm_ms, args.batch_s)
+    print(f"🛰️ Serving {corpus.n} articles in {len(corpus.feeds)} feeds on {StandIn.base_url} (Ctrl-C to stop)", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,108 @@
+"""
+Compares single-article judge calls with multi-article (grouped) calls on
+articles from the local DB: requests, wall time, tokens per verdict, and
+score agreement with the single-article path.
+
+    python -m scripts.bench_judge_grouping --n 24 --group-sizes 4 8
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from openai import OpenAI
+from sqlalchemy.orm import undefer
+
+from app.config import settings
+from app.db import Article, SessionLocal
+from app.judge import (
+    build_judge_group_request,
+    build_judge_request,
+    parse_judge_group_output,
+    parse_judge_output,
+)
+
+
+def _load_items(n: int) -> List[Tuple[str, str, str]]:
+    with SessionLocal() as session:
+        rows = (
+            session.query(Article)
+            .options(undefer(Article.text))
+            .filter(Article.text.is_not(None))
+            .order_by(Article.discovered_at.desc())
+            .limit(n)
+            .all()
+        )
+        return [(str(a.id), a.title or "", a.text or "") for a in rows]
+
+
+def _run_single(client: OpenAI, items) -> Tuple[Dict[str, float], dict]:
+    scores: Dict[str, float] = {}
+    stats = {"requests": 0, "input_tokens": 0, "output_tokens": 0, "fallbacks": 0}
+    t0 = time.perf_counter()
+    for aid, title, text in items:
+        resp = client.responses.create(**build_judge_request(title, text))
+        stats["requests"] += 1
+        stats["input_tokens"] += resp.usage.input_tokens
+        stats["output_tokens"] += resp.usage.output_tokens
+        scores[aid] = parse_judge_output(resp.output_text)["final_score"]
+    stats["wall_s"] = time.perf_counter() - t0
+    return scores, stats
+
+
+def _run_grouped(client: OpenAI, items, group_size: int) -> Tuple[Dict[str, float], dict]:
+    scores: Dict[str, float] = {}
+    stats = {"requests": 0, "input_tokens": 0, "output_tokens": 0, "fallbacks": 0}
+    t0 = time.perf_counter()
+    for i in range(0, len(items), group_size):
+        group = items[i : i + group_size]
+        resp = client.responses.create(**build_judge_group_request(group))
+        stats["requests"] += 1
+        stats["input_tokens"] += resp.usage.input_tokens
+        stats["output_tokens"] += resp.usage.output_tokens
+        verdicts = parse_judge_group_output(resp.output_text, [aid for aid, _, _ in group])
+        for aid, title, text in group:
+            if aid in verdicts:
+                scores[aid] = verdicts[aid]["final_score"]
+                continue
+            # same fallback as the executor: single call for anything missing/invalid
+            stats["fallbacks"] += 1
+            r = client.responses.create(**build_judge_request(title, text))
+            stats["requests"] += 1
+            stats["input_tokens"] += r.usage.input_tokens
+            stats["output_tokens"] += r.usage.output_tokens
+            scores[aid] = parse_judge_output(r.output_text)["final_score"]
+    stats["wall_s"] = time.perf_counter() - t0
+    return scores, stats
+
+
+def _print_row(label: str, n: int, stats: dict, mad: float | None) -> None:
+    print(
+        f"{label:<10} requests={stats['requests']:<4} fallbacks={stats['fallbacks']:<3} "
+        f"wall={stats['wall_s']:.1f}s verdicts/request={n / max(1, stats['requests']):.2f} "
+        f"in_tok/verdict={stats['input_tokens'] / n:.0f} out_tok/verdict={stats['output_tokens'] / n:.0f}"
+        + (f" |Δscore| vs single={mad:.2f}" if mad is not None else "")
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=24, help="articles to judge")
+    parser.add_argument("--group-sizes", type=int, nargs="+", default=[4, 8])
+    args = parser.parse_args()
+
+    if not settings.OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY missing. Add it to .env")
+    client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    items = _load_items(args.n)
+    if not items:
+        raise SystemExit("No extracted articles in the DB; run the pipeline first.")
+    n = len(items)
+
+    base_scores, base_stats = _run_single(client, items)
+    _print_row("single", n, base_stats, None)
+
+    for g in args.group_sizes:
+        scores, stats = _run_grouped(client, items, g)
+        mad = sum(abs(scores[k] - base_scores[k]) for k in base_scores) / n
+        _print_row(f"group={g}", n, stats, mad)
@@ -0,0 +1,101 @@
+"""
+Replays recent articles through the judge with the old single-string prompt
+(v1: instructions and article in one input string) and the current layout
+(static developer prefix + article user message + prompt_cache_key), and
+reports time to first token, cached input tokens and input cost per judgement.
+
+    python -m scripts.bench_prompt_cache --n 40
+"""
+import argparse
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.condense import condensed_texts
+from app.config import settings
+from app.db import Article, SessionLocal
+from app.judge import JUDGE_MODEL, JUDGE_SCHEMA, build_judge_request, judge_content
+from app.llm_gateway import get_client
+from app.llm_ledger import _percentile, estimate_cost
+
+# The judge prompt as it was before the static-prefix layout (JUDGE_PROMPT_VERSION v1)
+_V1_INSTRUCTIONS = """
+You are scoring news articles for a personal tech/AI digest.
+Return JSON matching the provided schema.
+
+Scoring guidance:
+- "is_relevant": true if the article is meaningfully about AI, agentic systems, ML, tech startups/venture, developer tools, or health AI.
+- Prefer high scores for: concrete new info, real product/technical substance, credible reporting.
+- Penalize hype and shallow takes.
+""".strip()
+
+
+def _v1_request(title: str, text: str) -> Dict[str, Any]:
+    return {
+        "model": JUDGE_MODEL,
+        "input": f"{_V1_INSTRUCTIONS}\n\nArticle:\n{judge_content(title, text)}",
+        "text": {"format": {"type": "json_schema", "name": "article_judge", "schema": JUDGE_SCHEMA, "strict": True}},
+    }
+
+
+def _load_items(n: int) -> List[Tuple[str, str]]:
+    with SessionLocal() as session:
+        arts = (
+            session.query(Article)
+            .filter(Article.text.is_not(None))
+            .order_by(Article.discovered_at.desc())
+            .limit(n)
+            .all()
+        )
+        bodies = condensed_texts(arts, "judge", settings.CONDENSE_JUDGE_TOKENS, JUDGE_MODEL, session=session)
+        session.commit()
+        return [(a.title or "", bodies.get(a.id, "")) for a in arts]
+
+
+def _replay(items: List[Tuple[str, str]], build) -> Dict[str, float]:
+    client = get_client()
+    ttft: List[float] = []
+    inp = cached = out = 0
+    for title, text in items:
+        t0 = time.perf_counter()
+        first = None
+        usage = None
+        for event in client.responses.create(stream=True, **build(title, text)):
+            if first is None and event.type == "response.output_text.delta":
+                first = time.perf_counter() - t0
+            elif event.type == "response.completed":
+                usage = event.response.usage
+        ttft.append((first if first is not None else time.perf_counter() - t0) * 1000.0)
+        if usage is not None:
+            inp += usage.input_tokens
+            out += usage.output_tokens
+            details = getattr(usage, "input_tokens_details", None)
+            cached += (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+    ttft.sort()
+    n = max(1, len(items))
+    return {
+        "ttft_p50": _percentile(ttft, 0.50),
+        "ttft_p95": _percentile(ttft, 0.95),
+        "in_tok": inp / n,
+        "cached_share": cached / inp if inp else 0.0,
+        "in_cost": estimate_cost(JUDGE_MODEL, inp, 0, cached) / n,
+        "total_cost": estimate_cost(JUDGE_MODEL, inp, out, cached) / n,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=40, help="articles to replay (30+ to see caching settle)")
+    args = parser.parse_args()
+
+    items = _load_items(args.n)
+    if not items:
+        raise SystemExit("No extracted articles in the DB; run the pipeline first.")
+
+    print(f"replaying {len(items)} judgements per layout")
+    for label, build in (("v1 inline", _v1_request), ("prefix", build_judge_request)):
+        r = _replay(items, build)
+        print(
+            f"{label:<10} ttft p50={r['ttft_p50']:.0f}ms p95={r['ttft_p95']:.0f}ms  "
+            f"in_tok/judgement={r['in_tok']:.0f} cached={r['cached_share']:.0%}  "
+            f"input ${r['in_cost'] * 1000:.3f}/1k judgements  total ${r['total_cost'] * 1000:.3f}/1k"
+        )
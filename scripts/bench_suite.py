@@ -0,0 +1,273 @@
+"""
+Offline end-to-end benchmarks of the pipeline stages on a synthetic corpus, against the
+local stand-in server of scripts.bench_corpus (RSS feeds, article pages, OpenAI-compatible
+embeddings / responses) instead of live sites and the OpenAI API:
+
+    python -m scripts.bench_suite                                  # 1k, 10k and 100k articles
+    python -m scripts.bench_suite --scales 1000 --llm-ms 0         # quick run, no simulated latency
+    python -m scripts.bench_suite --scales 10000 --fail-on-regression
+
+Each scale runs in its own process on a fresh SQLite database (in --workdir):
+ingest_rss reads every article of the corpus from the stand-in feeds; the older articles
+then get their text, ground-truth clusters and a share of verdicts written directly (as
+if earlier runs had processed them), and the newest --window articles go through
+fetch_and_extract, assign_clusters, filter_candidates_with_embeddings,
+analyze_top_candidates and select_digest_items like in a pipeline run.
+
+Results go to --results/<time>-<commit>.json, plus one line per (scale, bench) in
+--results/history.jsonl; each run is compared with the latest run of another commit
+(or --baseline) measured with the same parameters.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from scripts.bench_corpus import add_corpus_args, corpus_from_args, fake_verdict, start_stand_in
+
+COMPARED = ("wall_s", "cpu_s", "db_queries")
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--scales", default="1000,10000,100000", help="comma separated article counts")
+parser.add_argument("--window", type=int, default=200, help="newest articles left for fetch/dedupe to process")
+parser.add_argument("--fetch", type=int, default=100, help="fetch_and_extract limit")
+parser.add_argument("--judged", type=float, default=0.2, help="share of older clusters with a verdict")
+parser.add_argument("--workdir", default=None, help="databases and stand-in logs (default: a temp dir)")
+parser.add_argument("--results", default="bench_results")
+parser.add_argument("--baseline", default=None, help="commit to compare with (default: latest other commit)")
+parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as a regression")
+parser.add_argument("--min-delta-s", type=float, default=0.05, help="ignore wall time changes smaller than this")
+parser.add_argument("--fail-on-regression", action="store_true")
+parser.add_argument("--one", type=int, default=None, help=argparse.SUPPRESS)  # child: run one scale
+parser.add_argument("--out", default=None, help=argparse.SUPPRESS)
+add_corpus_args(parser)
+args = parser.parse_args()
+
+
+def _params() -> Dict[str, Any]:
+    """
+    Everything that changes the numbers besides the code: only runs with equal params are compared.
+    """
+    keys = ("window", "fetch", "judged", "seed", "fr_share", "max_dupes", "feed_size", "feed_ms", "page_ms", "llm_ms")
+    return {k: getattr(args, k) for k in keys}
+
+
+def _git(*cmd: str) -> str:
+    try:
+        return subprocess.run(["git", *cmd], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _summary(out: Any) -> Any:
+    if isinstance(out, (list, dict)):
+        return {"items": len(out)}
+    if isinstance(out, tuple):
+        return list(out)
+    if hasattr(out, "__dataclass_fields__"):
+        return {k: v for k, v in vars(out).items() if isinstance(v, (int, float))}
+    return out
+
+
+def _run_scale(articles: int, workdir: Path) -> Dict[str, Any]:
+    """
+    One scale, in this (child) process. The app is imported here, after its
+    environment (database, OpenAI endpoint) points at the bench setup.
+    """
+    db = workdir / f"bench-{articles}.db"
+    for p in workdir.glob(f"bench-{articles}.db*"):
+        p.unlink()
+
+    proc, base_url = start_stand_in(articles, args, workdir / f"stand-in-{articles}.log")
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{db}",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "OPENAI_API_KEY": "bench",
+        "METRICS_DIR": str(workdir / "reports"),
+        "METRICS_PROM_FILE": "",
+        "PREJUDGE_MODEL_PATH": str(workdir / "no-prejudge.json"),  # a locally trained model would skew judging
+        "JUDGE_RATE_PER_MIN": "1000000",  # measure the code + stand-in latency, not the rate limiter
+    })
+
+    from sqlalchemy import update
+
+    from app import ingest_rss as ir, metrics
+    from app.analyze_candidates import analyze_top_candidates, judgement_values, write_judgements
+    from app.candidate_filter import filter_candidates_with_embeddings
+    from app.cluster_summary import rebuild_all
+    from app.db import Article, SessionLocal, init_db
+    from app.dedupe import assign_clusters
+    from app.extract import fetch_and_extract
+    from app.judge import compute_final_score
+    from app.rank_llm import select_digest_items
+
+    corpus = corpus_from_args(args, articles)
+    sources = workdir / f"sources-{articles}.yaml"
+    sources.write_text(corpus.sources_yaml(base_url), encoding="utf-8")
+    ir.SOURCES_PATH = sources
+    init_db()
+
+    results: Dict[str, Any] = {}
+
+    def bench(name: str, fn: Callable[[], Any]) -> None:
+        metrics.reset()
+        with metrics.stage(name) as s:
+            out = fn()
+        snap = metrics.snapshot()
+        results[name] = {
+            "wall_s": round(s.wall_s, 4),
+            "cpu_s": round(s.cpu_s, 4),
+            "db_queries": s.db_queries,
+            "db_s": round(s.db_s, 4),
+            "max_rss_mb": s.max_rss_mb,
+            "result": _summary(out),
+            "timers": {k: {"calls": t["calls"], "total_s": round(t["total_s"], 4)} for k, t in snap["timers"].items()},
+        }
+        print(f"  {name:<34} {s.wall_s:>8.2f}s wall {s.cpu_s:>7.2f}s cpu {s.db_queries:>6} queries  {_summary(out)}")
+
+    def prefill() -> Dict[str, int]:
+        """
+        Older articles as earlier runs left them: text, clusters (the corpus' stories),
+        spread discovery times and verdicts for a share of the clusters.
+        """
+        now = datetime.utcnow()
+        with SessionLocal() as session:
+            rows = session.query(Article.id, Article.url).all()
+        updates, reps = [], {}
+        for aid, url in rows:
+            it = corpus.item(int(url.rsplit("/", 1)[1].split(".")[0]))
+            seen = now - timedelta(minutes=it.age_minutes)
+            u = {"id": aid, "discovered_at": seen}
+            if it.index >= args.window:
+                u.update(text=corpus.text(it.index), xtracted_at=seen, cluster_id=it.story + 1)
+                reps.setdefault(it.story + 1, (aid, it))
+            updates.append(u)
+        with SessionLocal() as session:
+            for i in range(0, len(updates), 5000):
+                session.execute(update(Article), updates[i : i + 5000])
+            clusters = rebuild_all(session)
+            session.commit()
+
+        verdicts = []
+        judged = list(reps.items())[:: max(1, round(1 / args.judged))] if args.judged > 0 else []
+        for cid, (aid, it) in judged:
+            j = fake_verdict(corpus.text(it.index))
+            j["final_score"] = compute_final_score(j)
+            verdicts.append(judgement_values(aid, cid, j, similarity=0.3 + (aid % 50) / 100))
+        with SessionLocal() as session:
+            for i in range(0, len(verdicts), 5000):
+                write_judgements(session, verdicts[i : i + 5000])
+            session.commit()
+        return {"articles": len(updates), "clusters": clusters, "verdicts": len(verdicts)}
+
+    print(f"🏁 {articles} articles in {len(corpus.feeds)} feeds (stand-in at {base_url})")
+    t0 = time.perf_counter()
+    try:
+        bench("ingest_rss", ir.ingest_rss)
+        setup = prefill()
+        print(f"  (prefilled {setup['articles']} articles, {setup['clusters']} clusters, {setup['verdicts']} verdicts "
+              f"in {time.perf_counter() - t0 - results['ingest_rss']['wall_s']:.1f}s)")
+        bench("fetch_and_extract", lambda: fetch_and_extract(limit=args.fetch))
+        bench("assign_clusters", lambda: assign_clusters(limit=args.window, threshold=92))
+        bench("filter_candidates_with_embeddings", lambda: filter_candidates_with_embeddings(top_k=120))
+        bench("analyze_top_candidates", lambda: analyze_top_candidates(top_k=120, max_new_judgements=30))
+        bench("select_digest_items", lambda: select_digest_items(min_items=6, max_items=10))
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {"articles": articles, "setup": setup, "total_s": round(time.perf_counter() - t0, 2), "benches": results}
+
+
+def _load_history(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def _compare(run: Dict[str, Any], history: List[Dict[str, Any]]) -> int:
+    """
+    Prints each bench against the baseline commit's latest result; returns the number of regressions.
+    """
+    older = [h for h in history if h["params"] == run["params"] and h["commit"] != run["commit"]]
+    if args.baseline:
+        older = [h for h in older if h["commit"].startswith(args.baseline)]
+    if not older:
+        print("ℹ️ No earlier run of another commit with the same parameters to compare with.")
+        return 0
+    base_commit = older[-1]["commit"]
+    base = {(h["articles"], h["bench"]): h for h in older if h["commit"] == base_commit}
+
+    print(f"\n📈 Compared with {base_commit} ({older[-1]['at']}):")
+    regressions = 0
+    for scale in run["scales"].values():
+        for name, r in scale.get("benches", {}).items():
+            b = base.get((scale["articles"], name))
+            if b is None:
+                continue
+            deltas = "  ".join(
+                f"{k} {b[k]}→{r[k]} ({(r[k] - b[k]) / b[k]:+.0%})" if b[k] else f"{k} {b[k]}→{r[k]}" for k in COMPARED
+            )
+            slower = r["wall_s"] - b["wall_s"]
+            flag = slower > args.min_delta_s and b["wall_s"] and slower / b["wall_s"] > args.threshold
+            regressions += bool(flag)
+            print(f"  {'⚠️' if flag else '  '} {scale['articles']:>7} {name:<34} {deltas}")
+    return regressions
+
+
+if __name__ == "__main__":
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="news-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    if args.one is not None:
+        Path(args.out).write_text(json.dumps(_run_scale(args.one, workdir), default=str), encoding="utf-8")
+        sys.exit(0)
+
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    run: Dict[str, Any] = {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "params": _params(),
+        "scales": {},
+    }
+    failed = False
+    for n in [int(s) for s in args.scales.split(",") if s.strip()]:
+        # one process per scale: fresh app state, and its own memory high-water mark
+        out = workdir / f"result-{n}.json"
+        child = [sys.executable, "-m", "scripts.bench_suite", *sys.argv[1:], "--one", str(n), "--out", str(out),
+                 "--workdir", str(workdir)]
+        if subprocess.run(child).returncode != 0 or not out.exists():
+            print(f"❌ Scale {n} failed")
+            run["scales"][str(n)] = {"articles": n, "error": "benchmark process failed"}
+            failed = True
+            continue
+        run["scales"][str(n)] = json.loads(out.read_text(encoding="utf-8"))
+        out.unlink()
+
+    results = Path(args.results)
+    results.mkdir(parents=True, exist_ok=True)
+    history_path = results / "history.jsonl"
+    history = _load_history(history_path)
+    regressions = _compare(run, history)
+
+    path = results / f"{datetime.now():%Y%m%dT%H%M%S}-{commit}.json"
+    path.write_text(json.dumps(run, indent=2), encoding="utf-8")
+    with history_path.open("a", encoding="utf-8") as f:
+        for scale in run["scales"].values():
+            for name, r in scale.get("benches", {}).items():
+                row = {k: run[k] for k in ("commit", "dirty", "at", "params")}
+                row.update(articles=scale["articles"], bench=name, **{k: r[k] for k in ("wall_s", "cpu_s", "db_queries", "db_s", "max_rss_mb")})
+                f.write(json.dumps(row) + "\n")
+    print(f"\n💾 Results: {path} (history: {history_path})")
+
+    if failed or (args.fail_on_regression and regressions):
+        sys.exit(1)
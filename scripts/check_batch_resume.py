@@ -0,0 +1,117 @@
+"""
+Offline check of the resumable Batch API judge flow, across a restart: against the
+local stand-in of scripts.bench_corpus, one process prepares, uploads and submits a
+batch and exits; a second one resumes it, polls until the batch completes and ingests
+the verdicts; a third finds nothing left to do. Fails (exit 1) if the resumed flow
+re-creates the batch, loses verdicts or ingests twice.
+
+    python -m scripts.check_batch_resume [--articles 60] [--batch-s 2]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from scripts.bench_corpus import add_corpus_args, corpus_from_args, start_stand_in
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--articles", type=int, default=60)
+parser.add_argument("--workdir", default=None, help="database, batch files and stand-in log (default: a temp dir)")
+parser.add_argument("--step", choices=("submit", "resume", "again"), default=None, help=argparse.SUPPRESS)
+add_corpus_args(parser)
+parser.set_defaults(llm_ms=0)
+args = parser.parse_args()
+
+
+def _seed(base_url: str) -> None:
+    """
+    Extracted, clustered recent articles: what the judge picks candidates from.
+    """
+    from app.bulk import upsert
+    from app.cluster_summary import rebuild_all
+    from app.db import Article, SessionLocal
+
+    corpus = corpus_from_args(args)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(corpus.n):
+        it = corpus.item(i)
+        rows.append({
+            "url": f"{base_url}/articles/{i}.html", "title": it.title, "source": it.source, "country": it.country,
+            "discovered_at": now - timedelta(minutes=i), "text": corpus.text(i), "cluster_id": it.story + 1,
+        })
+    with SessionLocal() as session:
+        upsert(session, Article, rows, conflict_cols=["url"])
+        rebuild_all(session)
+        session.commit()
+
+
+def _step(step: str, workdir: Path) -> int:
+    from app import judge_batch as jb
+    from app.db import ArticleAnalysis, JudgeBatch, SessionLocal, init_db
+
+    jb.BATCH_DIR = workdir / "batches"
+    transport = jb.OpenAIBatchTransport()
+    init_db()
+
+    def batches():
+        with SessionLocal() as session:
+            return [(b.status, b.batch_id, b.request_count, b.ok_count) for b in session.query(JudgeBatch).all()]
+
+    if step == "submit":
+        _seed(os.environ["OPENAI_BASE_URL"].removesuffix("/v1"))
+        jb.run_batch_judging(transport=transport, wait=False)
+        state = batches()
+        print(f"  submit: {state}")
+        return 0 if len(state) == 1 and state[0][0] == "submitted" and state[0][1] else 1
+
+    n = jb.run_batch_judging(transport=transport, poll_interval_s=0.5)
+    state = batches()
+    with SessionLocal() as session:
+        judged = session.query(ArticleAnalysis).filter(ArticleAnalysis.judge_score.is_not(None)).count()
+    remote = len(transport.client.batches.list().data)
+    print(f"  {step}: ingested {n} now, batches {state}, {judged} judged articles, {remote} batches on the server")
+
+    status, _, requests, ok = state[0]
+    if len(state) != 1 or remote != 1 or status != "ingested" or ok != requests:
+        return 1
+    return 0 if (n == requests if step == "resume" else n == 0) else 1
+
+
+if __name__ == "__main__":
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="news-batch-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    if args.step:
+        sys.exit(_step(args.step, workdir))
+
+    db = workdir / "batch.db"
+    for p in workdir.glob("batch.db*"):
+        p.unlink()
+    proc, base_url = start_stand_in(args.articles, args, workdir / "stand-in.log")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{db}",
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+        "OPENAI_API_KEY": "bench",
+        "PREJUDGE_MODEL_PATH": str(workdir / "no-prejudge.json"),
+    }
+    failed = []
+    try:
+        for step in ("submit", "resume", "again"):
+            # each step is a fresh process: the restart between submit and resume is real
+            cmd = [sys.executable, "-m", "scripts.check_batch_resume", *sys.argv[1:], "--workdir", str(workdir),
+                   "--step", step]
+            if subprocess.run(cmd, env=env).returncode != 0:
+                failed.append(step)
+                break
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    if failed:
+        print(f"❌ Batch flow failed at step {failed[0]!r} (workdir {workdir})")
+        sys.exit(1)
+    print("✅ Batch submitted, resumed after a restart and ingested exactly once")
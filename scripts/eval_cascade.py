@@ -0,0 +1,62 @@
+"""
+Compares the single-stage candidate shortlist (full text embedded for every
+cluster rep) with the title-first cascade for several M, from one uncached
+embedding pass: recall@k of the cascade shortlist, embedding tokens, and
+embedding latency.
+
+    python -m scripts.eval_cascade --top-k 60 --m 80,120,200
+"""
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from app.candidate_filter import _full_inputs, _load_profile_texts, _profile_sims, select_cluster_reps
+from app.condense import count_tokens
+from app.embeddings import EMBED_MODEL, embed_texts
+
+
+def _timed_sims(inputs: List[str], profile_vecs) -> tuple[np.ndarray, float]:
+    t0 = time.perf_counter()
+    vecs = embed_texts(inputs, stage="eval")
+    return np.array(_profile_sims(vecs, profile_vecs)), time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top-k", type=int, default=60, help="shortlist size (recall@k)")
+    parser.add_argument("--m", default="80,120,200", help="comma-separated stage-1 sizes to evaluate")
+    args = parser.parse_args()
+
+    reps = list(select_cluster_reps().values())
+    if not reps:
+        raise SystemExit("No cluster representatives in the DB; run the pipeline first.")
+
+    profile_vecs = embed_texts(_load_profile_texts(), stage="eval")
+    titles = [a.title or "(no title)" for a in reps]
+    fulls = _full_inputs(reps)
+    title_tokens = np.array([count_tokens(t, EMBED_MODEL) for t in titles])
+    full_tokens = np.array([count_tokens(t, EMBED_MODEL) for t in fulls])
+
+    title_sims, title_s = _timed_sims(titles, profile_vecs)
+    full_sims, full_s = _timed_sims(fulls, profile_vecs)
+
+    n = len(reps)
+    k = min(args.top_k, n)
+    baseline = set(np.argsort(-full_sims)[:k].tolist())
+    by_title = np.argsort(-title_sims)
+
+    print(f"cluster reps: {n}, top-k: {k}")
+    print(f"single-stage: {int(full_tokens.sum())} tokens, {full_s * 1000:.0f} ms")
+    for m in [int(x) for x in args.m.split(",") if x.strip()]:
+        m = min(m, n)
+        kept = by_title[:m]
+        shortlist = set(kept[np.argsort(-full_sims[kept])][:k].tolist())
+        tokens = int(title_tokens.sum() + full_tokens[kept].sum())
+        # stage-2 latency scaled from the measured full pass (same model/input size)
+        latency_s = title_s + full_s * m / n
+        print(
+            f"cascade M={m}: recall@{k} {len(shortlist & baseline) / k:.1%}, "
+            f"{tokens} tokens ({tokens / max(1, full_tokens.sum()):.1%}), ~{latency_s * 1000:.0f} ms"
+        )
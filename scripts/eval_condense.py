@@ -0,0 +1,96 @@
+"""
+Replays recent extracted articles through the old character cut and the new
+token-budgeted condensation, and reports tokens saved plus ranking agreement.
+
+    python -m scripts.eval_condense --n 200 --top-k 60 [--judge 20]
+"""
+import argparse
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy.orm import undefer
+
+from app.candidate_filter import _load_profile_texts
+from app.condense import condense, count_tokens
+from app.config import settings
+from app.db import Article, ArticleAnalysis, SessionLocal
+from app.embeddings import EMBED_MODEL, cosine_similarity, embed_texts
+from app.judge import JUDGE_MODEL, judge_article
+
+
+def _ranks(x: np.ndarray) -> np.ndarray:
+    r = np.empty(len(x))
+    r[np.argsort(-x)] = np.arange(len(x))
+    return r
+
+
+def _spearman(a: List[float], b: List[float]) -> float:
+    ra, rb = _ranks(np.array(a)), _ranks(np.array(b))
+    if len(a) < 2:
+        return 1.0
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def _sims(inputs: List[str], profile_vecs) -> List[float]:
+    vecs = embed_texts(inputs)
+    return [max(cosine_similarity(v, pv) for pv in profile_vecs) for v in vecs]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200, help="articles to replay")
+    parser.add_argument("--top-k", type=int, default=60, help="shortlist size for overlap")
+    parser.add_argument("--judge", type=int, default=0, help="also re-judge N already-judged articles")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        arts = (
+            session.query(Article)
+            .options(undefer(Article.text))
+            .filter(Article.text.is_not(None))
+            .order_by(Article.discovered_at.desc())
+            .limit(args.n)
+            .all()
+        )
+        judged: Dict[int, float] = {
+            aid: score
+            for aid, score in session.query(ArticleAnalysis.article_id, ArticleAnalysis.judge_score)
+            .filter(ArticleAnalysis.article_id.in_([a.id for a in arts]), ArticleAnalysis.judge_score.is_not(None))
+            .all()
+        }
+    if not arts:
+        raise SystemExit("No extracted articles in the DB; run the pipeline first.")
+
+    old_embed = [((a.title or "") + "\n" + (a.text or ""))[:6000] for a in arts]
+    new_embed = [
+        (a.title or "") + "\n" + condense(a.title or "", a.text, settings.CONDENSE_EMBED_TOKENS, EMBED_MODEL)
+        for a in arts
+    ]
+    old_judge = [((a.title or "") + "\n\n" + (a.text or ""))[:8000] for a in arts]
+    new_judge_bodies = [condense(a.title or "", a.text, settings.CONDENSE_JUDGE_TOKENS, JUDGE_MODEL) for a in arts]
+    new_judge = [(a.title or "") + "\n\n" + b for a, b in zip(arts, new_judge_bodies)]
+
+    def _avg_tokens(xs: List[str], model: str) -> float:
+        return sum(count_tokens(x, model) for x in xs) / len(xs)
+
+    print(f"articles: {len(arts)}")
+    print(f"embed tokens/article: {_avg_tokens(old_embed, EMBED_MODEL):.0f} -> {_avg_tokens(new_embed, EMBED_MODEL):.0f}")
+    print(f"judge tokens/article: {_avg_tokens(old_judge, JUDGE_MODEL):.0f} -> {_avg_tokens(new_judge, JUDGE_MODEL):.0f}")
+
+    profile_vecs = embed_texts(_load_profile_texts())
+    old_sims = _sims(old_embed, profile_vecs)
+    new_sims = _sims(new_embed, profile_vecs)
+    k = min(args.top_k, len(arts))
+    top_old = set(np.argsort(-np.array(old_sims))[:k])
+    top_new = set(np.argsort(-np.array(new_sims))[:k])
+    print(f"similarity rank spearman: {_spearman(old_sims, new_sims):.3f}")
+    print(f"top-{k} shortlist overlap: {len(top_old & top_new) / k:.1%}")
+
+    if args.judge:
+        pairs = [(a, b) for a, b in zip(arts, new_judge_bodies) if a.id in judged][: args.judge]
+        diffs = []
+        for a, body in pairs:
+            j = judge_article(title=a.title or "", text=body)
+            diffs.append(abs(j["final_score"] - judged[a.id]))
+        if diffs:
+            print(f"re-judged {len(diffs)}: mean |Δ final_score| = {sum(diffs) / len(diffs):.2f}")
@@ -0,0 +1,34 @@
+import argparse
+from datetime import datetime, timedelta
+
+from app.db import init_db
+from app.llm_ledger import summarize
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM tokens / cost / latency from the llm_calls ledger.")
+    parser.add_argument("--by", default="run_id,stage,model", help="comma-separated: run_id, stage, model")
+    parser.add_argument("--run", default=None, help="only this run_id")
+    parser.add_argument("--days", type=float, default=None, help="only calls from the last N days")
+    args = parser.parse_args()
+
+    init_db()
+    group_by = [c.strip() for c in args.by.split(",") if c.strip()]
+    since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+    rows = summarize(group_by=group_by, run_id=args.run, since=since)
+
+    header = [*group_by, "calls", "errors", "retries", "in_tok", "cached", "out_tok", "cost_usd", "p50_ms", "p95_ms"]
+    print("\t".join(header))
+    total = 0.0
+    for r in rows:
+        total += r["cost_usd"]
+        print(
+            "\t".join(
+                [str(r[c]) for c in group_by]
+                + [
+                    str(r["calls"]), str(r["errors"]), str(r["retries"]),
+                    str(r["input_tokens"]), str(r["cached_tokens"]), str(r["output_tokens"]),
+                    f"{r['cost_usd']:.4f}", f"{r['p50_ms']:.0f}", f"{r['p95_ms']:.0f}",
+                ]
+            )
+        )
+    print(f"\nTotal estimated cost: ${total:.4f}")
@@ -0,0 +1,15 @@
+import argparse
+
+from app.daemon import Daemon
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Process new articles continuously and send the digest at DAEMON_SEND_TIMES (Ctrl-C to stop)."
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="run ingest, extract and dedupe one after the other (default: PIPELINE_STREAMING)",
+    )
+    args = parser.parse_args()
+    Daemon(streaming=False if args.sequential else None).run_forever()
@@ -0,0 +1,23 @@
+import argparse
+
+from app.db import init_db
+from app.judge_batch import OpenAIBatchTransport, run_batch_judging
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Judge a large candidate backlog through the Batch API.")
+    parser.add_argument("--top-k", type=int, default=500, help="embedding shortlist size")
+    parser.add_argument("--max-items", type=int, default=1000, help="max requests in a new batch")
+    parser.add_argument("--poll-interval", type=float, default=60.0, help="seconds between status polls")
+    parser.add_argument("--no-wait", action="store_true", help="submit/poll once and exit (re-run to resume)")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible base URL (e.g. a local stand-in)")
+    args = parser.parse_args()
+
+    init_db()
+    n = run_batch_judging(
+        transport=OpenAIBatchTransport(base_url=args.base_url),
+        top_k=args.top_k,
+        max_items=args.max_items,
+        poll_interval_s=args.poll_interval,
+        wait=not args.no_wait,
+    )
+    print(f"🧠 Batch judge: ingested {n} new judgements")
@@ -1,4 +1,35 @@
+import argparse
+
 from app.pipeline import run_pipeline
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the news digest pipeline once.")
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="run ingest, extract and dedupe one after the other (default: PIPELINE_STREAMING)",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        metavar="RUN_ID",
+        help="continue the latest unfinished run (or RUN_ID), skipping the stages it already finished",
+    )
+    parser.add_argument(
+        "--force-send",
+        action="store_true",
+        help="with --resume: send the email even if an earlier attempt died while sending it",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the run (cProfile + tracemalloc); results go into the run report in METRICS_DIR",
+    )
+    args = parser.parse_args()
+    run_pipeline(
+        streaming=False if args.sequential else None,
+        resume=args.resume,
+        force_send=args.force_send,
+        profile=args.profile,
+    )
@@ -0,0 +1,26 @@
+import argparse
+
+from app.db import init_db
+from app.retention import run_retention
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1e6:.1f} MB"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Drop old HTML, archive old text, prune old rows and compact the DB (RETENTION_* settings)."
+    )
+    parser.add_argument("--no-vacuum", action="store_true", help="skip incremental VACUUM / ANALYZE")
+    args = parser.parse_args()
+
+    init_db()
+    r = run_retention(vacuum=not args.no_vacuum)
+    print(f"🧹 raw_html dropped:      {r.html_dropped}")
+    print(f"📦 texts archived:        {r.texts_archived}" + (f" -> {r.archive_path}" if r.archive_path else ""))
+    print(f"🗑️ rows pruned: condensed={r.condensed_pruned} analysis={r.analysis_pruned} "
+          f"sent={r.sent_pruned} summaries={r.summaries_pruned} articles={r.articles_pruned}")
+    print(f"🗑️ bookkeeping pruned: judge_cache={r.judge_cache_pruned} embedding_cache={r.embedding_cache_pruned} "
+          f"llm_calls={r.llm_calls_pruned} runs={r.runs_pruned} batches={r.batches_pruned}")
+    print(f"💾 DB size {_mb(r.bytes_before)} -> {_mb(r.bytes_after)} ({_mb(r.bytes_reclaimed)} reclaimed)")
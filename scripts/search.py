@@ -0,0 +1,30 @@
+import argparse
+import sys
+import time
+
+from app.db import SessionLocal, init_db
+from app.search import fts_enabled, search
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text search over all collected articles (SQLite FTS5).")
+    parser.add_argument("query", nargs="+", help="words to match (all of them); word* for a prefix")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--days", type=int, default=None, help="only articles discovered in the last N days")
+    parser.add_argument("--raw", action="store_true", help="pass the query to FTS5 as-is (OR, NOT, NEAR, title:...)")
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as session:
+        if not fts_enabled(session):
+            print("❌ No full-text index: search needs the SQLite FTS5 table (see app/search.py)")
+            sys.exit(1)
+        t0 = time.perf_counter()
+        hits = search(session, " ".join(args.query), limit=args.limit, days=args.days, raw=args.raw)
+        dt = (time.perf_counter() - t0) * 1000
+
+    for h in hits:
+        print(f"{h.score:6.2f}  {h.discovered_at:%Y-%m-%d}  [{h.source}] {h.title}")
+        print(f"        {h.url}")
+        if h.snippet:
+            print(f"        {' '.join(h.snippet.split())}")
+    print(f"🔎 {len(hits)} results in {dt:.1f} ms")
@@ -0,0 +1,40 @@
+import argparse
+
+from app.config import settings
+from app.db import init_db
+from app.prejudge import evaluate, load_training_rows, train
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local pre-judge on past judge verdicts.")
+    parser.add_argument("--target-recall", type=float, default=settings.PREJUDGE_TARGET_RECALL,
+                        help="share of passing articles that must still be sent to the judge")
+    parser.add_argument("--holdout", type=float, default=0.25, help="newest share of rows held out: older half calibrates the threshold, newer half is the test set")
+    parser.add_argument("--min-rows", type=int, default=100)
+    parser.add_argument("--out", default=settings.PREJUDGE_MODEL_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="print the report without saving the model")
+    args = parser.parse_args()
+
+    init_db()
+    rows = load_training_rows()
+    passing = sum(1 for r in rows if r.passed)
+    print(f"📚 {len(rows)} judged articles ({passing} passed the relevance gate)")
+
+    model = train(rows, target_recall=args.target_recall, holdout=args.holdout, min_rows=args.min_rows)
+    rep = model.report
+    print(f"🎯 threshold={model.threshold:.3f} (target pass recall {args.target_recall:.0%}, trained on {model.n_train})")
+    print(f"   test (newest, after the {rep['validation_rows']} validation rows): "
+          f"{rep['rows']} rows, {rep['passing']} passing, {rep['skipped']} would be skipped")
+    print(f"   skip precision {rep['skip_precision']:.1%}  (skipped articles that would have failed)")
+    print(f"   skip recall    {rep['skip_recall']:.1%}  (failing articles skipped)")
+    print(f"   pass recall    {rep['pass_recall']:.1%}  (passing articles still judged)")
+    print(f"   LLM calls avoided {rep['calls_avoided']:.1%}")
+
+    full = evaluate(model, rows)
+    print(f"   all rows (in-sample): skip precision {full['skip_precision']:.1%}, pass recall {full['pass_recall']:.1%}, "
+          f"calls avoided {full['calls_avoided']:.1%}")
+
+    if args.dry_run:
+        print("ℹ️ Dry run: model not saved.")
+    else:
+        model.save(args.out)
+        print(f"✅ Saved pre-judge model to {args.out}")
@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+import pytest
+
+# app.db binds its engine to DATABASE_URL at import: point it at a throwaway SQLite file first
+_tmp = tempfile.mkdtemp(prefix="news-agent-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+
+
+@pytest.fixture(scope="session")
+def db() -> None:
+    """
+    Schema + migrations on the shared test database. Tests add their own rows (unique
+    urls / ids) and must not assume the tables are empty.
+    """
+    from app.db import init_db
+
+    init_db()
@@ -0,0 +1,46 @@
+import pytest
+
+from app.checkpoints import Checkpoints, StageInterrupted
+from app.db import PipelineRun, SessionLocal
+
+
+def test_done_stage_returns_its_stored_outputs(db):
+    cp = Checkpoints("test-cp-done")
+    assert cp.run("select", lambda: {"cluster_ids": [1, 2]}) == {"cluster_ids": [1, 2]}
+    assert cp.run("select", lambda: pytest.fail("a done stage must not run again")) == {"cluster_ids": [1, 2]}
+
+
+def test_failed_stage_runs_again(db):
+    cp = Checkpoints("test-cp-failed")
+
+    def boom():
+        raise RuntimeError("smtp down")
+
+    with pytest.raises(RuntimeError):
+        cp.run("brief", boom)
+    assert cp.status("brief") == "failed"
+    assert cp.run("brief", lambda: "ok") == "ok"
+    assert cp.status("brief") == "done"
+
+
+def test_interrupted_send_is_not_repeated_on_resume(db):
+    cp = Checkpoints("test-cp-send")
+    with SessionLocal() as session:  # an earlier attempt died while sending
+        session.add(PipelineRun(run_id=cp.run_id, stage="send", status="running"))
+        session.commit()
+
+    sent = []
+    with pytest.raises(StageInterrupted):
+        cp.run("send", lambda: sent.append(1))
+    assert sent == [] and cp.status("send") == "running"
+
+    cp.run("send", lambda: sent.append(1), force=True)
+    assert sent == [1] and cp.status("send") == "done"
+
+
+def test_interrupted_repeatable_stage_runs_again(db):
+    cp = Checkpoints("test-cp-judge")
+    with SessionLocal() as session:
+        session.add(PipelineRun(run_id=cp.run_id, stage="judge", status="running"))
+        session.commit()
+    assert cp.run("judge", lambda: 3) == 3
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+from app.daemon import next_send_time, parse_send_times, previous_send_time
+
+
+def test_parse_send_times():
+    assert parse_send_times("mon 07:00, Thursday 18:30, daily 12:00,") == [(0, 7, 0), (3, 18, 30), (None, 12, 0)]
+    assert parse_send_times("") == []
+
+
+@pytest.mark.parametrize("spec", ["someday 07:00", "mon 25:00", "mon 07:60", "mon", "daily 7"])
+def test_parse_send_times_rejects_bad_entries(spec):
+    with pytest.raises(ValueError):
+        parse_send_times(spec)
+
+
+def test_send_times_around_now():
+    slots = parse_send_times("mon 07:00, thu 18:30")
+    now = datetime(2024, 1, 3, 12, 0)  # a Wednesday
+    assert previous_send_time(now, slots) == datetime(2024, 1, 1, 7, 0)
+    assert next_send_time(now, slots) == datetime(2024, 1, 4, 18, 30)
+    # a slot that is exactly now has passed
+    assert previous_send_time(datetime(2024, 1, 1, 7, 0), slots) == datetime(2024, 1, 1, 7, 0)
+    assert next_send_time(datetime(2024, 1, 1, 7, 0), slots) == datetime(2024, 1, 4, 18, 30)
+    assert next_send_time(now, []) is None
@@ -0,0 +1,127 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app import judge_batch
+from app.db import Article, ArticleAnalysis, JudgeBatch, SessionLocal
+from app.judge_batch import BatchState, advance_batch
+
+VERDICT = {
+    "is_relevant": True,
+    "topics": ["ai"],
+    "your_relevance": 8,
+    "impact": 7,
+    "novelty": 6,
+    "credibility": 8,
+    "depth": 6,
+    "hype_risk": 2,
+    "one_sentence_takeaway": "A takeaway.",
+    "why_it_matters": "It matters.",
+}
+
+
+class Crash(Exception):
+    pass
+
+
+class FakeTransport:
+    """
+    In-memory provider. With crash_after_create, create() registers the batch
+    and then raises, like a process killed before the id reaches the DB.
+    """
+
+    def __init__(self, output: str, crash_after_create: bool = False):
+        self.output = output
+        self.crash_after_create = crash_after_create
+        self.uploads = 0
+        self.batches = {}  # batch_id -> input_file_id
+
+    def upload(self, path):
+        self.uploads += 1
+        return "file-in"
+
+    def create(self, input_file_id):
+        batch_id = f"batch-{len(self.batches) + 1}"
+        self.batches[batch_id] = input_file_id
+        if self.crash_after_create:
+            self.crash_after_create = False
+            raise Crash()
+        return batch_id
+
+    def find(self, input_file_id):
+        return next((b for b, f in self.batches.items() if f == input_file_id), None)
+
+    def retrieve(self, batch_id):
+        return BatchState(status="completed", output_file_id="file-out")
+
+    def download(self, file_id):
+        return self.output
+
+
+@pytest.fixture
+def batch(db, tmp_path, request):
+    with SessionLocal() as session:
+        a = Article(url=f"https://example.com/batch/{request.node.name}", title="a story", discovered_at=datetime.utcnow(), cluster_id=900101)
+        session.add(a)
+        session.flush()
+        input_path = tmp_path / "input.jsonl"
+        input_path.write_text("{}\n", encoding="utf-8")
+        custom_id = judge_batch._custom_id(a.id)
+        row = JudgeBatch(
+            status="prepared",
+            input_path=str(input_path),
+            manifest_json=json.dumps({custom_id: {"article_id": a.id, "cluster_id": a.cluster_id, "similarity": 0.5}}),
+            request_count=1,
+        )
+        session.add(row)
+        session.commit()
+        output = json.dumps(
+            {
+                "custom_id": custom_id,
+                "response": {
+                    "status_code": 200,
+                    "body": {"output_text": json.dumps(VERDICT), "usage": {"input_tokens": 100, "output_tokens": 50}},
+                },
+            }
+        )
+        return row.id, a.id, output
+
+
+def test_resume_after_a_crash_in_create_does_not_submit_twice(batch):
+    pk, article_id, output = batch
+    transport = FakeTransport(output, crash_after_create=True)
+
+    with pytest.raises(Crash):
+        advance_batch(pk, transport)
+    with SessionLocal() as session:
+        row = session.get(JudgeBatch, pk)
+        assert (row.status, row.input_file_id, row.batch_id) == ("submitting", "file-in", None)
+
+    assert advance_batch(pk, transport) == "submitted"
+    assert len(transport.batches) == 1 and transport.uploads == 1
+    with SessionLocal() as session:
+        assert session.get(JudgeBatch, pk).batch_id == "batch-1"
+
+    assert advance_batch(pk, transport) == "ingested"
+    with SessionLocal() as session:
+        row = session.get(JudgeBatch, pk)
+        assert (row.ok_count, row.error_count) == (1, 0)
+        analysis = session.query(ArticleAnalysis).filter_by(article_id=article_id).one()
+        assert analysis.is_relevant is True and analysis.judge_score is not None
+
+    assert advance_batch(pk, transport) == "ingested"  # finished batches are left alone
+    assert len(transport.batches) == 1
+
+
+def test_ingest_keeps_verdicts_written_meanwhile(batch):
+    pk, article_id, output = batch
+    with SessionLocal() as session:
+        session.add(ArticleAnalysis(article_id=article_id, cluster_id=900101, is_relevant=False, judge_score=1.0))
+        session.commit()
+
+    transport = FakeTransport(output)
+    advance_batch(pk, transport)
+    assert advance_batch(pk, transport) == "ingested"
+    with SessionLocal() as session:
+        assert session.query(ArticleAnalysis.judge_score).filter_by(article_id=article_id).scalar() == 1.0
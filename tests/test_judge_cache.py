@@ -0,0 +1,39 @@
+from app import judge_cache
+from app.db import JudgeCache, SessionLocal
+from app.judge import JUDGE_MODEL
+
+
+def test_lookup_returns_stored_verdicts_and_counts_hits(db):
+    with SessionLocal() as session:
+        judge_cache.store(session, "cache-test-key", {"is_relevant": True, "final_score": 6.5})
+        judge_cache.store(session, "cache-test-key", {"is_relevant": False, "final_score": 1.0})  # already cached: no-op
+        session.commit()
+
+        assert judge_cache.lookup(session, ["cache-test-key", "cache-test-missing"]) == {
+            "cache-test-key": {"is_relevant": True, "final_score": 6.5}
+        }
+        judge_cache.lookup(session, ["cache-test-key"])
+        session.commit()
+
+        row = session.query(JudgeCache).filter_by(cache_key="cache-test-key").one()
+        assert row.hits == 2 and row.last_hit_at is not None
+
+
+def test_prune_stale_drops_other_prompt_versions(db):
+    with SessionLocal() as session:
+        judge_cache.store(session, "cache-test-current", {"final_score": 5.0})
+        session.add(
+            JudgeCache(
+                cache_key="cache-test-old-version",
+                judge_model=JUDGE_MODEL,
+                prompt_version="v0-test",
+                judge_json="{}",
+                judge_score=5.0,
+            )
+        )
+        session.commit()
+
+        assert judge_cache.prune_stale(session) >= 1
+        session.commit()
+        left = {k for (k,) in session.query(JudgeCache.cache_key).filter(JudgeCache.cache_key.like("cache-test-%"))}
+        assert "cache-test-current" in left and "cache-test-old-version" not in left
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+
+from app import judge_executor as je
+from app.judge_executor import JudgeJob, TokenBucket, retry_with_jitter, run_judge_jobs
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(je.time, "sleep", lambda s: None)
+
+
+def _jobs(n: int):
+    return [JudgeJob(article_id=i, cluster_id=i, similarity=0.5, title=f"t{i}", text="x") for i in range(n)]
+
+
+class _Calls:
+    """
+    Stand-in for judge_article / judge_articles that records every request.
+    """
+
+    def __init__(self, group_error=None, single=lambda n: {"final_score": 5.0}):
+        self.groups = 0
+        self.singles = 0
+        self.group_error = group_error
+        self.single = single
+
+    def judge_articles(self, items):
+        self.groups += 1
+        if self.group_error:
+            raise self.group_error
+        return {aid: {"final_score": 5.0} for aid, _, _ in items}
+
+    def judge_article(self, title, text):
+        self.singles += 1
+        return self.single(self.singles)
+
+
+def _patch(monkeypatch, calls: _Calls) -> _Calls:
+    monkeypatch.setattr(je, "judge_articles", calls.judge_articles)
+    monkeypatch.setattr(je, "judge_article", calls.judge_article)
+    return calls
+
+
+def test_token_bucket_blocks_once_empty(monkeypatch):
+    clock = [1000.0]
+    waits = []
+
+    def sleep(s):
+        waits.append(s)
+        clock[0] += s
+
+    monkeypatch.setattr(je.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(je.time, "sleep", sleep)
+
+    bucket = TokenBucket(rate_per_s=10.0, capacity=1)
+    bucket.acquire()
+    assert waits == []
+    bucket.acquire()
+    assert waits == [pytest.approx(0.1)]
+
+
+def test_retry_with_jitter_retries_only_the_given_errors():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise json.JSONDecodeError("bad", "", 0)
+        return "ok"
+
+    assert retry_with_jitter(flaky, max_retries=3, retry_on=je._BAD_OUTPUT_ERRORS) == "ok"
+    assert len(attempts) == 3
+
+    attempts.clear()
+
+    def broken():
+        attempts.append(1)
+        raise RuntimeError("network")
+
+    with pytest.raises(RuntimeError):
+        retry_with_jitter(broken, max_retries=3, retry_on=je._BAD_OUTPUT_ERRORS)
+    assert len(attempts) == 1
+
+
+def test_retry_with_jitter_gives_up_after_max_retries():
+    attempts = []
+
+    def always_bad():
+        attempts.append(1)
+        raise KeyError("final_score")
+
+    with pytest.raises(KeyError):
+        retry_with_jitter(always_bad, max_retries=2, retry_on=je._BAD_OUTPUT_ERRORS)
+    assert len(attempts) == 3
+
+
+def test_bad_output_is_retried_other_errors_are_not(monkeypatch):
+    def single(n):
+        if n == 1:
+            raise KeyError("final_score")  # malformed verdict: retried
+        return {"final_score": 5.0}
+
+    calls = _patch(monkeypatch, _Calls(single=single))
+    [res] = list(run_judge_jobs(_jobs(1), rate_per_min=1e6, max_retries=2))
+    assert res.verdict == {"final_score": 5.0} and calls.singles == 2
+
+    def down(n):
+        raise RuntimeError("503")  # already retried by llm_gateway
+
+    calls = _patch(monkeypatch, _Calls(single=down))
+    [res] = list(run_judge_jobs(_jobs(1), rate_per_min=1e6, max_retries=2))
+    assert res.verdict is None and "503" in res.error and calls.singles == 1
+
+
+def test_failed_groups_fall_back_within_the_request_budget(monkeypatch):
+    calls = _patch(monkeypatch, _Calls(group_error=RuntimeError("boom")))
+    results = list(run_judge_jobs(_jobs(12), group_size=4, rate_per_min=1e6, max_requests=6))
+
+    assert calls.groups + calls.singles == 6  # 3 group calls + 3 fallbacks
+    assert len(results) == 12
+    assert sum(r.verdict is not None for r in results) == 3
+    assert sum(r.deferred for r in results) == 9
+    assert all(r.verdict is None and r.error is None for r in results if r.deferred)
+
+
+def test_groups_beyond_the_budget_are_deferred_without_a_request(monkeypatch):
+    calls = _patch(monkeypatch, _Calls())
+    results = list(run_judge_jobs(_jobs(10), group_size=2, rate_per_min=1e6, max_requests=3))
+
+    assert (calls.groups, calls.singles) == (3, 0)
+    assert sum(r.verdict is not None for r in results) == 6
+    assert sum(r.deferred for r in results) == 4
+
+
+def test_no_budget_means_every_fallback_runs(monkeypatch):
+    calls = _patch(monkeypatch, _Calls(group_error=RuntimeError("boom")))
+    results = list(run_judge_jobs(_jobs(6), group_size=3, rate_per_min=1e6))
+    assert (calls.groups, calls.singles) == (2, 6)
+    assert not any(r.deferred for r in results)
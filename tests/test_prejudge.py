@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from app import analyze_candidates
+from app.analyze_candidates import judgement_values, skip_by_prejudge, write_judgements
+from app.db import Article, SessionLocal
+from app.judge_executor import JudgeJob
+from app.queries import judge_scores
+
+
+class _SkipEverything:
+    def should_judge(self, rows):
+        return [False] * len(rows)
+
+
+def _article(session, url: str) -> Article:
+    a = Article(url=url, title="a story", source="Example", country="US", discovered_at=datetime.utcnow(), cluster_id=900001)
+    session.add(a)
+    session.flush()
+    return a
+
+
+def test_prejudge_skip_fails_the_gate_until_judged(db, monkeypatch):
+    monkeypatch.setattr(analyze_candidates, "load_model", lambda: _SkipEverything())
+    with SessionLocal() as session:
+        a = _article(session, "https://example.com/prejudge/skip")
+        job = JudgeJob(article_id=a.id, cluster_id=a.cluster_id, similarity=0.4, title=a.title, text="")
+
+        kept, skipped = skip_by_prejudge(session, [job], {a.cluster_id: a})
+        session.commit()
+        assert (kept, skipped) == ([], 1)
+        # unjudged, but not an ungated similarity-fallback candidate
+        assert judge_scores(session, [a.id]) == ({}, {a.id})
+
+        j = {"is_relevant": True, "your_relevance": 8, "final_score": 7.5}
+        write_judgements(session, [judgement_values(a.id, a.cluster_id, j, 0.4)])
+        session.commit()
+        assert judge_scores(session, [a.id]) == ({a.id: 7.5}, set())
+
+
+def test_prejudge_skip_keeps_an_existing_verdict(db, monkeypatch):
+    monkeypatch.setattr(analyze_candidates, "load_model", lambda: _SkipEverything())
+    with SessionLocal() as session:
+        a = _article(session, "https://example.com/prejudge/judged")
+        j = {"is_relevant": True, "your_relevance": 8, "final_score": 6.0}
+        write_judgements(session, [judgement_values(a.id, a.cluster_id, j, 0.4)])
+        job = JudgeJob(article_id=a.id, cluster_id=a.cluster_id, similarity=0.4, title=a.title, text="")
+        skip_by_prejudge(session, [job], {a.cluster_id: a})
+        session.commit()
+        assert judge_scores(session, [a.id]) == ({a.id: 6.0}, set())
+
+
+def test_train_reports_on_rows_the_threshold_was_not_calibrated_on():
+    import random
+
+    from app.prejudge import PrejudgeRow, train
+
+    rnd = random.Random(1)
+    rows = []
+    for _ in range(400):
+        sim = rnd.random()
+        rows.append(PrejudgeRow(similarity=sim, title="story", source="Example", country="US", has_text=True,
+                                passed=sim + rnd.gauss(0, 0.2) > 0.6))
+    model = train(rows, holdout=0.25)
+    # fit on the oldest 300, calibrate on the next 50, report on the newest 50
+    assert model.n_train == 300
+    assert model.report["validation_rows"] == 50
+    assert model.report["rows"] == 50
+
+
+def test_keyword_feature_matches_whole_words():
+    from app.prejudge import PrejudgeModel, PrejudgeRow
+
+    d = 4 + 1 + 1
+    model = PrejudgeModel(sources=[], countries=[], mean=[0.0] * d, std=[1.0] * d, weights=[0.0] * d, bias=0.0, threshold=0.5)
+    rows = [PrejudgeRow(similarity=0.5, title=t, source="x", country="US", has_text=True)
+            for t in ("New reagent for labs", "An AI agent ships")]
+    X = model.features(rows)
+    assert X[0, 2] == 0.0
+    assert X[1, 2] > 0.0
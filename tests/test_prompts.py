@@ -0,0 +1,11 @@
+import pytest
+
+from app.condense import _encoding
+from app.judge import JUDGE_INSTRUCTIONS, JUDGE_MODEL, PROMPT_CACHE_MIN_TOKENS
+
+
+def test_judge_prefix_is_long_enough_for_prompt_caching():
+    enc = _encoding(JUDGE_MODEL)
+    if enc is None:
+        pytest.skip(f"no tiktoken encoding for {JUDGE_MODEL} (BPE file not cached, offline)")
+    assert len(enc.encode(JUDGE_INSTRUCTIONS)) >= PROMPT_CACHE_MIN_TOKENS
@@ -0,0 +1,116 @@
+"""
+EXPLAIN QUERY PLAN check for the hot queries: builds a throwaway SQLite DB with
+init_db() (schema + migrations, the `db` fixture), runs the real query functions on it, captures
+the SQL they emit and fails if any of them full-scans a large table.
+
+    python -m pytest tests/test_query_plans.py
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+import pytest
+from sqlalchemy import event
+
+from app.candidate_filter import select_cluster_reps
+from app.cluster_summary import refresh_clusters
+from app.db import Article, ArticleAnalysis, SentCluster, SessionLocal, engine
+from app.dedupe import assign_clusters
+from app.extract import extract_queue
+from app.queries import judge_scores, judged_backlog, sent_cluster_ids
+
+# Tables that grow without bound: a plain "SCAN <table>" on them is a failure
+_BIG_TABLES = {"articles", "article_analysis", "cluster_summary", "sent_clusters", "llm_calls", "judge_cache"}
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def _seed() -> None:
+    now = datetime.utcnow()
+    with SessionLocal() as session:
+        for i in range(50):
+            session.add(
+                Article(
+                    url=f"https://example.com/plans/{i}",
+                    title=f"story {i // 2} about model release {i // 2}",
+                    source="Example",
+                    country="US",
+                    published_at=now - timedelta(hours=i),
+                    discovered_at=now - timedelta(hours=i),
+                    text=None if i % 3 == 0 else "body",
+                )
+            )
+        session.commit()
+    assign_clusters()
+    with SessionLocal() as session:
+        for a in session.query(Article).filter(Article.url.like("https://example.com/plans/%"), Article.cluster_id.is_not(None)).limit(10).all():
+            an = ArticleAnalysis(article_id=a.id, cluster_id=a.cluster_id, judge_score=5.0)
+            an.set_rubric({"is_relevant": True, "your_relevance": 7})
+            session.add(an)
+        session.add(SentCluster(cluster_id=1))
+        session.commit()
+
+
+def _with_session(fn: Callable) -> Callable[[], None]:
+    def run() -> None:
+        with SessionLocal() as session:
+            fn(session)
+            session.rollback()
+    return run
+
+
+HOT_QUERIES: List[Tuple[str, Callable[[], None]]] = [
+    ("extract queue", _with_session(lambda s: extract_queue(s, 20))),
+    ("dedupe window", lambda: assign_clusters(limit=200)),
+    ("candidate reps", lambda: select_cluster_reps()),
+    ("judged backlog", _with_session(lambda s: judged_backlog(s, limit=1500))),
+    ("judge scores", _with_session(lambda s: judge_scores(s, [1, 2, 3]))),
+    ("sent lookup", _with_session(lambda s: sent_cluster_ids(s, [1, 2, 3]))),
+    ("cluster refresh", _with_session(lambda s: refresh_clusters(s, [1, 2, 3]))),
+]
+
+
+def _capture(fn: Callable[[], None]) -> List[Tuple[str, tuple]]:
+    seen: List[Tuple[str, tuple]] = []
+
+    def _listener(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            seen.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", _listener)
+    return seen
+
+
+def _plan(statement: str, params: tuple) -> List[str]:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params).all()
+    return [r[-1] for r in rows]
+
+
+def _full_scans(plan: List[str]) -> List[str]:
+    return [line for line in plan if (m := _FULL_SCAN.match(line.strip())) and m.group(1) in _BIG_TABLES]
+
+
+@pytest.fixture(scope="module")
+def plan_db(db) -> None:
+    _seed()  # no ANALYZE: stats from a tiny table would make the planner prefer scans
+
+
+@pytest.mark.parametrize("label, fn", HOT_QUERIES, ids=[label for label, _ in HOT_QUERIES])
+def test_hot_query_uses_an_index(plan_db, label: str, fn: Callable[[], None]) -> None:
+    statements = _capture(fn)
+    assert statements, f"{label}: no SELECT captured"
+    failures = []
+    for statement, params in statements:
+        plan = _plan(statement, params)
+        if _full_scans(plan):
+            failures.append(f"{' '.join(statement.split())[:160]}\n     " + "\n     ".join(plan))
+    assert not failures, f"{label} does a full table scan:\n" + "\n".join(failures)
+
+
+def test_full_scan_is_detected(plan_db) -> None:
+    # guard against the check silently passing (e.g. a changed EXPLAIN output format)
+    assert _full_scans(_plan("SELECT id FROM articles WHERE source = ?", ("Example",)))
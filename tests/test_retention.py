@@ -0,0 +1,66 @@
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+
+from app import retention
+from app.config import settings
+from app.db import Article, SessionLocal
+
+# far in the past, so the other tests' rows are never within the cutoffs
+NOW = datetime(2000, 6, 1)
+
+
+@pytest.fixture
+def policy(monkeypatch, tmp_path):
+    for name in (
+        "RETENTION_HTML_DAYS", "RETENTION_ANALYSIS_DAYS", "RETENTION_CACHE_DAYS",
+        "RETENTION_LEDGER_DAYS", "RETENTION_RUNS_DAYS",
+    ):
+        monkeypatch.setattr(settings, name, 0)
+    monkeypatch.setattr(settings, "RETENTION_TEXT_DAYS", 30)
+    monkeypatch.setattr(settings, "RETENTION_ARTICLE_DAYS", 90)
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _old_article(session, url: str) -> int:
+    a = Article(url=url, title="old story", text="the old body", discovered_at=datetime(2000, 1, 1))
+    session.add(a)
+    session.commit()
+    return a.id
+
+
+def test_text_is_archived_before_the_row_is_pruned(db, policy):
+    with SessionLocal() as session:
+        aid = _old_article(session, "https://example.com/retention/archived")
+
+    report = retention.run_retention(now=NOW, vacuum=False)
+
+    assert report.texts_archived == 1 and report.articles_pruned == 1
+    with gzip.open(report.archive_path, "rt", encoding="utf-8") as f:
+        [rec] = [json.loads(ln) for ln in f]
+    assert (rec["id"], rec["text"]) == (aid, "the old body")
+    with SessionLocal() as session:
+        assert session.get(Article, aid) is None
+
+
+def test_article_with_unarchived_text_is_not_pruned(db, policy, monkeypatch):
+    with SessionLocal() as session:
+        aid = _old_article(session, "https://example.com/retention/kept")
+
+    def disk_full(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(retention.gzip, "open", disk_full)
+    with pytest.raises(OSError):
+        retention.run_retention(now=NOW, vacuum=False)
+
+    with SessionLocal() as session:
+        a = session.get(Article, aid)
+        assert a is not None and a.text == "the old body" and a.archived_at is None
+        # the article horizon alone never deletes a row that still holds its text
+        retention.prune_rows(session, None, datetime(2000, 3, 1))
+    with SessionLocal() as session:
+        assert session.get(Article, aid) is not None
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from app.bulk import insert_new
+from app.db import Article, SessionLocal
+from app.rank import KeywordScorer
+from app.search import keyword_bm25
+
+
+def _add_articles(rows):
+    with SessionLocal() as session:
+        insert_new(session, Article, rows, conflict_cols=["url"])
+        session.commit()
+        urls = [r["url"] for r in rows]
+        return {a.url: a.id for a in session.query(Article).filter(Article.url.in_(urls)).all()}
+
+
+def test_keyword_bm25_scores_more_than_500_keywords(db):
+    now = datetime.utcnow()
+    ids = _add_articles([
+        {"url": "https://example.com/search/a", "title": "kw7 and kw599 news", "text": "about kw550", "discovered_at": now},
+        {"url": "https://example.com/search/b", "title": "nothing relevant", "text": "kw0", "discovered_at": now},
+    ])
+    weights = {f"kw{i}": 1.0 for i in range(600)}
+    with SessionLocal() as session:
+        hits = keyword_bm25(session, weights, ids.values())
+        boosts = KeywordScorer(weights).fts_scores(session, list(ids.values()))
+
+    assert set(hits[ids["https://example.com/search/a"]]) == {"kw7", "kw550", "kw599"}
+    assert set(hits[ids["https://example.com/search/b"]]) == {"kw0"}
+    assert all(s > 0 for matched in hits.values() for s in matched.values())
+    assert boosts[ids["https://example.com/search/a"]] > boosts[ids["https://example.com/search/b"]]